@@ -13,7 +13,7 @@ CREATE TABLE Products (
 
     CONSTRAINT pk_products          PRIMARY KEY (product_id),
     CONSTRAINT uq_products_name     UNIQUE (name),
-    CONSTRAINT ck_products_id       CHECK (product_id REGEXP '^P[0-9]{3}$')
+    CONSTRAINT ck_products_id       CHECK (product_id REGEXP '^P[0-9]{3,}$')
 );
 
 CREATE TABLE Batches (
@@ -30,7 +30,7 @@ CREATE TABLE Batches (
                                     ON UPDATE CASCADE,
     CONSTRAINT ck_batches_price     CHECK (price > 0),
     CONSTRAINT ck_batches_qty       CHECK (quantity >= 0),
-    CONSTRAINT ck_batch_number      CHECK (batch_number REGEXP '^B[0-9]{3}$')
+    CONSTRAINT ck_batch_number      CHECK (batch_number REGEXP '^B[0-9]{3,}$')
 );
 
 CREATE TABLE Sales (
@@ -48,7 +48,14 @@ CREATE TABLE Sales (
                                     ON UPDATE CASCADE,
     CONSTRAINT ck_sales_qty         CHECK (quantity_sold > 0),
     CONSTRAINT ck_sales_price       CHECK (price > 0),
-    CONSTRAINT ck_sales_id          CHECK (sale_id REGEXP '^S[0-9]{3}$')
+    CONSTRAINT ck_sales_id          CHECK (sale_id REGEXP '^S[0-9]{3,}$')
+);
+
+CREATE TABLE IdSequences (
+    name            VARCHAR(10)     NOT NULL,
+    high            BIGINT          NOT NULL,
+
+    CONSTRAINT pk_id_sequences      PRIMARY KEY (name)
 );
 
 CREATE TABLE RemovedProducts (
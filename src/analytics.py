@@ -0,0 +1,156 @@
+import argparse
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .models import parse_date
+    from .rollups import month_start, week_start
+except ImportError:  # Running as a script from inside src/
+    from models import parse_date
+    from rollups import month_start, week_start
+
+# Sales reports over a long sales.csv, computed on every CPU core.
+# The file is cut into shards at line boundaries. sales.csv is written in date order,
+# so each shard covers a range of dates. Each worker process totals one shard and the
+# partial totals are then added together.
+# Usage: python analytics.py sales.csv [--workers 4] [--period month]
+
+MIN_SHARD_BYTES = 4 * 1024 * 1024     # Smaller files are totalled in this process, starting workers costs more
+
+
+class SalesTotals:
+    # Quantity and revenue per product, per batch and per period. Partial totals merge by addition.
+    def __init__(self):
+        self.by_product = {}        # product_id -> [quantity, revenue]
+        self.by_batch = {}          # (product_id, batch_number) -> [quantity, revenue]
+        self.by_period = {}         # period start -> [quantity, revenue]
+        self.quantity = 0
+        self.revenue = 0.0
+        self.rows = 0
+
+    def merge(self, other):
+        for mine, theirs in ((self.by_product, other.by_product),
+                             (self.by_batch, other.by_batch),
+                             (self.by_period, other.by_period)):
+            for key, (quantity, revenue) in theirs.items():
+                totals = mine.get(key)
+                if totals is None:
+                    mine[key] = [quantity, revenue]
+                else:
+                    totals[0] += quantity
+                    totals[1] += revenue
+        self.quantity += other.quantity
+        self.revenue += other.revenue
+        self.rows += other.rows
+        return self
+
+
+def shard_offsets(filename, shards):
+    # [(start, end)] byte ranges that split the file after the header, each ending at a line break
+    size = os.path.getsize(filename)
+    with open(filename, "rb") as file:
+        file.readline()                         # Header
+        first = file.tell()
+        bounds = [first]
+        for i in range(1, shards):
+            file.seek(max(first + (size - first) * i // shards, bounds[-1]))
+            file.readline()                     # Move on to the start of the next whole line
+            bounds.append(min(file.tell(), size))
+        bounds.append(size)
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def read_header(filename):
+    with open(filename, newline="") as file:
+        return next(csv.reader(file), [])
+
+
+def shard_lines(file, end):
+    # The lines of an open binary file from its position up to byte offset `end`, read one
+    # at a time so a shard is never held in memory whole
+    while file.tell() < end:
+        line = file.readline()
+        if not line:
+            break
+        yield line.decode()
+
+
+def total_shard(filename, start, end, header, period="month"):
+    # Totals the rows between two byte offsets. Runs in a worker process, so it only
+    # takes and returns plain picklable values.
+    columns = {name: i for i, name in enumerate(header)}
+    pid_col, batch_col = columns["product_id"], columns["batch_number"]
+    qty_col, price_col, date_col = columns["quantity_sold"], columns["price"], columns["date_of_sale"]
+    period_of = {"day": lambda day: day, "week": week_start, "month": month_start}[period]
+    period_cache = {}                           # date text -> period start, few distinct dates per shard
+
+    totals = SalesTotals()
+    by_product, by_batch, by_period = totals.by_product, totals.by_batch, totals.by_period
+    with open(filename, "rb") as file:
+        file.seek(start)
+        for row in csv.reader(shard_lines(file, end)):
+            try:
+                quantity = int(row[qty_col])
+                revenue = quantity * float(row[price_col])
+                day_text = row[date_col]
+                period_key = period_cache.get(day_text)
+                if period_key is None:
+                    period_key = period_cache[day_text] = period_of(parse_date(day_text))
+            except (IndexError, ValueError):
+                continue                            # Blank or damaged line
+            for table, key in ((by_product, row[pid_col]), (by_batch, (row[pid_col], row[batch_col])),
+                               (by_period, period_key)):
+                entry = table.get(key)
+                if entry is None:
+                    table[key] = [quantity, revenue]
+                else:
+                    entry[0] += quantity
+                    entry[1] += revenue
+            totals.quantity += quantity
+            totals.revenue += revenue
+            totals.rows += 1
+    return totals
+
+
+def total_sales(filename="sales.csv", workers=None, period="month"):
+    # SalesTotals for the whole file, using `workers` processes (all cores by default)
+    workers = workers or os.cpu_count() or 1
+    header = read_header(filename)
+    shards = min(workers, max(os.path.getsize(filename) // MIN_SHARD_BYTES, 1))
+    ranges = shard_offsets(filename, shards)
+    if shards == 1:
+        result = SalesTotals()
+        for start, end in ranges:
+            result.merge(total_shard(filename, start, end, header, period))
+        return result
+
+    result = SalesTotals()
+    with ProcessPoolExecutor(max_workers=shards) as pool:
+        futures = [pool.submit(total_shard, filename, start, end, header, period) for start, end in ranges]
+        for future in futures:
+            result.merge(future.result())
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sales totals over a sales.csv file, using every core.")
+    parser.add_argument("sales_file", nargs="?", default="sales.csv")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: all cores)")
+    parser.add_argument("--period", choices=["day", "week", "month"], default="month")
+    parser.add_argument("--top", type=int, default=10, help="number of best-selling products to show")
+    args = parser.parse_args(argv)
+
+    totals = total_sales(args.sales_file, args.workers, args.period)
+    print(f"Sales: {totals.rows}   Units sold: {totals.quantity}   Revenue: {totals.revenue:.2f}")
+    print(f"\nRevenue by {args.period}:")
+    for start, (quantity, revenue) in sorted(totals.by_period.items()):
+        print(f"  {start}  {quantity:>10}  {revenue:>14.2f}")
+    print(f"\nTop {args.top} products by revenue:")
+    best = sorted(totals.by_product.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+    for product_id, (quantity, revenue) in best:
+        print(f"  {product_id:<10}  {quantity:>10}  {revenue:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,418 @@
+import argparse
+import csv
+import gzip
+import lzma
+import os
+import shutil
+from collections.abc import MutableSequence
+from datetime import date
+from itertools import islice
+
+try:
+    from .models import Sale, parse_date
+    from .rollups import SalesRollup
+    from .storage import CsvStorage, REMOVED_FILE, SALE_FIELDS, file_stamp, filter_by_date, write_csv_atomically
+except ImportError:  # Running as a script from inside src/
+    from models import Sale, parse_date
+    from rollups import SalesRollup
+    from storage import CsvStorage, REMOVED_FILE, SALE_FIELDS, file_stamp, filter_by_date, write_csv_atomically
+
+# Sales history split into one CSV file per month (or week, year or day), so a report on
+# last week's sales opens one or two small files instead of all of sales.csv.
+# manifest.csv lists every partition with its file, first and last sale date and row count;
+# a date range query reads the manifest and opens only the partitions that overlap the range.
+#
+# Partitions of finished months can be compressed with gzip or lzma (compress()). They are
+# read back by streaming decompression and a late sale can still be appended to them.
+# The sales totals of each finished partition are kept in a rollup file next to it, so loading
+# the rollups reads only the current partition and those changed since their totals were saved.
+#
+#   sales_archive/manifest.csv
+#   sales_archive/sales_2026-01.csv.gz
+#   sales_archive/sales_2026-01_rollup.csv
+#   sales_archive/sales_2026-02.csv
+
+MANIFEST_FILE = "manifest.csv"
+MANIFEST_FIELDS = ["partition", "file", "min_date", "max_date", "rows"]
+PERIODS = {
+    "day": lambda day: day.isoformat(),
+    "week": lambda day: "{0}-W{1:02d}".format(*day.isocalendar()),
+    "month": lambda day: day.strftime("%Y-%m"),
+    "year": lambda day: day.strftime("%Y"),
+}
+COMPRESSORS = {"gz": gzip.open, "xz": lzma.open}
+
+
+def open_partition(path, mode="r"):
+    # Plain, gzip or lzma text file depending on the file extension
+    opener = COMPRESSORS.get(path.rsplit(".", 1)[-1])
+    if opener is None:
+        return open(path, mode, newline="")
+    return opener(path, mode + "t", newline="")
+
+
+class Partition:
+    __slots__ = ("name", "file", "min_date", "max_date", "rows")
+
+    def __init__(self, name, file, min_date, max_date, rows=0):
+        self.name = name
+        self.file = file
+        self.min_date = parse_date(min_date)
+        self.max_date = parse_date(max_date)
+        self.rows = int(rows)
+
+    def overlaps(self, start=None, end=None):
+        return (start is None or self.max_date >= start) and (end is None or self.min_date <= end)
+
+    def as_row(self):
+        return {"partition": self.name, "file": self.file, "min_date": self.min_date,
+                "max_date": self.max_date, "rows": self.rows}
+
+
+class SalesArchive:
+    def __init__(self, folder="sales_archive", period="month"):
+        self.folder = folder
+        self.period = period
+        self.partition_of = PERIODS[period]
+        self.partitions = {}        # name -> Partition
+        # A rebuild swaps whole folders, tidy up after one that was cut short
+        if os.path.isdir(folder + ".old"):
+            if os.path.isdir(folder):
+                shutil.rmtree(folder + ".old")          # Only the clean-up was left
+            else:
+                os.rename(folder + ".old", folder)      # Stopped between the renames, keep the old archive
+        os.makedirs(folder, exist_ok=True)
+        self.load_manifest()
+
+    def path(self, file):
+        return os.path.join(self.folder, file)
+
+    def load_manifest(self):
+        self.partitions = {}
+        try:
+            with open(self.path(MANIFEST_FILE), newline="") as file:
+                for row in csv.DictReader(file):
+                    self.partitions[row["partition"]] = Partition(row["partition"], row["file"], row["min_date"],
+                                                                  row["max_date"], row["rows"])
+        except FileNotFoundError:
+            pass
+
+    def save_manifest(self):
+        write_csv_atomically(self.path(MANIFEST_FILE), MANIFEST_FIELDS,
+                             (p.as_row() for p in self.partitions.values()))
+
+    def row_count(self):
+        return sum(p.rows for p in self.partitions.values())
+
+    def select(self, start=None, end=None):
+        # Partitions holding sales between start and end (both included), oldest first
+        return sorted((p for p in self.partitions.values() if p.overlaps(start, end)),
+                      key=lambda p: (p.min_date, p.name))
+
+    # ---------- Writing ----------
+    def append(self, sales):
+        # Adds sales to the end of their partitions. The manifest is written before the rows,
+        # so after a crash it may count a few rows too many but its dates never miss a sale.
+        groups = {}
+        for sale in sales:
+            groups.setdefault(self.partition_of(sale.date_of_sale), []).append(sale)
+        if not groups:
+            return
+        for name, group in groups.items():
+            first = min(s.date_of_sale for s in group)
+            last = max(s.date_of_sale for s in group)
+            p = self.partitions.get(name)
+            if p is None:
+                p = self.partitions[name] = Partition(name, f"sales_{name}.csv", first, last)
+            p.min_date = min(p.min_date, first)
+            p.max_date = max(p.max_date, last)
+            p.rows += len(group)
+        self.save_manifest()
+        for name, group in groups.items():
+            self._write_rows(self.path(self.partitions[name].file), group)
+
+    def _write_rows(self, path, sales):
+        is_new = not os.path.exists(path)
+        with open_partition(path, "a") as file:
+            writer = csv.DictWriter(file, fieldnames=SALE_FIELDS)
+            if is_new:
+                writer.writeheader()
+            writer.writerows(s.as_row() for s in sales)
+
+    def rebuild(self, sales):
+        # Replaces the whole archive with `sales`. The new partitions are written to a folder
+        # next to this one, which then takes its place, so a crash leaves the old archive whole.
+        staging = SalesArchive(self.folder + ".tmp", self.period)
+        for name in os.listdir(staging.folder):
+            os.remove(staging.path(name))
+        staging.partitions = {}
+        batch = []
+        for sale in sales:
+            batch.append(sale)
+            if len(batch) >= 10000:
+                staging.append(batch)
+                batch = []
+        staging.append(batch)
+        staging.save_manifest()
+
+        os.rename(self.folder, self.folder + ".old")
+        os.rename(staging.folder, self.folder)
+        shutil.rmtree(self.folder + ".old")
+        self.load_manifest()
+
+    def import_csv(self, filename="sales.csv"):
+        # Replaces the archive with the sales in a flat sales.csv file
+        def sales():
+            with open(filename, newline="") as file:
+                for row in csv.DictReader(file):
+                    try:
+                        yield Sale(row["sale_id"], row["product_id"], row["batch_number"],
+                                   row["quantity_sold"], row["price"], row["date_of_sale"])
+                    except Exception:
+                        print(f"Skipping bad sale row: {row}")
+        self.rebuild(sales())
+        return self.row_count()
+
+    def compress(self, method="gz", before=None):
+        # Compresses the partitions whose sales are all older than `before` (default today),
+        # except the partition `before` falls in. Returns the names of the compressed partitions.
+        before = before or date.today()
+        current = self.partition_of(before)
+        compressed = []
+        for p in self.select():
+            if p.name == current or p.max_date >= before or p.file.rsplit(".", 1)[-1] in COMPRESSORS:
+                continue
+            source = self.path(p.file)
+            target = f"{p.file}.{method}"
+            tmp = self.path(target + ".tmp")
+            with open_partition(source) as src, COMPRESSORS[method](tmp, "wt", newline="") as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp, self.path(target))
+            p.file = target
+            self.save_manifest()
+            os.remove(source)
+            compressed.append(p.name)
+        return compressed
+
+    # ---------- Reading ----------
+    def _read(self, p):
+        try:
+            with open_partition(self.path(p.file)) as file:
+                yield from csv.DictReader(file)
+        except FileNotFoundError:
+            print(f"Archive partition {p.file} is missing.")
+
+    def iter_rows(self, start=None, end=None):
+        # Sale rows dated between start and end, reading only the matching partitions
+        for p in self.select(start, end):
+            yield from filter_by_date(self._read(p), start, end)
+
+    # ---------- Rollups ----------
+    def rollup_path(self, p):
+        return self.path(f"sales_{p.name}_rollup.csv")
+
+    def _saved_rollup(self, p):
+        # The totals saved for a partition, or None when the partition changed after they were saved
+        path = self.rollup_path(p)
+        try:
+            if os.stat(path).st_mtime_ns < os.stat(self.path(p.file)).st_mtime_ns:
+                return None
+            return SalesRollup.load(path)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def _partition_rollup(self, p):
+        rollup = SalesRollup()
+        for row in self._read(p):
+            try:
+                quantity = int(row["quantity_sold"])
+                rollup.add_values(parse_date(row["date_of_sale"]), row["product_id"],
+                                  quantity, quantity * float(row["price"]))
+            except (KeyError, ValueError):
+                print(f"Skipping bad sale row: {row}")
+        return rollup
+
+    def rollup(self, today=None):
+        # SalesRollup of every archived sale. The partition of the current period still takes
+        # sales and is always read; a finished one is read once and its totals saved.
+        current = self.partition_of(today or date.today())
+        rollup = SalesRollup()
+        for p in self.select():
+            part = self._saved_rollup(p) if p.name != current else None
+            if part is None:
+                part = self._partition_rollup(p)
+                if p.name != current:
+                    tmp = self.rollup_path(p) + ".tmp"
+                    part.save(tmp)
+                    os.replace(tmp, self.rollup_path(p))
+            rollup.add_rollup(part)
+        return rollup
+
+    def iter_sales(self, start=None, end=None):
+        for row in self.iter_rows(start, end):
+            try:
+                yield Sale(row["sale_id"], row["product_id"], row["batch_number"],
+                           row["quantity_sold"], row["price"], row["date_of_sale"])
+            except Exception:
+                print(f"Skipping bad sale row: {row}")
+
+
+class ArchivedSales(MutableSequence):
+    # ShopSystem.sales backed by a SalesArchive: archived sales are streamed from the partition
+    # files when read, sales not archived yet (journalled ones, or a sale being saved) are kept
+    # in a list after them. Archived sales are read-only.
+    def __init__(self, archive):
+        self.archive = archive
+        self.tail = []
+
+    def __len__(self):
+        return self.archive.row_count() + len(self.tail)
+
+    def __iter__(self):
+        yield from self.archive.iter_sales()
+        yield from self.tail
+
+    def __getitem__(self, i):
+        # Archived sales are found by reading up to them, fine for the odd lookup only
+        if isinstance(i, slice):
+            return list(self)[i]
+        base = self.archive.row_count()
+        if i < 0:
+            i += len(self)
+        if i < 0 or i >= len(self):
+            raise IndexError("sales index out of range")
+        if i >= base:
+            return self.tail[i - base]
+        return next(islice(self.archive.iter_sales(), i, None))
+
+    def _tail_index(self, i):
+        base = self.archive.row_count()
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step == 1 and (start >= base or stop <= start):
+                return slice(max(start - base, 0), max(stop - base, 0))
+        else:
+            if i < 0:
+                i += len(self)
+            if i >= base:
+                return i - base
+        raise TypeError("Archived sales cannot be changed.")
+
+    def __setitem__(self, i, value):
+        self.tail[self._tail_index(i)] = value
+
+    def __delitem__(self, i):
+        del self.tail[self._tail_index(i)]
+
+    def insert(self, i, value):
+        if i < 0:
+            i += len(self)
+        self.tail.insert(self._tail_index(i) if i < len(self) else len(self.tail), value)
+
+    def append(self, value):
+        self.tail.append(value)
+
+    def extend(self, values):
+        self.tail.extend(values)
+
+    def index(self, value, start=0, stop=None):
+        # Recent sales are the ones looked up, e.g. to undo a failed save, so the tail is searched first
+        for j, sale in enumerate(self.tail):
+            if sale == value:
+                return self.archive.row_count() + j
+        return super().index(value, start, stop) if stop is not None else super().index(value, start)
+
+    def archived(self, sales):
+        # Drops sales from the tail once they have been written to the archive
+        written = {id(s) for s in sales}
+        self.tail = [s for s in self.tail if id(s) not in written]
+
+    def between(self, start=None, end=None):
+        # Sales between start and end (both included), opening only the matching partitions
+        yield from self.archive.iter_sales(start, end)
+        for s in self.tail:
+            if (start is None or s.date_of_sale >= start) and (end is None or s.date_of_sale <= end):
+                yield s
+
+    def raw_sales(self):
+        # (product_id, batch_number, quantity, price, date) per sale, as SalesHistory.raw_sales
+        for row in self.archive.iter_rows():
+            try:
+                yield (row["product_id"], row["batch_number"], int(row["quantity_sold"]),
+                       float(row["price"]), parse_date(row["date_of_sale"]))
+            except (KeyError, ValueError):
+                print(f"Skipping bad sale row: {row}")
+        for s in self.tail:
+            yield s.product_id, s.batch_number, s.quantity_sold, s.price, s.date_of_sale
+
+    def sale_ids(self):
+        for row in self.archive.iter_rows():
+            yield row["sale_id"]
+        for s in self.tail:
+            yield s.sale_id
+
+
+class ArchiveStorage(CsvStorage):
+    # CSV storage with the sales in a SalesArchive instead of sales.csv. The first time the
+    # archive is opened an existing sales.csv is imported into it; sales.csv is then left alone.
+    supports_sales_archive = True
+
+    def __init__(self, products_file="products.csv", sales_file="sales.csv", removed_file=REMOVED_FILE,
+                 archive_folder=None, period="month"):
+        super().__init__(products_file, sales_file, removed_file)
+        self.archive = SalesArchive(archive_folder or os.path.join(os.path.dirname(sales_file), "sales_archive"),
+                                    period)
+        if not self.archive.partitions and os.path.exists(sales_file):
+            count = self.archive.import_csv(sales_file)
+            print(f"Imported {count} sales from {sales_file} into {self.archive.folder}.")
+
+    def open_sales(self):
+        return ArchivedSales(self.archive)
+
+    def load_sales_rollup(self):
+        return self.archive.rollup()
+
+    def journal_stamps(self):
+        # Appending to a partition leaves the others alone, so there is no stamp for the sales.
+        # Journalled sales are matched by sale ID against the archive instead.
+        return {"products": file_stamp(self.products_file)}
+
+    def iter_sales(self, filename=None, start=None, end=None):
+        if filename is not None:
+            return super().iter_sales(filename, start, end)
+        return self.archive.iter_rows(start, end)
+
+    def save_sales(self, sales, filename=None):
+        if filename is not None:
+            return super().save_sales(sales, filename)
+        if isinstance(sales, ArchivedSales) and sales.archive is self.archive:
+            # Everything but the tail is archived already, so saving costs as much as the new sales
+            pending = list(sales.tail)
+            self.archive.append(pending)
+            sales.archived(pending)
+        else:
+            self.archive.rebuild(list(sales))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Partitioned sales archive: import, compress and list partitions.")
+    parser.add_argument("sales_file", nargs="?", default="sales.csv", help="imported when the archive is empty")
+    parser.add_argument("--folder", help="archive folder, sales_archive next to the sales file by default")
+    parser.add_argument("--period", choices=sorted(PERIODS), default="month")
+    parser.add_argument("--compress", choices=sorted(COMPRESSORS), help="compress the partitions before this month")
+    args = parser.parse_args(argv)
+
+    archive = SalesArchive(args.folder or os.path.join(os.path.dirname(args.sales_file), "sales_archive"), args.period)
+    if not archive.partitions and os.path.exists(args.sales_file):
+        print(f"Imported {archive.import_csv(args.sales_file)} sales from {args.sales_file}.")
+    if args.compress:
+        for name in archive.compress(args.compress):
+            print(f"Compressed {name}")
+    print(f"{'Partition':<12}{'First sale':>12}{'Last sale':>12}{'Rows':>10}  File")
+    for p in archive.select():
+        print(f"{p.name:<12}{str(p.min_date):>12}{str(p.max_date):>12}{p.rows:>10}  {p.file}")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+try:
+    from .datagen import generate_products, write_products, write_sales
+    from .events import set_silent
+    from .inventory import Inventory
+    from .journal import Journal
+    from .models import Product
+    from .shopsystem import ShopSystem
+    from .snapshot import SnapshotStorage
+    from .storage import CsvStorage
+except ImportError:  # Running as a script from inside src/
+    from datagen import generate_products, write_products, write_sales
+    from events import set_silent
+    from inventory import Inventory
+    from journal import Journal
+    from models import Product
+    from shopsystem import ShopSystem
+    from snapshot import SnapshotStorage
+    from storage import CsvStorage
+
+# Timings of the Inventory and ShopSystem hot paths on generated data of several sizes.
+# Results are written as JSON and can be compared with an earlier run:
+#
+#   python benchmark.py --sizes 1000,100000 --output new.json
+#   python benchmark.py --sizes 1000,100000 --compare old.json --threshold 0.25
+#
+# The second run exits with 1 when any benchmark got more than 25% slower than in old.json.
+# Each size uses that many product batches and that many sales. The generated rows are streamed
+# from the generator, but the benchmarks of in-memory structures hold every batch, so sizes
+# above 1000000 need more memory than most machines have.
+
+OPERATIONS = 1000           # Sales or lookups done by the "many small calls" benchmarks
+BENCHMARKS = {}             # name -> function(context) returning the callable to time
+
+
+def benchmark(name):
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+class Context:
+    # Generated files for one size, shared by every benchmark of that size. The rows are
+    # generated again when needed instead of being kept, the same seed gives the same rows.
+    def __init__(self, size, folder):
+        self.size = size
+        self.folder = folder
+        self.products_file = os.path.join(folder, "products.csv")
+        self.sales_file = os.path.join(folder, "sales.csv")
+        write_products(self.products_file, size)
+        write_sales(self.sales_file, size, size)
+        rng = random.Random(size)
+        picked = rng.sample(range(size), min(OPERATIONS, size))
+        keys = {i: None for i in picked}
+        for i, row in enumerate(generate_products(size)):
+            if i in keys:
+                keys[i] = (row["product_id"], row["batch_number"])
+        self.keys = [keys[i] for i in picked]
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def products(self):
+        return (Product(r["product_id"], r["batch_number"], r["name"], r["price"], r["quantity"], r["expiry_date"],
+                        r["category"]) for r in generate_products(self.size))
+
+    def inventory(self):
+        inventory = Inventory(low_stock_threshold=10)
+        for product in self.products():
+            inventory.add_product(product)
+        return inventory
+
+    def shop(self, journal=False, storage=None):
+        # A ShopSystem loaded from the generated files, writing to its own copies
+        for name in ("products.csv", "sales.csv"):
+            shutil.copyfile(os.path.join(self.folder, name), self.path("work_" + name))
+        storage = storage or CsvStorage(self.path("work_products.csv"), self.path("work_sales.csv"),
+                                        self.path("work_removed.csv"))
+        if journal:
+            journal_file = self.path("work_journal.csv")
+            if os.path.exists(journal_file):
+                os.remove(journal_file)
+            journal = Journal(journal_file, fsync_every=0, compact_every=0)
+        system = ShopSystem(journal=journal or None, storage=storage)
+        system.load_products()
+        system.load_sales()
+        return system
+
+
+# ---------- Inventory ----------
+@benchmark("inventory.add_products")
+def bench_inventory_add(ctx):
+    products = list(ctx.products())
+    inventory = Inventory(low_stock_threshold=10)
+    return lambda: [inventory.add_product(p) for p in products]
+
+
+@benchmark("inventory.low_stock")
+def bench_inventory_low_stock(ctx):
+    return ctx.inventory().get_low_stock_products
+
+
+@benchmark("inventory.expired")
+def bench_inventory_expired(ctx):
+    return ctx.inventory().get_expired_products
+
+
+@benchmark("inventory.sale")
+def bench_inventory_sale(ctx):
+    inventory = ctx.inventory()
+    return lambda: [inventory.product_sale(pid, batch, 1) for pid, batch in ctx.keys]
+
+
+@benchmark("inventory.fefo_sale")
+def bench_inventory_fefo_sale(ctx):
+    inventory = ctx.inventory()
+    return lambda: [inventory.product_sale_fefo(pid, 1) for pid, _ in ctx.keys]
+
+
+@benchmark("inventory.expiry_sweep")
+def bench_inventory_expiry_sweep(ctx):
+    return ctx.inventory().remove_expired_products
+
+
+# ---------- ShopSystem ----------
+@benchmark("shop.load_products")
+def bench_shop_load_products(ctx):
+    system = ShopSystem(storage=CsvStorage(ctx.products_file, ctx.sales_file, ctx.path("work_removed.csv")))
+    return system.load_products
+
+
+@benchmark("shop.load_sales")
+def bench_shop_load_sales(ctx):
+    system = ShopSystem(storage=CsvStorage(ctx.products_file, ctx.sales_file, ctx.path("work_removed.csv")))
+    return system.load_sales
+
+
+@benchmark("shop.load_sales_snapshot")
+def bench_shop_load_sales_snapshot(ctx):
+    storage = SnapshotStorage(ctx.path("snap_products.csv"), ctx.path("snap_sales.csv"), ctx.path("snap_removed.csv"))
+    if storage.open_sales_snapshot() is None:
+        writer = ShopSystem(storage=CsvStorage(ctx.products_file, ctx.sales_file, ctx.path("work_removed.csv")))
+        writer.load_sales()
+        writer.storage = storage
+        writer.save_sales()
+    return ShopSystem(storage=storage).load_sales
+
+
+@benchmark("shop.save_products")
+def bench_shop_save_products(ctx):
+    return ctx.shop().save_products
+
+
+@benchmark("shop.save_sales")
+def bench_shop_save_sales(ctx):
+    return ctx.shop().save_sales
+
+
+@benchmark("shop.find_batch")
+def bench_shop_find_batch(ctx):
+    system = ctx.shop()
+    return lambda: [system.find_batch(pid, batch) for pid, batch in ctx.keys]
+
+
+@benchmark("shop.sell")
+def bench_shop_sell(ctx):
+    system = ctx.shop(journal=True)
+    return lambda: [system.sell_product(pid, 1) for pid, _ in ctx.keys]
+
+
+@benchmark("shop.search")
+def bench_shop_search(ctx):
+    # Every keystroke of typing the names of the sampled batches, as the till searches
+    system = ctx.shop()
+    names = [system.find_batch(pid, batch).name for pid, batch in ctx.keys[:100]]
+    queries = [name[:i] for name in names for i in range(1, len(name) + 1)]
+    return lambda: [system.search(q) for q in queries]
+
+
+@benchmark("shop.expiry_sweep")
+def bench_shop_expiry_sweep(ctx):
+    return ctx.shop(journal=True).remove_expired_products
+
+
+@benchmark("shop.report")
+def bench_shop_report(ctx):
+    system = ctx.shop()
+    return lambda: (system.rollup.revenue(), system.rollup.revenue_by_period("month"), system.rollup.top_products(5))
+
+
+@benchmark("shop.best_sellers")
+def bench_shop_best_sellers(ctx):
+    # The dashboard's top 20 of today and of this month, once the summaries are built
+    system = ctx.shop()
+    system.top_sellers
+    return lambda: (system.best_sellers(20, "day"), system.best_sellers(20, "month"))
+
+
+# ---------- Running ----------
+def run(sizes, repeat=3, only=None):
+    # [{name, size, median, min, runs}] with times in seconds
+    results = []
+    was_silent = set_silent(True)       # Inventory logs every operation, the console would be timed too
+    try:
+        for size in sizes:
+            folder = tempfile.mkdtemp(prefix=f"shop_bench_{size}_")
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ctx = Context(size, folder)
+                for name, function in BENCHMARKS.items():
+                    if only and not any(name.startswith(prefix) for prefix in only):
+                        continue
+                    times = []
+                    for _ in range(repeat):
+                        with contextlib.redirect_stdout(io.StringIO()):     # The shop code prints as it works
+                            timed = function(ctx)
+                            start = time.perf_counter()
+                            timed()
+                            times.append(time.perf_counter() - start)
+                    results.append({"name": name, "size": size, "median": statistics.median(times),
+                                    "min": min(times), "runs": repeat})
+                    print(f"{name:<28}{size:>10}{statistics.median(times) * 1000:>12.2f} ms", file=sys.stderr)
+            finally:
+                shutil.rmtree(folder)
+    finally:
+        set_silent(was_silent)
+    return results
+
+
+def compare(results, baseline, threshold=0.25):
+    # [(name, size, old median, new median, ratio)] for the benchmarks slower than threshold allows
+    old = {(r["name"], r["size"]): r["median"] for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        before = old.get((r["name"], r["size"]))
+        if before and r["median"] > before * (1 + threshold):
+            regressions.append((r["name"], r["size"], before, r["median"], r["median"] / before))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the inventory and sales hot paths.")
+    parser.add_argument("--sizes", default="1000,10000",
+                        help="comma separated numbers of batches and sales, up to about 1000000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="comma separated name prefixes, e.g. shop.load,inventory")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="allowed slowdown before a benchmark counts as a regression (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes, args.repeat, args.only.split(",") if args.only else None)
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for name, size, before, after, ratio in regressions:
+            print(f"REGRESSION {name} at {size}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({ratio:.2f}x)",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import csv
+import random
+from datetime import date, timedelta
+
+try:
+    from .storage import PRODUCT_FIELDS, SALE_FIELDS
+except ImportError:  # Running as a script from inside src/
+    from storage import PRODUCT_FIELDS, SALE_FIELDS
+
+# Synthetic products and sales in the products.csv / sales.csv layout, for benchmarks and
+# load testing. The same seed always gives the same rows. Used by populate_products.py,
+# "populate _sales.py" and benchmark.py.
+
+NAMES = ["Sugar", "Milk", "Bread", "Butter", "Eggs", "Rice", "Flour", "Tea", "Coffee", "Salt",
+         "Soap", "Oil", "Beans", "Juice", "Yoghurt", "Cheese", "Honey", "Jam", "Pasta", "Maize Flour"]
+CATEGORIES = {"Milk": "Dairy", "Butter": "Dairy", "Eggs": "Dairy", "Yoghurt": "Dairy", "Cheese": "Dairy",
+              "Bread": "Bakery", "Flour": "Bakery", "Maize Flour": "Bakery", "Soap": "Household",
+              "Juice": "Drinks", "Tea": "Drinks", "Coffee": "Drinks"}     # Anything else is Groceries
+BATCHES_PER_PRODUCT = 3
+
+
+def generate_products(count, seed=0, today=None, batches_per_product=BATCHES_PER_PRODUCT):
+    # `count` product rows, BATCHES_PER_PRODUCT batches per product ID.
+    # About 5% are expired and 10% are below the default low stock threshold.
+    rng = random.Random(seed)
+    today = today or date.today()
+    for i in range(count):
+        number = i // batches_per_product + 1
+        roll = rng.random()
+        if roll < 0.05:
+            expiry = today - timedelta(days=rng.randint(1, 60))
+        else:
+            expiry = today + timedelta(days=rng.randint(0, 365))
+        yield {
+            "product_id": f"P{number:03d}",
+            "batch_number": f"B{i % batches_per_product + 1:03d}",
+            "name": f"{NAMES[number % len(NAMES)]} {number}",
+            "category": CATEGORIES.get(NAMES[number % len(NAMES)], "Groceries"),
+            "price": rng.randint(5, 500) * 10,
+            "quantity": rng.randint(0, 9) if 0.05 <= roll < 0.15 else rng.randint(10, 200),
+            "expiry_date": expiry,
+        }
+
+
+def generate_sales(count, product_count, seed=0, start=None, days=365,
+                   batches_per_product=BATCHES_PER_PRODUCT):
+    # `count` sale rows for the first `product_count` generated batches, in date order over `days` days
+    rng = random.Random(seed)
+    start = start or date.today() - timedelta(days=days)
+    product_ids = max(product_count // batches_per_product, 1)
+    for i in range(count):
+        number = rng.randint(1, product_ids)
+        quantity, price = rng.randint(1, 5), rng.randint(5, 500) * 10
+        yield {
+            "sale_id": f"S{i + 1:03d}",
+            "product_id": f"P{number:03d}",
+            "batch_number": f"B{rng.randint(1, min(batches_per_product, product_count)):03d}",
+            "quantity_sold": quantity,
+            "price": price,
+            "total": quantity * price,
+            "date_of_sale": start + timedelta(days=i * days // count),
+        }
+
+
+def write_rows(filename, fieldnames, rows):
+    with open(filename, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_products(filename, count, seed=0):
+    write_rows(filename, PRODUCT_FIELDS, generate_products(count, seed))
+
+
+def write_sales(filename, count, product_count, seed=0):
+    write_rows(filename, SALE_FIELDS, generate_sales(count, product_count, seed))
@@ -0,0 +1,116 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Results, events and log output for Inventory.
+# Every Inventory operation returns a Result: it is truthy when the operation worked, so
+# `if inventory.product_sale(...)` keeps working, and it carries a code, a message and data
+# for callers that want more than True/False. The same Result is published on the
+# inventory's EventBus and its message is logged to the "shop" logger.
+#
+# Log records go through a queue to a background thread that writes them to the console,
+# so a bulk run of thousands of sales never waits on terminal output.
+# set_silent(True) (or SHOP_QUIET=1) drops them altogether for batch jobs.
+
+logger = logging.getLogger("shop")
+
+
+class Result:
+    __slots__ = ("ok", "code", "message", "data")
+
+    def __init__(self, ok, code, message="", **data):
+        self.ok = ok                # True when the operation went through
+        self.code = code            # e.g. "sale", "not_found", "insufficient_stock"
+        self.message = message      # The text that used to be printed
+        self.data = data            # Anything else worth keeping, e.g. product or quantity
+
+    def __bool__(self):
+        return self.ok
+
+    def __repr__(self):
+        return f"Result(ok={self.ok}, code={self.code!r}, message={self.message!r})"
+
+    def raise_for_error(self):
+        # For callers that prefer exceptions: raises InventoryError when the operation failed
+        if not self.ok:
+            raise InventoryError(self)
+        return self
+
+
+class InventoryError(Exception):
+    def __init__(self, result):
+        super().__init__(result.message)
+        self.result = result
+
+
+class EventBus:
+    # handler(result) is called for every Result published with its code, or with "*" for all of them
+    def __init__(self):
+        self.handlers = {}          # code -> [handler]
+
+    def subscribe(self, code, handler):
+        self.handlers.setdefault(code, []).append(handler)
+
+    def unsubscribe(self, code, handler):
+        handlers = self.handlers.get(code, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def publish(self, result):
+        if not self.handlers:
+            return
+        for code in (result.code, "*"):
+            for handler in self.handlers.get(code, ()):
+                try:
+                    handler(result)
+                except Exception:
+                    logger.exception(f"Event handler failed for {result.code}")
+
+
+# ---------- Console output ----------
+_queue = None
+_listener = None
+
+
+def start_console_log():
+    # Sends "shop" log records to stdout from a background thread. Does nothing when the
+    # application has already given the "shop" logger its own handlers.
+    global _queue, _listener
+    if _listener is not None or logger.handlers:
+        return
+    _queue = queue.Queue()
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(logging.Formatter("%(message)s"))
+    _listener = QueueListener(_queue, console)
+    logger.addHandler(QueueHandler(_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    if os.environ.get("SHOP_QUIET", "") not in ("", "0"):
+        set_silent(True)
+    _listener.start()
+    atexit.register(stop_console_log)
+
+
+def flush_log():
+    # Waits until every queued message has been written, e.g. before asking the user for input
+    if _queue is not None:
+        _queue.join()
+
+
+def stop_console_log():
+    global _queue, _listener
+    if _listener is not None:
+        _listener.stop()            # Writes whatever is still queued
+        logger.handlers = [h for h in logger.handlers if not isinstance(h, QueueHandler)]
+        _listener = None
+        _queue = None
+
+
+def set_silent(silent=True):
+    # Batch mode: no log output at all, results and events still work. Returns the previous setting.
+    was_silent = logger.disabled
+    logger.disabled = silent
+    return was_silent
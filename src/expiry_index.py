@@ -0,0 +1,91 @@
+from bisect import bisect_left, insort
+from datetime import date, timedelta
+
+# Batches sorted by expiry date, so "what has expired" and "what expires soon" only
+# look at the batches that match instead of comparing the date of every batch.
+# Entries are (expiry_date, product_id, batch_number) tuples kept in order with bisect.
+
+class ExpiryIndex:
+    def __init__(self, products=()):
+        self.entries = []           # Sorted (expiry_date, product_id, batch_number)
+        self.expiry_of = {}         # (product_id, batch_number) -> expiry_date
+        for product in products:
+            self.add(product)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, product):
+        key = (product.product_id, product.batch_number)
+        if key in self.expiry_of:
+            self.remove(product)
+        self.expiry_of[key] = product.expiry_date
+        insort(self.entries, (product.expiry_date, product.product_id, product.batch_number))
+
+    def remove(self, product):
+        key = (product.product_id, product.batch_number)
+        expiry = self.expiry_of.pop(key, None)
+        if expiry is None:
+            return False
+        entry = (expiry, product.product_id, product.batch_number)
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+        return True
+
+    def update(self, product):
+        # Call after a batch's expiry_date was changed
+        self.remove(product)
+        self.add(product)
+
+    def expired(self, as_of=None):
+        # Keys of batches whose expiry date is before as_of (today by default)
+        as_of = as_of or date.today()
+        end = bisect_left(self.entries, (as_of,))
+        return [(pid, batch) for _, pid, batch in self.entries[:end]]
+
+    def count_expired(self, as_of=None):
+        # Number of expired batches without building the list
+        return bisect_left(self.entries, (as_of or date.today(),))
+
+    def expiring_within(self, days, today=None):
+        # Keys of batches that are not expired yet but expire within `days` days
+        today = today or date.today()
+        start = bisect_left(self.entries, (today,))
+        end = bisect_left(self.entries, (today + timedelta(days=days + 1),))
+        return [(pid, batch) for _, pid, batch in self.entries[start:end]]
+
+    def pop_expired(self, as_of=None):
+        # Removes and returns the keys of every batch expired before as_of
+        as_of = as_of or date.today()
+        end = bisect_left(self.entries, (as_of,))
+        popped = self.entries[:end]
+        del self.entries[:end]
+        keys = []
+        for _, pid, batch in popped:
+            self.expiry_of.pop((pid, batch), None)
+            keys.append((pid, batch))
+        return keys
+
+    def allocate(self, quantity, find, today=None):
+        # First-expiry-first-out: plans to take `quantity` units from the batches that expire soonest,
+        # skipping expired and empty ones. find(key) returns the Product for a key.
+        # Returns [(product, units), ...] or None when there is not enough stock. Nothing is changed here.
+        today = today or date.today()
+        plan = []
+        remaining = quantity
+        for i in range(bisect_left(self.entries, (today,)), len(self.entries)):
+            _, pid, batch = self.entries[i]
+            product = find((pid, batch))
+            if product is None or product.quantity <= 0:
+                continue
+            units = min(remaining, product.quantity)
+            plan.append((product, units))
+            remaining -= units
+            if remaining == 0:
+                return plan
+        return None
+
+    def next_expiry(self):
+        # The earliest expiry date still in the index, or None when it is empty
+        return self.entries[0][0] if self.entries else None
@@ -6,37 +6,111 @@
 # - No negative quantities allowed.
 # - Expired products are flagged when checked.
 
+import logging
 from datetime import date
-class Product:
-    def __init__(self, product_id, batch_number, name, price, quantity, expiry_date):
-        self.product_id = product_id           # Unique identifier for the product
-        self.batch_number = batch_number       # Identifies the batch of the product
-        self.name = name
-        self.price = price
-        self.quantity = quantity
-        self.expiry_date = expiry_date
+
+try:
+    from .expiry_index import ExpiryIndex
+    from .events import EventBus, Result, logger, start_console_log
+    from .metrics import metrics
+    from .models import Product     # Shared with ShopSystem, see models.py
+except ImportError:  # Running as a script from inside src/
+    from expiry_index import ExpiryIndex
+    from events import EventBus, Result, logger, start_console_log
+    from metrics import metrics
+    from models import Product
 
 class Inventory:
     def __init__(self, low_stock_threshold):
         self.products = {}                                 # A dictionary for the products keys and values.
+        self.expiry_index = ExpiryIndex()                  # Product keys ordered by expiry date, for the expired/expiring queries.
+        self.product_expiry = {}                           # product_id -> ExpiryIndex of its batches, for FEFO sales.
+        # Running totals, updated on every stock change so the summary never has to scan the products.
+        self.low_stock = {}                                # product_key -> product for batches at or below the threshold.
+        self.total_quantity = 0
+        self.low_stock_listeners = []                      # Callbacks fired when a batch crosses the threshold.
+        self.events = EventBus()                           # Every operation's Result is published here, see events.py.
+        start_console_log()
         self.low_stock_threshold = 10                      # When the quantity is 10 units and above, it is normal stock and less than 10 units is low stock.
 
+    @property
+    def low_stock_threshold(self):
+        return self._low_stock_threshold
+
+    @low_stock_threshold.setter
+    def low_stock_threshold(self, value):
+        # A new threshold changes which batches are low, so the set is rebuilt once.
+        self._low_stock_threshold = value
+        self.low_stock = {key: p for key, p in self.products.items() if p.quantity <= value}
+
+    def subscribe_low_stock(self, callback):
+        # callback(product, is_low) runs only when a batch goes below/at the threshold (is_low=True)
+        # or is restocked above it (is_low=False), so reorder alerts need no polling.
+        self.low_stock_listeners.append(callback)
+
+    def _notify_low_stock(self, product, is_low):
+        for callback in self.low_stock_listeners:
+            callback(product, is_low)
+        if self.events.handlers:
+            self.events.publish(Result(True, "low_stock" if is_low else "restocked", "", product=product))
+
+    def _result(self, ok, code, message, **data):
+        # Logs the message (in the background, see events.py), publishes the Result and returns it
+        result = Result(ok, code, message, **data)
+        if not logger.disabled:
+            logger.log(logging.INFO if ok else logging.WARNING, message)
+        self.events.publish(result)
+        return result
+
+    def _track(self, product):
+        product._owner = self
+        self.expiry_index.add(product)
+        self.product_expiry.setdefault(product.product_id, ExpiryIndex()).add(product)
+        self.total_quantity += product.quantity
+        if product.quantity <= self.low_stock_threshold:
+            self.low_stock[(product.product_id, product.batch_number)] = product
+            self._notify_low_stock(product, True)
+
+    def _untrack(self, product):
+        product._owner = None
+        self.expiry_index.remove(product)
+        product_expiry = self.product_expiry.get(product.product_id)
+        if product_expiry is not None:
+            product_expiry.remove(product)
+            if not len(product_expiry):
+                del self.product_expiry[product.product_id]
+        self.total_quantity -= product.quantity
+        self.low_stock.pop((product.product_id, product.batch_number), None)
+
+    def _quantity_changed(self, product, old_quantity):
+        # Called by Product whenever the quantity of a tracked batch is set.
+        self.total_quantity += product.quantity - old_quantity
+        was_low = old_quantity <= self.low_stock_threshold
+        is_low = product.quantity <= self.low_stock_threshold
+        if was_low != is_low:
+            product_key = (product.product_id, product.batch_number)
+            if is_low:
+                self.low_stock[product_key] = product
+            else:
+                self.low_stock.pop(product_key, None)
+            self._notify_low_stock(product, is_low)
+
+    @metrics.timed("inventory.add_product")
     def add_product(self, product):
         product_key = (product.product_id, product.batch_number)      # product_key is the unique identifier for a product batch so the inventory can track multiple batches of the same product.
 
         if product_key in self.products:       # If Product exists already
-            print("Product already added.")
-            return False
+            return self._result(False, "duplicate", "Product already added.", product=product)
         if product.quantity < 0:               # Makes sure the quantity is not negative
-            print("Quantity must be positive")
-            return False
+            return self._result(False, "invalid_quantity", "Quantity must be positive", product=product)
         if product.price <= 0:                 # Ensures the price of the product is zero and above and not negative.
-            print("Price must be positive")
-            return False
+            return self._result(False, "invalid_price", "Price must be positive", product=product)
         # If Product is not in the inventory
         self.products[product_key] = product   # self.products[product.product_id, product.batch_number] = Product(product_id, batch_number, name, price, quantity, expiry_date)
-        print(f"Product with ID {product.product_id} and {product.batch_number} added successfully.")
-        return True
+        self._track(product)
+        return self._result(True, "product_added",
+                            f"Product with ID {product.product_id} and {product.batch_number} added successfully.",
+                            product=product)
 
     def find_product(self, product_id, batch_number):    # Way of filtering the products using product key.
         product_key = (product_id, batch_number)
@@ -45,80 +119,82 @@ class Inventory:
     def remove_product(self, product_id, batch_number):
         product_key = (product_id, batch_number)
         if product_key in self.products:
-            del self.products[product_key]
-            print("Product removed successfully")
-            return True
+            product = self.products.pop(product_key)
+            self._untrack(product)
+            return self._result(True, "product_removed", "Product removed successfully", product=product)
         else:
-            print("Product not found")
-            return False
+            return self._result(False, "not_found", "Product not found", product_key=product_key)
 
     def update_stock(self, product_id, batch_number, choice, quantity):
         product_key = (product_id, batch_number)
 
         # Check if the product exists in the inventory.
-        # If not, print an error message and return False to indicate the update failed.
+        # If not, report it and return a failed Result (falsy) to indicate the update failed.
 
         if product_key not in self.products:
-            print(f"Stock not updated. This product with ID {product_id} not found")
-            return False
+            return self._result(False, "not_found", f"Stock not updated. This product with ID {product_id} not found",
+                                product_key=product_key)
 
         product = self.products[product_key]
 
         # Blocking entry of any expired product.
         if product.expiry_date < date.today():
-            print(f"Stock update declined. The product with ID {product_id} is expired.")
-            return False
+            return self._result(False, "expired", f"Stock update declined. The product with ID {product_id} is expired.",
+                                product=product)
 
         choice = choice.lower()
         # I used if-elif-else because it allows multiple conditional checks
         if choice == "set new quantity":
             if quantity >= 0:
                 product.quantity = quantity # e.g. the product quantity = 50
-                print(f"Stock updated. {product.name} now has {product.quantity} units in stock")
-                return True
+                return self._result(True, "stock_updated",
+                                    f"Stock updated. {product.name} now has {product.quantity} units in stock",
+                                    product=product, quantity=quantity)
             else:
-                print("Quantity must be zero or greater than zero")
-                return False
+                return self._result(False, "invalid_quantity", "Quantity must be zero or greater than zero", product=product)
 
         elif choice == "increase":
             if quantity > 0:
                 product.quantity += quantity
-                print(f"Increased {product.name} stock by {quantity}")
-                return True
+                return self._result(True, "stock_updated", f"Increased {product.name} stock by {quantity}",
+                                    product=product, quantity=quantity)
             else:
-                print("Increase must be a positive integer")
-                return False
+                return self._result(False, "invalid_quantity", "Increase must be a positive integer", product=product)
 
         elif choice == "decrease":
             if quantity <= 0:
-                print("Decrease must be positive")
-                return False
+                return self._result(False, "invalid_quantity", "Decrease must be positive", product=product)
             else:
                 if quantity > product.quantity:
-                    print("Quantity can not be decreased than stock available")
-                    return False
+                    return self._result(False, "insufficient_stock", "Quantity can not be decreased than stock available",
+                                        product=product)
                 else:
                     product.quantity -= quantity
-                    print(f"Decreased {product.name} stock by {quantity}")
-                    return True
+                    return self._result(True, "stock_updated", f"Decreased {product.name} stock by {quantity}",
+                                        product=product, quantity=-quantity)
         else:
-            print("Invalid choice. Must be either 'Set new quantity' or 'Increase' or 'Decrease'")
-            return False
+            return self._result(False, "invalid_choice",
+                                "Invalid choice. Must be either 'Set new quantity' or 'Increase' or 'Decrease'")
 
+    @metrics.timed("inventory.low_stock")
     def get_low_stock_products(self):
-        low_stock_products = {}
-        for product_key, product in self.products.items():
-            if product.quantity <= self.low_stock_threshold:
-                low_stock_products[product_key] = product
-        return low_stock_products
-
-    def get_expired_products(self):
-        expired_products = {}
-        today = date.today()
-        for product_key, product in self.products.items():
-            if product.expiry_date < today:
-                expired_products[product_key] = product
-        return expired_products
+        return dict(self.low_stock)     # A copy, so callers cannot change the tracked set.
+
+    def get_expired_products(self, as_of=None):
+        # Only the expired keys are visited, they sit at the front of the expiry index.
+        return {product_key: self.products[product_key] for product_key in self.expiry_index.expired(as_of)}
+
+    def get_expiring_soon(self, days):
+        return {product_key: self.products[product_key] for product_key in self.expiry_index.expiring_within(days)}
+
+    @metrics.timed("inventory.expiry_sweep")
+    def remove_expired_products(self, as_of=None):
+        # Removes every expired batch in one go and returns them.
+        expired = {}
+        for product_key in self.expiry_index.pop_expired(as_of):
+            expired[product_key] = self.products.pop(product_key)
+            self._untrack(expired[product_key])
+        return expired
 
     def get_all_products(self):
         if not self.products:  # Checks if the list is empty
@@ -134,33 +210,52 @@ class Inventory:
     def all_products_summary(self):
         print("\nYour products inventory summary")
         unique_count = len(self.products) # How many different batches do we have?
-        total_quantity = sum(product.quantity for product in self.products.values()) # How much stock do we have in total?
-        low_stock_count = len(self.get_low_stock_products()) # What needs restocking soon?
-        expired_count = len(self.get_expired_products()) # What products needs to be flagged or removed?
+        total_quantity = self.total_quantity # How much stock do we have in total?
+        low_stock_count = len(self.low_stock) # What needs restocking soon?
+        expired_count = self.expiry_index.count_expired() # What products needs to be flagged or removed?
         # ALL PRODUCTS SUMMARY TABLE
         print(f"{'Unique Products':<16}|{'Total Quantity':<15}|{'Low Stocks':<11}|{'Expired Products ':<12}")
         print("-" * 60)
         print(f"{unique_count:<16}|{total_quantity:<15}|{low_stock_count:<11}|{expired_count:<12}")
 
+    @metrics.timed("inventory.product_sale")
     def product_sale(self, product_id, batch_number, quantity):
         product_key = (product_id, batch_number)
-        if product_key not in self.products:         # Checks if the product exists. If it doesn’t exist, prints a clear error message and stops the sale.
-            print("Product not found in inventory.")
-            return False
+        if product_key not in self.products:         # Checks if the product exists. If it doesn’t exist, reports a clear error message and stops the sale.
+            return self._result(False, "not_found", "Product not found in inventory.", product_key=product_key)
         product = self.products[product_key]
         if product.expiry_date < date.today():   # Checks the product’s expiry date. If the product is expired, the sale is blocked and a message is shown.
-            print(f"Sale failed: The product with ID {product_id} is expired.")
-            return False
+            return self._result(False, "expired", f"Sale failed: The product with ID {product_id} is expired.",
+                                product=product)
         if quantity <= 0:
-            print(f"Sale failed: The quantity must be positive")
-            return False
+            return self._result(False, "invalid_quantity", "Sale failed: The quantity must be positive", product=product)
         if product.quantity < quantity:
-            print(f"Sale failed: Only {product.quantity} units available for {product.name}.")
-            return False
+            return self._result(False, "insufficient_stock",
+                                f"Sale failed: Only {product.quantity} units available for {product.name}.",
+                                product=product)
         product.quantity -= quantity
-        print(f"Sale successful: Sold {quantity} units of {product.name}."
-              f"Stock left {product.quantity} units available for {product.name}.")
-        return True
+        return self._result(True, "sale", f"Sale successful: Sold {quantity} units of {product.name}."
+                                          f"Stock left {product.quantity} units available for {product.name}.",
+                            product=product, quantity=quantity)
+
+    @metrics.timed("inventory.product_sale_fefo")
+    def product_sale_fefo(self, product_id, quantity):
+        # Sells from the batches of a product that expire soonest first, skipping expired batches.
+        # Returns a Result like product_sale; on success result.data["taken"] lists the
+        # (product_key, units) taken from each batch.
+        if quantity <= 0:
+            return self._result(False, "invalid_quantity", "Sale failed: The quantity must be positive")
+        product_expiry = self.product_expiry.get(product_id)
+        plan = product_expiry.allocate(quantity, self.products.get) if product_expiry else None
+        if plan is None:                         # Nothing is taken unless the whole quantity is available.
+            return self._result(False, "insufficient_stock",
+                                f"Sale failed: Not enough unexpired stock for product {product_id}.")
+        taken = []
+        for product, units in plan:
+            product.quantity -= units
+            taken.append(((product.product_id, product.batch_number), units))
+        return self._result(True, "sale", f"Sale successful: Sold {quantity} units of {plan[0][0].name} from {len(plan)} batch(es).",
+                            taken=taken, quantity=quantity)
 
 if __name__ == "__main__":
     inventory = Inventory(low_stock_threshold=10)
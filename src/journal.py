@@ -0,0 +1,165 @@
+import csv
+import os
+
+try:
+    from .metrics import metrics
+except ImportError:  # Running as a script from inside src/
+    from metrics import metrics
+
+# Append-only journal of sales and stock changes.
+# Rewriting products.csv and sales.csv after every sale gets slower as the history grows,
+# so in journal mode each change is appended here as one row instead.
+# compact() in ShopSystem folds the journal back into the CSV snapshot files.
+#
+# A journal starts with "base" records holding the stamps (see file_stamp) of products.csv and
+# sales.csv as they were when it was started. Compaction rewrites those files before it clears
+# the journal, so after a crash in between the stamps no longer match and the journalled
+# changes already in the rewritten file are not applied a second time.
+
+JOURNAL_FILE = "shop_journal.csv"
+
+JOURNAL_FIELDS = [
+    "record_type",      # sale, stock, price, product or remove
+    "sale_id",
+    "product_id",
+    "batch_number",
+    "name",
+    "price",
+    "quantity",         # quantity sold for "sale", signed stock change for "stock"
+    "expiry_date",
+    "date",
+    "category",         # Last so journals written before it was added still line up
+    "stamp",            # File stamp of a "base" record, whose name is "products" or "sales"
+]
+
+
+class Journal:
+    def __init__(self, filename=JOURNAL_FILE, fsync_every=1, compact_every=1000):
+        self.filename = filename
+        self.fsync_every = fsync_every          # 0 = never fsync, 1 = every record, N = every N records
+        self.compact_every = compact_every      # Number of records before ShopSystem compacts, 0 = never
+        self.record_count = self._count_existing()
+        self.stamps = None      # Callable returning {"products": stamp, "sales": stamp}, set by ShopSystem
+        self._unsynced = 0
+        self._file = None
+        self._writer = None
+
+    def _count_existing(self):
+        if not os.path.exists(self.filename):
+            return 0
+        with open(self.filename, newline="") as file:
+            # Minus the header row, base records are not changes to compact
+            return max(sum(1 for line in file if not line.startswith("base,")) - 1, 0)
+
+    def _open(self):
+        if self._file is None:
+            is_new = not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0
+            self._file = open(self.filename, "a", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=JOURNAL_FIELDS)
+            if is_new:
+                self._writer.writeheader()
+                self._writer.writerows(self._base_rows())
+        return self._writer
+
+    def _base_rows(self):
+        stamps = self.stamps() if self.stamps is not None else {}
+        return [{"record_type": "base", "name": part, "stamp": stamp} for part, stamp in stamps.items()]
+
+    # ---------- Appending ----------
+    def append(self, record_type, **fields):
+        writer = self._open()
+        row = {"record_type": record_type}
+        row.update(fields)
+        writer.writerow(row)
+        self._file.flush()
+        self.record_count += 1
+        self._unsynced += 1
+        if self.fsync_every and self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def append_sale(self, sale):
+        self.append("sale", sale_id=sale.sale_id, product_id=sale.product_id,
+                    batch_number=sale.batch_number, price=sale.price,
+                    quantity=sale.quantity_sold, date=sale.date_of_sale)
+
+    def append_sales(self, sales):
+        # Bulk version of append_sale: one write and at most one fsync for the whole batch
+        writer = self._open()
+        writer.writerows({"record_type": "sale", "sale_id": sale.sale_id, "product_id": sale.product_id,
+                          "batch_number": sale.batch_number, "price": sale.price,
+                          "quantity": sale.quantity_sold, "date": sale.date_of_sale} for sale in sales)
+        self._file.flush()
+        self.record_count += len(sales)
+        self._unsynced += len(sales)
+        if self.fsync_every:
+            self.sync()
+
+    def append_stock(self, product, delta):
+        self.append("stock", product_id=product.product_id,
+                    batch_number=product.batch_number, quantity=delta)
+
+    def append_price(self, product):
+        self.append("price", product_id=product.product_id,
+                    batch_number=product.batch_number, price=product.price)
+
+    def append_product(self, product):
+        self.append("product", product_id=product.product_id, batch_number=product.batch_number,
+                    name=product.name, price=product.price, quantity=product.quantity,
+                    expiry_date=product.expiry_date, category=product.category)
+
+    def append_remove(self, product):
+        self.append("remove", product_id=product.product_id, batch_number=product.batch_number)
+
+    @metrics.timed("journal.sync")
+    def sync(self):
+        if self._file is not None and self._unsynced:
+            metrics.count("journal.fsyncs")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    # ---------- Reading ----------
+    def _rows(self):
+        if not os.path.exists(self.filename):
+            return
+        if self._file is not None:
+            self._file.flush()
+        with open(self.filename, newline="") as file:
+            yield from csv.DictReader(file)
+
+    def records(self):
+        # Rows are yielded in the order they were written so they can be replayed over a snapshot
+        return (rec for rec in self._rows() if rec["record_type"] != "base")
+
+    def base(self):
+        # {part: stamp} from the base records, None for a journal written without them
+        base = {}
+        for rec in self._rows():
+            if rec["record_type"] != "base":
+                break
+            base[rec["name"]] = rec["stamp"]
+        return base or None
+
+    def needs_compaction(self):
+        return bool(self.compact_every) and self.record_count >= self.compact_every
+
+    def clear(self):
+        # Called once the snapshots hold every journalled change. The empty journal is swapped
+        # in whole, with the stamps of the files just written as its base.
+        self.close()
+        tmp = self.filename + ".tmp"
+        with open(tmp, "w", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=JOURNAL_FIELDS)
+            writer.writeheader()
+            writer.writerows(self._base_rows())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self.filename)
+        self.record_count = 0
+
+    def close(self):
+        if self._file is not None:
+            self.sync()
+            self._file.close()
+            self._file = None
+            self._writer = None
@@ -0,0 +1,236 @@
+import argparse
+import csv
+import importlib
+import os
+import sys
+from datetime import date
+
+# Command line for the shop, for scripts and cron jobs as well as the menu.
+#   python main.py                                  -> the interactive menu, as shopsystem.py
+#   python main.py sell P001 3                      -> sells 3 units, soonest expiry first
+#   python main.py restock P001 B004 50 --price 70 --expiry 2026-12-31
+#   python main.py stock P001                       -> the batches of one product
+#   python main.py report sales --from 2026-01-01 --to 2026-01-31 --period week
+#   python main.py report removed --reason Expired
+#   python main.py expire                           -> removes expired batches, e.g. from cron at midnight
+#   python main.py import export.csv                -> records a POS export, as pos_import.py
+# A one-shot command loads only what it needs: sell, restock and stock read the batches of
+# their own products and no sales, reports stream the sales or removals in their date range
+# without loading any products, and expire loads the products but no sales. Shop modules are
+# imported by the commands that use them (and by ShopSystem where it first needs them), so a
+# sale never imports the search, best seller, archive or sweeper code.
+# Nothing is saved by rewriting the data files afterwards, each change is appended to the
+# journal (or updated in the database) as it is made; the menu compacts the journal later.
+# The data files are in the folder of this file unless --data is given.
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load(name):
+    # A module of this package, imported on first use (as a package or as a script from inside src/)
+    return importlib.import_module(f"{__package__}.{name}" if __package__ else name)
+
+
+def parse_day(text):
+    try:
+        return date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {text!r}, expected YYYY-MM-DD")
+
+
+def open_system(args):
+    shopsystem, storage_module, journal = load("shopsystem"), load("storage"), load("journal")
+    folder = args.data
+    if args.db:
+        return shopsystem.ShopSystem(storage=storage_module.SqliteStorage(os.path.join(folder, args.db)))
+    files = (os.path.join(folder, "products.csv"), os.path.join(folder, "sales.csv"),
+             os.path.join(folder, storage_module.REMOVED_FILE))
+    if args.archive:
+        storage = load("archive").ArchiveStorage(*files, period=args.archive)
+    else:
+        storage = load("snapshot").SnapshotStorage(*files)
+    return shopsystem.ShopSystem(journal=journal.Journal(os.path.join(folder, journal.JOURNAL_FILE)),
+                                 storage=storage)
+
+
+def close_system(system):
+    if system.journal is not None:
+        system.journal.close()
+    system.storage.close()
+
+
+# ---------- Commands ----------
+# Each takes the system and the parsed arguments and returns the exit status
+def menu(system, args):
+    return system.run(sweep=not args.no_sweep)
+
+
+def sell(system, args):
+    system.load_products(product_ids=[args.product_id])
+    if not system.sale_ids.high:
+        system.load_sale_ids()      # No sale ID high-water mark saved yet
+    line = {"product_id": args.product_id, "quantity_sold": args.quantity,
+            "batch_number": args.batch or "", "date_of_sale": date.today()}
+    sales, failures = system.record_sales([line])
+    for _, reason in failures:
+        print(f"Sale failed: {reason}", file=sys.stderr)
+    if not sales:
+        return 1
+    for sale in sales:
+        print(f"{sale.sale_id}: {sale.quantity_sold} x {sale.product_id} from batch {sale.batch_number} at {sale.price}")
+    print(f"Revenue: {sum(sale.total for sale in sales)}")
+    return 0
+
+
+def restock(system, args):
+    system.load_products(product_ids=[args.product_id])
+    try:
+        p = system.restock(args.product_id, args.batch_number, args.quantity, name=args.name,
+                           price=args.price, expiry_date=args.expiry, category=args.category)
+    except (ValueError, load("storage").StorageError) as e:
+        print(f"Restock failed: {e}", file=sys.stderr)
+        return 1
+    print(f"{p.product_id} {p.batch_number} {p.name}: {p.quantity} in stock, expires {p.expiry_date}")
+    return 0
+
+
+def stock(system, args):
+    system.load_products(product_ids=[args.product_id])
+    batches = sorted(system.find_batches(args.product_id), key=lambda p: (p.expiry_date, p.batch_number))
+    if not batches:
+        print("Product not found.", file=sys.stderr)
+        return 1
+    for p in batches:
+        print(f"{p.product_id} | {p.batch_number} | {p.name} | {p.category} | {p.price} | {p.quantity} | {p.expiry_date}")
+    print(f"Total: {sum(p.quantity for p in batches)}")
+    return 0
+
+
+def report_sales(system, args):
+    rollup = system.rollup_between(args.start, args.end)
+    print(f"{'Period starting':<16}| Revenue")
+    for first, revenue in rollup.revenue_by_period(args.period, args.start, args.end).items():
+        print(f"{str(first):<16}| {revenue}")
+    print(f"Total revenue: {rollup.revenue(args.start, args.end)}")
+    if args.top:
+        print(f"\nTop {args.top} products by revenue")
+        for product_id, revenue in rollup.top_products(args.top, args.start, args.end):
+            print(f"{product_id:<16}| {revenue}")
+    return 0
+
+
+def report_removed(system, args):
+    # Log format: [product_id, batch_number, name, price, quantity, expiry_date, reason, removal_date]
+    for row in system.iter_removed(args.start, args.end, args.reason, 0, args.limit):
+        print(" | ".join(row))
+    print(f"{system.storage.count_removed(args.start, args.end, args.reason)} removed batch(es)")
+    return 0
+
+
+def expire(system, args):
+    system.load_products()
+    removed = system.sweep_expired(args.today)
+    for p in removed:
+        print(f"Removed {p.product_id} {p.batch_number} {p.name} (expired {p.expiry_date})")
+    print(f"{len(removed)} expired batch(es) removed.")
+    return 0
+
+
+def import_sales(system, args):
+    with open(args.export_file, newline="") as file:
+        lines = list(csv.DictReader(file))
+    system.load_products(product_ids={(line.get("product_id") or "").strip() for line in lines})
+    if not system.sale_ids.high or any((line.get("sale_id") or "").strip() for line in lines):
+        system.load_sale_ids()      # Given sale IDs are checked against every sale recorded so far
+    sales, failures = system.record_sales(lines)
+    for line_number, reason in failures:
+        print(f"Line {line_number}: {reason}")
+    print(f"Recorded {len(sales)} sale lines, {len(failures)} lines failed.")
+    return 1 if failures else 0
+
+
+READ_ONLY = (stock, report_sales, report_removed)
+LOCK_WAIT = 5       # Seconds a command waits for the data lock held by another command
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="shop", description="Inventory and sales tracking for a small shop.")
+    parser.add_argument("--data", default=DATA_DIR, help="folder with the data files (default: the folder of main.py)")
+    parser.add_argument("--db", help="SQLite database to use instead of the CSV files (see migrate_to_sqlite.py)")
+    parser.add_argument("--archive", nargs="?", const="month", choices=["day", "week", "month", "year"],
+                        help="sales kept in files per month (or the given period), see archive.py")
+    parser.add_argument("--no-sweep", action="store_true", help="menu only: no background removal of expired stock")
+    parser.set_defaults(command=menu)
+    commands = parser.add_subparsers(title="commands")
+
+    command = commands.add_parser("sell", help="sell a quantity of a product")
+    command.add_argument("product_id")
+    command.add_argument("quantity", type=int)
+    command.add_argument("--batch", help="sell from this batch instead of the soonest expiring first")
+    command.set_defaults(command=sell)
+
+    command = commands.add_parser("restock", help="add stock to a batch, or add a new batch")
+    command.add_argument("product_id")
+    command.add_argument("batch_number")
+    command.add_argument("quantity", type=int)
+    command.add_argument("--name", help="needed for a new product")
+    command.add_argument("--price", type=float, help="needed for a new batch")
+    command.add_argument("--expiry", type=parse_day, help="expiry date of a new batch (YYYY-MM-DD)")
+    command.add_argument("--category", help="category of a new product")
+    command.set_defaults(command=restock)
+
+    command = commands.add_parser("stock", help="show the batches of a product")
+    command.add_argument("product_id")
+    command.set_defaults(command=stock)
+
+    command = commands.add_parser("report", help="sales or removed stock in a date range")
+    reports = command.add_subparsers(title="reports", required=True)
+    for name, run, help_text in (("sales", report_sales, "revenue per period"),
+                                 ("removed", report_removed, "removed batches")):
+        report = reports.add_parser(name, help=help_text)
+        report.add_argument("--from", dest="start", type=parse_day, help="first date (YYYY-MM-DD)")
+        report.add_argument("--to", dest="end", type=parse_day, help="last date (YYYY-MM-DD)")
+        report.set_defaults(command=run)
+    reports.choices["sales"].add_argument("--period", choices=["day", "week", "month"], default="day")
+    reports.choices["sales"].add_argument("--top", type=int, default=5, help="best selling products to list (0 for none)")
+    reports.choices["removed"].add_argument("--reason", help="only this removal reason, e.g. Expired")
+    reports.choices["removed"].add_argument("--limit", type=int, help="at most this many rows")
+
+    command = commands.add_parser("expire", help="remove and log expired batches")
+    command.add_argument("--today", type=parse_day, help="remove batches that expired before this date")
+    command.set_defaults(command=expire)
+
+    command = commands.add_parser("import", help="record every sale in a POS export file (see pos_import.py)")
+    command.add_argument("export_file")
+    command.set_defaults(command=import_sales)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    system = open_system(args)
+    if args.command is menu:
+        return menu(system, args)       # Saves and closes on exit
+    # One-shot commands never load everything, so nothing may be saved from memory.
+    # Commands that change data wait briefly for the data lock and are refused while the menu,
+    # the service or another command holds it; stock and reports only read.
+    system.partial_load = True
+    # A one-shot command makes one change and exits, so a block of IDs would mostly be skipped
+    # (S004, S024, S044, ...). It saves the exact mark instead, one write as with a block.
+    system.sale_ids.block_size = system.product_ids.block_size = 1
+    data_lock = None
+    try:
+        if args.command not in READ_ONLY:
+            data_lock = load("storage").DataLock(system.storage.lock_file).acquire(LOCK_WAIT)
+        return args.command(system, args)
+    except load("storage").StorageError as e:
+        print(e, file=sys.stderr)
+        return 1
+    finally:
+        close_system(system)
+        if data_lock is not None:
+            data_lock.release()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
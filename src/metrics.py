@@ -0,0 +1,162 @@
+import functools
+import io
+import os
+import time
+from bisect import bisect_left
+
+# In-process timers and counters for the hot paths of ShopSystem and Inventory.
+# Off by default: a timed function then only pays for one extra call and attribute check
+# (a few hundred nanoseconds), so single dict lookups such as find_batch are left untimed.
+# Turn it on with SHOP_METRICS=1, or metrics.enable() / the "Metrics" menu option.
+#
+# SHOP_PROFILE=cpu or SHOP_PROFILE=memory (or --profile on the command line) also records
+# a cProfile or tracemalloc capture, written to shop_profile.txt by stop_profiling().
+# cProfile, pstats and tracemalloc are only imported when profiling starts, they add about
+# 20 ms to the start-up of every command otherwise.
+
+# Histogram bucket upper bounds in seconds: 1 microsecond to about 100 seconds, 8 buckets per decade
+BOUNDS = [10 ** (exponent / 8) for exponent in range(-48, 17)]
+PROFILE_FILE = "shop_profile.txt"
+
+
+class Histogram:
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.buckets = [0] * (len(BOUNDS) + 1)      # Last bucket holds anything slower than BOUNDS[-1]
+
+    def record(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(BOUNDS, seconds)] += 1
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile, within 33% of the real value
+        if not self.count:
+            return 0.0
+        rank = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min(BOUNDS[i], self.max) if i < len(BOUNDS) else self.max
+        return self.max
+
+    def summary(self):
+        return {"count": self.count, "total": self.total, "mean": self.total / self.count if self.count else 0.0,
+                "min": self.min or 0.0, "max": self.max, "p50": self.percentile(50), "p99": self.percentile(99)}
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.timers = {}            # name -> Histogram
+        self.counters = {}          # name -> int
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.timers = {}
+        self.counters = {}
+
+    def record(self, name, seconds):
+        histogram = self.timers.get(name)
+        if histogram is None:
+            histogram = self.timers[name] = Histogram()
+        histogram.record(seconds)
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def timed(self, name):
+        # Decorator timing every call of a function under `name`
+        def decorate(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - start)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        return {"timers": {name: h.summary() for name, h in sorted(self.timers.items())},
+                "counters": dict(sorted(self.counters.items()))}
+
+    def report(self):
+        # Printable lines: one per timer with p50/p99 in milliseconds, then the counters
+        lines = [f"{'Timer':<28}{'Calls':>8}{'p50 ms':>10}{'p99 ms':>10}{'Max ms':>10}{'Total ms':>11}"]
+        for name, h in sorted(self.timers.items()):
+            lines.append(f"{name:<28}{h.count:>8}{h.percentile(50) * 1000:>10.3f}{h.percentile(99) * 1000:>10.3f}"
+                         f"{h.max * 1000:>10.3f}{h.total * 1000:>11.1f}")
+        lines.append(f"\n{'Counter':<28}{'Value':>8}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<28}{value:>8}")
+        return lines
+
+
+metrics = Metrics(enabled=os.environ.get("SHOP_METRICS", "") not in ("", "0"))
+
+
+# ---------- Profiling ----------
+_profiler = None
+_profile_mode = None
+
+
+def start_profiling(mode=None):
+    # mode is "cpu" (cProfile) or "memory" (tracemalloc), SHOP_PROFILE by default. Also turns metrics on.
+    global _profiler, _profile_mode
+    mode = mode or os.environ.get("SHOP_PROFILE")
+    if mode not in ("cpu", "memory"):
+        return False
+    _profile_mode = mode
+    metrics.enable()
+    if mode == "cpu":
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+    else:
+        import tracemalloc
+        tracemalloc.start(10)
+    return True
+
+
+def stop_profiling(filename=PROFILE_FILE, limit=30):
+    # Writes the capture to `filename`, returns the file name or None when nothing was captured
+    global _profiler, _profile_mode
+    if _profile_mode is None:
+        return None
+    out = io.StringIO()
+    if _profile_mode == "cpu":
+        import pstats
+        _profiler.disable()
+        pstats.Stats(_profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        _profiler = None
+    else:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        out.write(f"Current {current / 1024:.1f} KiB, peak {peak / 1024:.1f} KiB\n\n")
+        for stat in snapshot.statistics("lineno")[:limit]:
+            out.write(f"{stat}\n")
+    out.write("\n" + "\n".join(metrics.report()) + "\n")
+    with open(filename, "w") as file:
+        file.write(out.getvalue())
+    _profile_mode = None
+    return filename
@@ -0,0 +1,25 @@
+import sys
+
+try:
+    from .storage import SqliteStorage
+except ImportError:  # Running as a script from inside src/
+    from storage import SqliteStorage
+
+# Imports products.csv, sales.csv and removed_products.csv into a SQLite database
+# that follows groupF_ddl.sql, so ShopSystem can run on SqliteStorage.
+# Usage: python migrate_to_sqlite.py [database file]
+
+def migrate(db_file="shop.db", products_file="products.csv", sales_file="sales.csv",
+            removed_file="removed_products.csv"):
+    storage = SqliteStorage(db_file)
+    try:
+        counts = storage.import_csv(products_file, sales_file, removed_file)
+    finally:
+        storage.close()
+    print(f"Imported {counts['products']} batches, {counts['removed']} removed batches "
+          f"and {counts['sales']} sales into {db_file} ({counts['skipped']} rows skipped).")
+    return counts
+
+
+if __name__ == "__main__":
+    migrate(*sys.argv[1:2])
@@ -0,0 +1,168 @@
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+from sys import intern
+
+# The one Product and Sale used by ShopSystem, Inventory and the older product.py/sale.py modules.
+# __slots__ removes the per-object __dict__, which is most of the memory of a small record.
+# Sale interns its product and batch IDs so the repeated IDs of a long history share one string.
+# Dates are parsed with date.fromisoformat instead of strptime.
+
+DEFAULT_CATEGORY = "General"    # Same default as the category column in groupF_ddl.sql
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    try:
+        return date.fromisoformat(text)         # Fast path for YYYY-MM-DD
+    except ValueError:
+        return datetime.strptime(text.strip(), "%Y-%m-%d").date()
+
+
+def parse_date(value):
+    # Accepts a date or a "YYYY-MM-DD" string. Sales share few distinct dates, so parsed strings are cached.
+    if isinstance(value, str):
+        return _parse_date_text(value)
+    return value
+
+
+# ===================== Product =====================
+class Product:
+    __slots__ = ("product_id", "batch_number", "name", "category", "price", "_quantity", "expiry_date", "_owner")
+
+    def __init__(self, product_id, batch_number, name, price, quantity, expiry_date, category=DEFAULT_CATEGORY):
+        self._owner = None                     # Inventory holding this batch, told about quantity changes
+        self.product_id = product_id           # Unique identifier for the product
+        self.batch_number = batch_number       # Identifies the batch of the product
+        self.name = name
+        self.category = category or DEFAULT_CATEGORY
+        self.price = float(price)
+        self.quantity = int(quantity)
+        self.expiry_date = parse_date(expiry_date)
+
+    @property
+    def quantity(self):
+        return self._quantity
+
+    @quantity.setter
+    def quantity(self, value):
+        # Every stock change goes through here, so the owner can keep its totals up to date
+        old = getattr(self, "_quantity", None)
+        self._quantity = value
+        if self._owner is not None and old is not None:
+            self._owner._quantity_changed(self, old)
+
+    def update_quantity(self, amount):
+        self.quantity += amount
+
+    def update_price(self, new_price):
+        self.price = new_price
+
+    def is_expired(self):
+        return date.today() > self.expiry_date
+
+    def is_expiring_soon(self, days):
+        remaining_days = (self.expiry_date - date.today()).days
+        return 0 <= remaining_days <= days
+
+    def as_row(self):
+        return {
+            "product_id": self.product_id,
+            "batch_number": self.batch_number,
+            "name": self.name,
+            "category": self.category,
+            "price": self.price,
+            "quantity": self.quantity,
+            "expiry_date": self.expiry_date,
+        }
+
+
+# ===================== Sale =====================
+class Sale:
+    __slots__ = ("sale_id", "product_id", "batch_number", "quantity_sold", "price", "total", "date_of_sale")
+
+    def __init__(self, sale_id, product_id, batch_number, quantity_sold, price, date_of_sale):
+        self.sale_id = sale_id
+        self.product_id = intern(product_id)
+        self.batch_number = intern(batch_number)
+        self.quantity_sold = int(quantity_sold)
+        self.price = float(price)
+        self.total = self.quantity_sold * self.price
+        self.date_of_sale = parse_date(date_of_sale)
+
+    def as_row(self):
+        return {
+            "sale_id": self.sale_id,
+            "product_id": self.product_id,
+            "batch_number": self.batch_number,
+            "quantity_sold": self.quantity_sold,
+            "price": self.price,
+            "total": self.total,
+            "date_of_sale": self.date_of_sale,
+        }
+
+
+# ===================== Columnar sales =====================
+class SalesColumns:
+    # Column store for bulk sales history. Numbers live in typed arrays (8 bytes each) and the
+    # product/batch pair is stored once in a table and referenced by a small integer code,
+    # instead of keeping one Python object per sale.
+    def __init__(self, sales=()):
+        self.sale_ids = []
+        self.batch_codes = array("l")
+        self.quantities = array("l")
+        self.prices = array("d")
+        self.dates = array("l")                 # date.toordinal() of each sale
+        self.batch_keys = []                    # code -> (product_id, batch_number)
+        self._codes = {}                        # (product_id, batch_number) -> code
+        for sale in sales:
+            self.append(sale)
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def _code(self, product_id, batch_number):
+        key = (product_id, batch_number)
+        code = self._codes.get(key)
+        if code is None:
+            code = len(self.batch_keys)
+            self._codes[key] = code
+            self.batch_keys.append(key)
+        return code
+
+    def append(self, sale):
+        self.sale_ids.append(sale.sale_id)
+        self.batch_codes.append(self._code(sale.product_id, sale.batch_number))
+        self.quantities.append(sale.quantity_sold)
+        self.prices.append(sale.price)
+        self.dates.append(sale.date_of_sale.toordinal())
+
+    def append_row(self, row):
+        # Takes a CSV row directly so bulk loads never build Sale objects
+        self.sale_ids.append(row["sale_id"])
+        self.batch_codes.append(self._code(row["product_id"], row["batch_number"]))
+        self.quantities.append(int(row["quantity_sold"]))
+        self.prices.append(float(row["price"]))
+        self.dates.append(parse_date(row["date_of_sale"]).toordinal())
+
+    def __getitem__(self, i):
+        # Builds a Sale only for the row that is asked for
+        product_id, batch_number = self.batch_keys[self.batch_codes[i]]
+        return Sale(self.sale_ids[i], product_id, batch_number,
+                    self.quantities[i], self.prices[i], date.fromordinal(self.dates[i]))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def revenue(self, start=None, end=None):
+        # Total revenue, optionally only for sales between two dates (both included)
+        low = start.toordinal() if start else None
+        high = end.toordinal() if end else None
+        total = 0.0
+        for q, p, d in zip(self.quantities, self.prices, self.dates):
+            if (low is None or d >= low) and (high is None or d <= high):
+                total += q * p
+        return total
+
+    def quantity_sold(self):
+        return sum(self.quantities)
@@ -1,4 +1,15 @@
 import csv
+import sys
+
+from datagen import write_sales
+
+# python "populate _sales.py"                   -> the three sample sales below
+# python "populate _sales.py" 1000000 100000    -> that many generated sales over that many batches
+
+if len(sys.argv) > 1:
+    write_sales("sales.csv", int(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else 1000)
+    print(f"sales.csv populated with {sys.argv[1]} generated sales!")
+    sys.exit()
 
 sales = [
     {"sale_id": "S001", "product_id": "P001", "batch_number": "B001", "quantity_sold": 2, "price": 2500, "date_of_sale": "2026-01-05"},
@@ -1,12 +1,19 @@
 
 import csv
+import sys
 from datetime import date
 
+from datagen import write_products
+
+# python populate_products.py           -> the five sample products below
+# python populate_products.py 100000    -> that many generated product batches
+
 products = [
     {
         "product_id": "P001",
         "batch_number": "B001",
         "name": "Sugar",
+        "category": "Groceries",
         "price": 2500,
         "quantity": 10,
         "expiry_date": date(2026, 12, 31)
@@ -15,6 +22,7 @@ products = [
         "product_id": "P002",
         "batch_number": "B001",
         "name": "Milk",
+        "category": "Dairy",
         "price": 1500,
         "quantity": 20,
         "expiry_date": date(2026, 1, 15)
@@ -23,6 +31,7 @@ products = [
         "product_id": "P003",
         "batch_number": "B001",
         "name": "Bread",
+        "category": "Bakery",
         "price": 1200,
         "quantity": 15,
         "expiry_date": date(2026, 1, 10)
@@ -31,6 +40,7 @@ products = [
         "product_id": "P004",
         "batch_number": "B001",
         "name": "Butter",
+        "category": "Dairy",
         "price": 3500,
         "quantity": 5,
         "expiry_date": date(2026, 3, 5)
@@ -39,17 +49,24 @@ products = [
         "product_id": "P005",
         "batch_number": "B001",
         "name": "Eggs",
+        "category": "Dairy",
         "price": 800,
         "quantity": 30,
         "expiry_date": date(2026, 1, 12)
     }
 ]
 
+if len(sys.argv) > 1:
+    write_products("products.csv", int(sys.argv[1]))
+    print(f"products.csv populated with {sys.argv[1]} generated batches!")
+    sys.exit()
+
 with open("products.csv", "w", newline="") as file:
     fieldnames = [
         "product_id",
         "batch_number",
         "name",
+        "category",
         "price",
         "quantity",
         "expiry_date"
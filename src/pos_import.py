@@ -0,0 +1,32 @@
+import argparse
+import csv
+
+try:
+    from .main import main as shop_main
+except ImportError:  # Running as a script from inside src/
+    from main import main as shop_main
+
+# Imports a POS export (CSV) into the shop in one pass.
+# Columns: product_id, quantity_sold and optionally sale_id, batch_number, date_of_sale.
+# Usage: python pos_import.py export.csv [--db shop.db] [--data folder], the same as
+#        python main.py import export.csv
+
+def import_pos_file(system, filename):
+    with open(filename, newline="") as file:
+        return system.record_sales(csv.DictReader(file))
+
+
+def main(argv=None):
+    # The import command of main.py, so both record the export the same way
+    parser = argparse.ArgumentParser(description="Record every sale in a POS export file.")
+    parser.add_argument("export_file", help="CSV file exported from the till")
+    parser.add_argument("--db", help="use this SQLite database instead of the CSV files")
+    parser.add_argument("--data", help="folder with the data files (default: the folder of main.py)")
+    args = parser.parse_args(argv)
+
+    options = (["--db", args.db] if args.db else []) + (["--data", args.data] if args.data else [])
+    return shop_main(options + ["import", args.export_file])
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,131 @@
+import csv
+from datetime import timedelta
+
+try:
+    from .models import parse_date
+except ImportError:  # Running as a script from inside src/
+    from models import parse_date
+
+# Sales totals kept up to date as sales are recorded, so reports never loop over the raw history.
+# Daily totals are keyed by (date, product_id). Weekly and monthly totals are kept next to them,
+# keyed by the Monday of the week or the first day of the month.
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+class SalesRollup:
+    def __init__(self):
+        self.daily = {}         # (date, product_id) -> [quantity, revenue]
+        self.weekly = {}        # (monday, product_id) -> [quantity, revenue]
+        self.monthly = {}       # (first of month, product_id) -> [quantity, revenue]
+        self.day_totals = {}    # date -> [quantity, revenue]
+
+    def add(self, sale):
+        self.add_values(sale.date_of_sale, sale.product_id, sale.quantity_sold, sale.total)
+
+    def add_values(self, day, product_id, quantity, revenue):
+        for table, key in (
+            (self.daily, (day, product_id)),
+            (self.weekly, (week_start(day), product_id)),
+            (self.monthly, (month_start(day), product_id)),
+            (self.day_totals, day),
+        ):
+            totals = table.get(key)
+            if totals is None:
+                table[key] = [quantity, revenue]
+            else:
+                totals[0] += quantity
+                totals[1] += revenue
+
+    def add_all(self, sales):
+        for sale in sales:
+            self.add(sale)
+
+    def remove_all(self, sales):
+        # Takes back sales that were added but could not be stored, dropping totals that fall to zero
+        for sale in sales:
+            day, product_id = sale.date_of_sale, sale.product_id
+            for table, key in (
+                (self.daily, (day, product_id)),
+                (self.weekly, (week_start(day), product_id)),
+                (self.monthly, (month_start(day), product_id)),
+                (self.day_totals, day),
+            ):
+                totals = table[key]
+                totals[0] -= sale.quantity_sold
+                totals[1] -= sale.total
+                if totals[0] == 0:
+                    del table[key]
+
+    def add_rollup(self, other):
+        # Adds the totals of another rollup, e.g. of one archive partition
+        for (day, product_id), (quantity, revenue) in other.daily.items():
+            self.add_values(day, product_id, quantity, revenue)
+
+    # ---------- Reports ----------
+    def revenue(self, start=None, end=None):
+        # Revenue for the days between start and end (both included), from the per-day totals
+        return sum(totals[1] for day, totals in self.day_totals.items()
+                   if (start is None or day >= start) and (end is None or day <= end))
+
+    def revenue_by_period(self, period="day", start=None, end=None):
+        # {period start: revenue}, period is "day", "week" or "month". With start/end only the
+        # days between them (both included) count, summed from the per-day totals.
+        result = {}
+        if start is None and end is None:
+            table = {"day": self.daily, "week": self.weekly, "month": self.monthly}[period]
+            for (first, _), totals in table.items():
+                result[first] = result.get(first, 0) + totals[1]
+        else:
+            period_start = {"day": lambda day: day, "week": week_start, "month": month_start}[period]
+            for day, totals in self.day_totals.items():
+                if (start is None or day >= start) and (end is None or day <= end):
+                    first = period_start(day)
+                    result[first] = result.get(first, 0) + totals[1]
+        return dict(sorted(result.items()))
+
+    def top_products(self, n=10, start=None, end=None, by="revenue"):
+        # The n best products between two dates, by "revenue" or "quantity"
+        column = 1 if by == "revenue" else 0
+        per_product = {}
+        for (day, product_id), totals in self.daily.items():
+            if (start is None or day >= start) and (end is None or day <= end):
+                per_product[product_id] = per_product.get(product_id, 0) + totals[column]
+        return sorted(per_product.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    # ---------- Rebuilding ----------
+    @classmethod
+    def from_sales_file(cls, filename="sales.csv"):
+        # Rebuilds the rollups straight from the CSV rows, without building Sale objects
+        rollup = cls()
+        with open(filename, newline="") as file:
+            for row in csv.DictReader(file):
+                try:
+                    quantity = int(row["quantity_sold"])
+                    rollup.add_values(parse_date(row["date_of_sale"]), row["product_id"],
+                                      quantity, quantity * float(row["price"]))
+                except (KeyError, ValueError):
+                    print(f"Skipping bad sale row: {row}")
+        return rollup
+
+    def save(self, filename="sales_rollup.csv"):
+        # Stores the daily table, the weekly and monthly ones are rebuilt from it on load
+        with open(filename, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["date", "product_id", "quantity", "revenue"])
+            for (day, product_id), (quantity, revenue) in sorted(self.daily.items()):
+                writer.writerow([day, product_id, quantity, revenue])
+
+    @classmethod
+    def load(cls, filename="sales_rollup.csv"):
+        rollup = cls()
+        with open(filename, newline="") as file:
+            for row in csv.DictReader(file):
+                rollup.add_values(parse_date(row["date"]), row["product_id"],
+                                  int(row["quantity"]), float(row["revenue"]))
+        return rollup
@@ -1,12 +1,29 @@
 from datetime import date
-class Sale:
+
+try:
+    from .models import Sale as SaleRecord
+except ImportError:  # Running as a script from inside src/
+    from models import Sale as SaleRecord
+
+# Till-side sale without a sale ID. It is stored in the shared Sale slots from models.py,
+# the names below keep the original API working.
+class Sale(SaleRecord):
+    __slots__ = ()
+
     def __init__(self, product_id, batch_number, quantity_sold, price_per_unit):
-        self.product_id = product_id
-        self.batch_number = batch_number
-        self.quantity_sold = quantity_sold
-        self.price_per_unit = price_per_unit
-        self.total_price = self.calculate_total()
-        self.sale_date = date.today()
+        super().__init__(None, product_id, batch_number, quantity_sold, price_per_unit, date.today())
+
+    @property
+    def price_per_unit(self):
+        return self.price
+
+    @property
+    def total_price(self):
+        return self.total
+
+    @property
+    def sale_date(self):
+        return self.date_of_sale
 
     def calculate_total(self):
         return self.quantity_sold * self.price_per_unit
@@ -0,0 +1,292 @@
+import re
+import unicodedata
+
+# Product search for the till: results while the clerk types, so every lookup has to stay
+# well under a millisecond on a large catalog.
+# Names are normalized (lowercase, accents removed) and split into words (tokens).
+#   tokens     token -> batch keys of the products whose name has that word (inverted index)
+#   trie       every token letter by letter, for prefix lookups ("mil" -> milk, millet) and
+#              for typo-tolerant lookups, which walk the trie with a row of the edit distance
+#              table per letter. Each node counts the batch keys of the tokens below it, so the
+#              size of a prefix lookup is known without listing its tokens.
+#   trigrams   three-letter piece -> tokens containing it, for lookups inside a word ("ogh" -> yoghurt)
+#   categories normalized category -> batch keys
+# A batch key is (product_id, batch_number), as in ShopSystem.batch_index.
+
+END = ""        # Trie key marking that the path so far is a whole token
+COUNT = "#"     # Trie key holding the number of batch keys of the tokens at and below a node
+WORD = re.compile(r"[a-z0-9]+")
+EXACT, PREFIX, FUZZY = "exact", "prefix", "fuzzy"
+
+
+def normalize(text):
+    # "Crème Fraîche" -> "creme fraiche"
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def tokenize(text):
+    return WORD.findall(normalize(text))
+
+
+def max_typos(token):
+    # Short words would match almost anything with a typo allowed
+    return 0 if len(token) < 3 else 1 if len(token) < 6 else 2
+
+
+class ProductSearch:
+    def __init__(self, products=()):
+        self.tokens = {}            # token -> set of batch keys
+        self.trie = {}              # nested {letter: node}, node[END] = token, node[COUNT] = keys below
+        self.trigrams = {}          # trigram -> set of tokens
+        self.categories = {}        # normalized category -> set of batch keys
+        self.names = {}             # batch key -> (normalized name, tokens, normalized category)
+        self._listings = {}         # normalized category -> its batch keys sorted by name, built on first use
+        for product in products:
+            self.add(product)
+
+    def __len__(self):
+        return len(self.names)
+
+    # ---------- Keeping the index up to date ----------
+    def add(self, product):
+        key = (product.product_id, product.batch_number)
+        if key in self.names:
+            self.remove(product)
+        name = normalize(product.name)
+        tokens = tuple(dict.fromkeys(WORD.findall(name)))
+        category = normalize(product.category)
+        self.names[key] = (name, tokens, category)
+        for token in tokens:
+            keys = self.tokens.get(token)
+            if keys is None:
+                keys = self.tokens[token] = set()
+                for i in range(len(token) - 2):
+                    self.trigrams.setdefault(token[i:i + 3], set()).add(token)
+            keys.add(key)
+            node = self.trie
+            for ch in token:
+                node = node.setdefault(ch, {})
+                node[COUNT] = node.get(COUNT, 0) + 1
+            node[END] = token
+        self.categories.setdefault(category, set()).add(key)
+        self._listings.pop(category, None)
+
+    def remove(self, product):
+        key = (product.product_id, product.batch_number)
+        entry = self.names.pop(key, None)
+        if entry is None:
+            return False
+        _, tokens, category = entry
+        for token in tokens:
+            keys = self.tokens[token]
+            keys.discard(key)
+            if not keys:
+                del self.tokens[token]
+                for i in range(len(token) - 2):
+                    trigram = self.trigrams[token[i:i + 3]]
+                    trigram.discard(token)
+                    if not trigram:
+                        del self.trigrams[token[i:i + 3]]
+            self._untrie(token)
+        keys = self.categories[category]
+        keys.discard(key)
+        self._listings.pop(category, None)
+        if not keys:
+            del self.categories[category]
+        return True
+
+    def _untrie(self, token):
+        # Takes one batch key off the counts along the token's path, dropping nodes left empty
+        node = self.trie
+        for ch in token:
+            child = node[ch]
+            child[COUNT] -= 1
+            if not child[COUNT]:
+                del node[ch]
+                return
+            node = child
+        if token not in self.tokens:
+            del node[END]
+
+    def _node(self, prefix):
+        node = self.trie
+        for ch in prefix:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node
+
+    # ---------- Token lookups ----------
+    def prefix_tokens(self, prefix):
+        # Tokens starting with `prefix`, shortest first, so "mil" gives milk before millet.
+        # A generator: the search stops reading it once it has enough results.
+        node = self._node(prefix)
+        level = [node] if node else []
+        while level:
+            below = []
+            for n in level:
+                for ch, child in n.items():
+                    if ch == END:
+                        yield child
+                    elif ch != COUNT:
+                        below.append(child)
+            level = below
+
+    def substring_tokens(self, text):
+        # Tokens containing `text` (three letters or more), found through their trigrams
+        if len(text) < 3:
+            return []
+        candidates = None
+        for i in range(len(text) - 2):
+            tokens = self.trigrams.get(text[i:i + 3])
+            if not tokens:
+                return []
+            candidates = set(tokens) if candidates is None else candidates & tokens
+        return sorted((t for t in candidates if text in t), key=len)
+
+    def fuzzy_tokens(self, word, max_distance=None):
+        # [(distance, token)] within the edit distance of `word`, closest first. A swap of two
+        # neighbouring letters ("suagr") counts as one edit, as in the optimal string alignment
+        # distance. The trie is walked depth first keeping the last two rows of the distance
+        # table, and a branch is dropped once no entry can come back under the limit.
+        max_distance = max_typos(word) if max_distance is None else max_distance
+        found = []
+        first_row = list(range(len(word) + 1))
+        # Words are not mistyped into numbers or the other way round, which also keeps the walk
+        # out of the large number branches ("sugar 500")
+        digits = word[:1].isdigit()
+        stack = [(child, ch, first_row, None, None) for ch, child in self.trie.items()
+                 if ch not in (END, COUNT) and ch.isdigit() == digits]
+        while stack:
+            node, ch, previous, before, previous_ch = stack.pop()
+            row = [previous[0] + 1]
+            for i in range(1, len(word) + 1):
+                cost = min(row[i - 1] + 1, previous[i] + 1, previous[i - 1] + (word[i - 1] != ch))
+                if i > 1 and before is not None and word[i - 1] == previous_ch and word[i - 2] == ch:
+                    cost = min(cost, before[i - 2] + 1)
+                row.append(cost)
+            if END in node and row[-1] <= max_distance:
+                found.append((row[-1], node[END]))
+            if min(min(row), min(previous) + 1) <= max_distance:
+                stack.extend((child, c, row, previous, ch) for c, child in node.items() if c not in (END, COUNT))
+        return sorted(found, key=lambda item: (item[0], len(item[1]), item[1]))
+
+    def _plan(self, word, last):
+        # How one query word is matched, as (mode, candidate batch keys, fuzzy tokens):
+        #   EXACT   the word itself (rank 0)
+        #   PREFIX  the word or longer words starting with it (rank 1), for the word being typed
+        #           (the last one) or a word that is not in the index as typed
+        #   FUZZY   words one or two typos away (rank 2) or containing the word (rank 3),
+        #           only when nothing closer exists, so a well typed word stays cheap
+        # Returns None when nothing matches.
+        if word in self.tokens and not last:
+            return EXACT, len(self.tokens[word]), None
+        node = self._node(word)
+        if node:
+            return PREFIX, node[COUNT], None
+        ranked = {}
+        for token in self.substring_tokens(word):
+            ranked[token] = 3
+        for distance, token in self.fuzzy_tokens(word):
+            ranked[token] = 2
+        if not ranked:
+            return None
+        return FUZZY, sum(len(self.tokens[t]) for t in ranked), ranked
+
+    def matching_tokens(self, word, last=False):
+        # [(rank, token)] for one query word, best first (see _plan)
+        plan = self._plan(word, last)
+        if plan is None:
+            return []
+        return list(self._ranked_tokens(word, plan))
+
+    def _ranked_tokens(self, word, plan):
+        mode, _, ranked = plan
+        if mode == EXACT:
+            yield 0, word
+        elif mode == PREFIX:
+            for token in self.prefix_tokens(word):
+                yield (0 if token == word else 1), token
+        else:
+            yield from sorted((rank, token) for token, rank in ranked.items())
+
+    @staticmethod
+    def _rank(word, plan, tokens):
+        # Rank of the best of a candidate's tokens for a query word, or None when none matches
+        mode, _, ranked = plan
+        if mode == FUZZY:
+            return min((ranked[t] for t in tokens if t in ranked), default=None)
+        if word in tokens:
+            return 0
+        if mode == PREFIX and any(t.startswith(word) for t in tokens):
+            return 1
+        return None
+
+    # ---------- Searching ----------
+    def in_category(self, category):
+        return set(self.categories.get(normalize(category).strip(), ()))
+
+    def category_names(self):
+        return sorted(self.categories)
+
+    def _listing(self, category):
+        # A category without a query lists its products by name; sorted once, then sliced
+        if category not in self.categories:
+            return []
+        listing = self._listings.get(category)
+        if listing is None:
+            keys = self.categories[category]
+            listing = self._listings[category] = sorted(keys, key=lambda key: (self.names[key][0], key))
+        return listing
+
+    def search(self, text, limit=20, category=None):
+        # Batch keys whose name matches every word of `text`, best matches first.
+        # The query word with the fewest candidate batches drives the search and the other
+        # words are checked against each candidate's own tokens, so a short common prefix
+        # never builds a large set. Stops once `limit` keys are found.
+        words = tokenize(text)
+        category = normalize(category).strip() if category else None
+        allowed = self.categories.get(category, set()) if category else None
+        if not words:
+            return self._listing(category)[:limit] if category else []
+
+        plans = []
+        for i, word in enumerate(words):
+            plan = self._plan(word, last=i == len(words) - 1)
+            if plan is None:
+                return []
+            plans.append((word, plan))
+        driver = min(range(len(plans)), key=lambda i: plans[i][1][1])
+        others = plans[:driver] + plans[driver + 1:]
+        # Exact words (rank 0) and the category are applied as set intersections, the rest per candidate
+        filters = [self.tokens[word] for word, plan in others if plan[0] == EXACT]
+        if allowed is not None:
+            filters.append(allowed)
+        others = [(word, plan) for word, plan in others if plan[0] != EXACT]
+
+        results = []
+        seen = set()
+        for rank, token in self._ranked_tokens(*plans[driver]):
+            keys = self.tokens[token]
+            for keep in filters:
+                keys = keys & keep
+            for key in keys:
+                if key in seen:
+                    continue
+                seen.add(key)
+                name, tokens, _ = self.names[key]
+                score = rank
+                for word, plan in others:
+                    best = self._rank(word, plan, tokens)
+                    if best is None:
+                        break
+                    score += best
+                else:
+                    results.append((score, name, key))
+                    if len(results) >= limit:
+                        break
+            if len(results) >= limit:
+                break
+        results.sort()
+        return [key for _, _, key in results[:limit]]
@@ -0,0 +1,104 @@
+# Product and sale ID allocation.
+# Instead of scanning every existing ID for the highest number on each sale, an IdSequence keeps
+# the highest number handed out, so the next ID costs O(1). A set of the IDs in use rejects
+# duplicates such as a clerk typing a sale ID that already exists.
+#
+# The high-water mark is persisted by the storage backend a block of IDs at a time
+# (BLOCK_SIZE numbers per write), the way database sequences cache values. After a restart
+# numbering continues after the saved mark, so an ID that may have been handed out is never
+# issued twice. The unused rest of the last block is skipped, which leaves a gap.
+# Numbers have at least `width` digits and grow past it: S999 is followed by S1000.
+
+BLOCK_SIZE = 20
+
+
+class IdSequence:
+    def __init__(self, prefix, width=3, block_size=BLOCK_SIZE, on_reserve=None):
+        self.prefix = prefix
+        self.width = width
+        self.block_size = block_size
+        self.on_reserve = on_reserve    # on_reserve(prefix, number) saves the new high-water mark
+        self.high = 0                   # Highest number handed out or seen
+        self.reserved = 0               # Highest number saved as possibly used
+        self.used = set()               # Every ID in use, for the uniqueness check
+
+    def __contains__(self, id_):
+        return id_ in self.used
+
+    def number_of(self, id_):
+        # The numeric part of an ID with this prefix, or None for IDs in another format
+        digits = id_[len(self.prefix):]
+        return int(digits) if id_.startswith(self.prefix) and digits.isdigit() else None
+
+    def format(self, number):
+        return f"{self.prefix}{number:0{self.width}d}"
+
+    def _advance(self, number):
+        if number > self.high:
+            self.high = number
+        if number > self.reserved:
+            self.reserved = number + self.block_size - 1
+            if self.on_reserve is not None:
+                self.on_reserve(self.prefix, self.reserved)
+
+    # ---------- Loading ----------
+    def restore(self, reserved):
+        # Continue after a high-water mark saved by an earlier run
+        self.reserved = max(self.reserved, reserved)
+        self.high = max(self.high, reserved)
+
+    def observe(self, id_):
+        # Adds an existing ID while loading. Returns False when it was already in use.
+        if id_ in self.used:
+            return False
+        self.used.add(id_)
+        number = self.number_of(id_)
+        if number is not None and number > self.high:
+            self.high = number
+        return True
+
+    def save_high(self):
+        # Saves the highest number seen while loading as the mark, so the next start can
+        # continue after it without reading every ID again
+        self._advance(self.high)
+
+    def reset(self):
+        # Forget the IDs in use but keep numbering after the saved mark
+        self.used = set()
+        self.high = self.reserved
+
+    # ---------- Allocating ----------
+    def peek(self):
+        # The ID take() would return, without using it (for "suggested ID" prompts)
+        return self.format(self.high + 1)
+
+    def take(self):
+        number = self.high + 1
+        self._advance(number)
+        id_ = self.format(number)
+        self.used.add(id_)
+        return id_
+
+    def take_block(self, count):
+        # `count` consecutive IDs, e.g. for a bulk import or for a till terminal to hand out itself.
+        # The whole block is saved as used with at most one write.
+        first = self.high + 1
+        last = self.high + count
+        self._advance(last)
+        ids = [self.format(n) for n in range(first, last + 1)]
+        self.used.update(ids)
+        return ids
+
+    def claim(self, id_):
+        # Uses an ID chosen by the caller. Returns False when it is already in use.
+        if id_ in self.used:
+            return False
+        self.used.add(id_)
+        number = self.number_of(id_)
+        if number is not None:
+            self._advance(number)
+        return True
+
+    def release(self, ids):
+        # Frees IDs whose records were never stored. Their numbers are not handed out again.
+        self.used.difference_update(ids)
@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import json
+from datetime import date
+
+try:
+    from .journal import Journal
+    from .models import Sale
+    from .shopsystem import ShopSystem
+    from .storage import DataLock, SqliteStorage, StorageError
+    from .sweeper import sweep_forever
+except ImportError:  # Running as a script from inside src/
+    from journal import Journal
+    from models import Sale
+    from shopsystem import ShopSystem
+    from storage import DataLock, SqliteStorage, StorageError
+    from sweeper import sweep_forever
+
+# Local service so several till terminals can sell from the same stock at once.
+# Terminals send one JSON object per line over TCP or a Unix socket and get one JSON reply per line.
+#
+#   {"op": "sell", "product_id": "P001", "batch_number": "B001", "quantity": 2}
+#   {"op": "sell", "product_id": "P001", "quantity": 30}       (no batch: first-expiry-first-out)
+#   {"op": "find", "product_id": "P001", "batch_number": "B001"}
+#   {"op": "top", "window": "day", "n": 20}       (best sellers today or this month, with error bounds)
+#   {"op": "ping"}
+#
+# Everything runs on one event loop thread, and a sale checks and takes its stock without awaiting
+# in between, so no two sales can take the same units and no batch locks are needed.
+# Sales waiting to be saved are written together (group commit) and a sale is only confirmed
+# to its terminal after it is stored. Expired batches are removed every midnight by a background
+# task, once the sales taken from them are stored (see sweeper.py).
+
+COMMIT_DELAY = 0.005        # Seconds to wait for more sales before writing a group
+
+
+class ShopService:
+    def __init__(self, system, commit_delay=COMMIT_DELAY, expiry_sweep=True):
+        self.system = system
+        self.commit_delay = commit_delay
+        self.expiry_sweep = expiry_sweep
+        self.sweep_task = None
+        self.pending = []                   # [(sales, plan, future)] waiting for the next group commit
+        self.commit_task = None
+        self.server = None
+
+    # ---------- Selling ----------
+    def _plan(self, product_id, batch_number, quantity):
+        # Returns [(product, units)] or an error message; nothing is changed here
+        if batch_number:
+            p = self.system.find_batch(product_id, batch_number)
+            if p is None:
+                return "Product batch not found."
+            if p.expiry_date < date.today():
+                return "Cannot sell expired product."
+            if p.quantity < quantity:
+                return "Insufficient stock."
+            return [(p, quantity)]
+        product_expiry = self.system.product_expiry.get(product_id)
+        plan = product_expiry.allocate(quantity, self.system.batch_index.get) if product_expiry else None
+        return plan if plan is not None else "Insufficient unexpired stock."
+
+    async def sell(self, product_id, quantity, batch_number=None):
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+
+        # Planned and applied with no await in between, so the stock cannot change meanwhile
+        plan = self._plan(product_id, batch_number, quantity)
+        if isinstance(plan, str):
+            raise ValueError(plan)
+        future = self._apply(plan)
+        # The stock is taken in memory already, so other sales of these batches go ahead
+        # while this one waits for its group to be stored
+        return await future
+
+    def _apply(self, plan):
+        today = date.today()
+        sales = []
+        for p, units in plan:
+            p.quantity -= units
+            sales.append(Sale(self.system.sale_ids.take(), p.product_id, p.batch_number, units, p.price, today))
+        self.system.sales.extend(sales)
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((sales, plan, future))
+        if self.commit_task is None or self.commit_task.done():
+            self.commit_task = asyncio.ensure_future(self._group_commit())
+        return future
+
+    async def _group_commit(self):
+        # Every sale applied in memory is in `pending`, so a journal compaction triggered by this
+        # write never snapshots stock taken by a sale that is not stored yet
+        await asyncio.sleep(self.commit_delay)
+        group, self.pending = self.pending, []
+        try:
+            self._commit(group)
+        except Exception as e:
+            # Anything but a refused sale, e.g. a full disk: no terminal may be left waiting
+            for _, _, future in group:
+                if not future.done():
+                    future.set_exception(ValueError(f"Sale not confirmed: {e!r}"))
+
+    def _commit(self, group):
+        sales = [sale for entry in group for sale in entry[0]]
+        try:
+            self.system._persist_sales(sales)
+        except StorageError:
+            # A group is one transaction, so store the sales one by one to find the bad ones.
+            # The group's sales are the last ones in the list, they are added back entry by entry.
+            del self.system.sales[-len(sales):]
+            for entry in group:
+                self._commit_one(entry)
+            self._sync()
+            return
+        self._sync()
+        for entry in group:
+            entry[2].set_result(entry[0])
+
+    def _sync(self):
+        # The journal is opened without fsync per write (see main), one fsync covers the group
+        if self.system.journal is not None:
+            self.system.journal.sync()
+
+    def _commit_one(self, entry):
+        sales, plan, future = entry
+        self.system.sales.extend(sales)
+        try:
+            self.system._persist_sales(sales)
+        except StorageError as e:
+            del self.system.sales[-len(sales):]
+            for p, units in plan:
+                p.quantity += units
+            self.system.sale_ids.release(sale.sale_id for sale in sales)
+            future.set_exception(ValueError(f"Sale failed: {e}"))
+            return
+        future.set_result(sales)
+
+    # ---------- Expiry ----------
+    async def sweep_expired(self, today=None):
+        # Waits for the group commit, so a sale already selling from a newly expired batch is
+        # stored first and a journal compaction set off by the sweep never sees stock taken by a
+        # sale that is not stored yet. Nothing is awaited between the last wait and the sweep.
+        today = today or date.today()
+        while self.commit_task is not None and not self.commit_task.done():
+            await self.commit_task
+        return self.system.sweep_expired(today)
+
+    # ---------- Protocol ----------
+    async def handle_request(self, request):
+        if not isinstance(request, dict):
+            raise ValueError("A request must be a JSON object.")
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True}
+        if op == "find":
+            p = self.system.find_batch(request.get("product_id"), request.get("batch_number"))
+            if p is None:
+                return {"ok": False, "error": "Product batch not found."}
+            return {"ok": True, "product": {key: str(value) for key, value in p.as_row().items()}}
+        if op == "sell":
+            sales = await self.sell(request["product_id"], int(request["quantity"]), request.get("batch_number"))
+            return {"ok": True, "sales": [
+                {"sale_id": s.sale_id, "batch_number": s.batch_number,
+                 "quantity_sold": s.quantity_sold, "total": s.total} for s in sales
+            ]}
+        if op == "top":
+            # "summary": true adds the window's summary, which other shops or services can merge
+            window = request.get("window", "day")
+            if window not in ("day", "month"):
+                raise ValueError("window must be day or month")
+            result = self.system.best_sellers(int(request.get("n", 20)), window)
+            reply = {"ok": True, "total": result["total"], "max_error": result["max_error"], "top": [
+                {"product_id": item, "revenue": revenue, "error": error, "certain": certain}
+                for item, revenue, error, certain in result["top"]
+            ]}
+            if request.get("summary"):
+                top_sellers = self.system.top_sellers
+                reply["summary"] = (top_sellers.day() if window == "day" else top_sellers.month()).as_dict()
+            return reply
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.handle_request(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {"ok": False, "error": str(e)}
+                writer.write((json.dumps(reply) + "\n").encode())
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8765, unix_path=None):
+        if unix_path:
+            self.server = await asyncio.start_unix_server(self.handle_connection, path=unix_path)
+        else:
+            self.server = await asyncio.start_server(self.handle_connection, host, port)
+        if self.expiry_sweep:
+            self.sweep_task = asyncio.ensure_future(sweep_forever(self.sweep_expired))
+        return self.server
+
+    async def stop(self):
+        if self.sweep_task is not None:
+            self.sweep_task.cancel()
+            try:
+                await self.sweep_task
+            except asyncio.CancelledError:
+                pass
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.commit_task is not None:
+            await self.commit_task
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the shop to several till terminals.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="listen on this Unix socket path instead of TCP")
+    parser.add_argument("--db", help="use this SQLite database instead of the CSV files")
+    args = parser.parse_args(argv)
+
+    if args.db:
+        system = ShopSystem(storage=SqliteStorage(args.db))
+    else:
+        system = ShopSystem(journal=Journal(fsync_every=0))     # _group_commit syncs once per group
+    # Held until the service has saved, like the menu (see ShopSystem.run)
+    try:
+        data_lock = DataLock(system.storage.lock_file).acquire()
+    except StorageError as e:
+        raise SystemExit(str(e))
+    system.load_products()
+    system.load_sales()
+    service = ShopService(system)
+
+    async def serve():
+        server = await service.start(args.host, args.port, args.unix)
+        print(f"Shop service listening on {args.unix or f'{args.host}:{args.port}'}")
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        system.save()
+        if system.journal is not None:
+            system.journal.close()
+        system.storage.close()
+        data_lock.release()
+
+
+if __name__ == "__main__":
+    main()
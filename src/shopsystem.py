@@ -1,159 +1,515 @@
-import csv
-from datetime import datetime, date, timedelta
-import os
-REMOVED_FILE = "removed_products.csv"
-
-def init_removed_products_file():
-    if not os.path.exists(REMOVED_FILE):
-        with open(REMOVED_FILE, mode="w", newline="") as file:
-            writer = csv.writer(file)
-            writer.writerow([
-                "product_id",
-                "batch_number",
-                "name",
-                "price",
-                "quantity",
-                "expiry_date",
-                "removal_reason",
-                "removal_date"
-            ])
-
-
-def log_removed_product(product, reason):
-    with open(REMOVED_FILE, mode="a", newline="") as file:
-        writer = csv.writer(file)
-        writer.writerow([
-            product.product_id,
-            product.batch_number,
-            product.name,
-            product.price,
-            product.quantity,
-            product.expiry_date,
-            reason,
-            date.today()
-        ])
-
-
-
-# ===================== Product =====================
-class Product:
-    def __init__(self, product_id, batch_number, name, price, quantity, expiry_date):
-        self.product_id = product_id
-        self.batch_number = batch_number
-        self.name = name
-        self.price = float(price)
-        self.quantity = int(quantity)
-        self.expiry_date = (
-            datetime.strptime(expiry_date, "%Y-%m-%d").date()
-            if isinstance(expiry_date, str)
-            else expiry_date
-        )
+import argparse
+import importlib
+import itertools
+import threading
+from datetime import datetime, date
+
+try:
+    from .expiry_index import ExpiryIndex
+    from .journal import Journal
+    from .metrics import metrics, start_profiling, stop_profiling
+    from .models import DEFAULT_CATEGORY, Product, Sale, parse_date
+    from .rollups import SalesRollup
+    from .sequences import IdSequence
+    from .storage import CsvStorage, DataLock, SqliteStorage, StorageError, REMOVAL_REASONS, REMOVED_FILE, init_removed_products_file, log_removed_product
+except ImportError:  # Running as a script from inside src/
+    from expiry_index import ExpiryIndex
+    from journal import Journal
+    from metrics import metrics, start_profiling, stop_profiling
+    from models import DEFAULT_CATEGORY, Product, Sale, parse_date
+    from rollups import SalesRollup
+    from sequences import IdSequence
+    from storage import CsvStorage, DataLock, SqliteStorage, StorageError, REMOVAL_REASONS, REMOVED_FILE, init_removed_products_file, log_removed_product
+
+# archive, search, snapshot, top_sellers and sweeper are imported with load() where they are
+# first needed, so a one-shot command (see main.py) does not import them just to sell.
+
+PAGE_SIZE = 20      # Rows shown before asking to continue
+DELTA_MIN_ROWS = 1000   # products.csv is rewritten once the delta file holds more changed batches than
+DELTA_RATIO = 0.25      # both this many and this share of the catalog
+
+def load(name):
+    # A module of this package, imported on first use (as a package or as a script from inside src/)
+    return importlib.import_module(f"{__package__}.{name}" if __package__ else name)
+
+def print_in_pages(lines, page_size=PAGE_SIZE):
+    # Prints lines from any iterable, pausing between pages. Lines are pulled one at a time,
+    # so stopping early means the rest of a large file is never read.
+    shown = 0
+    for line in lines:
+        if shown and shown % page_size == 0:
+            if input("Press Enter for more, or q to stop: ").strip().lower() == "q":
+                return
+        print(line)
+        shown += 1
 
-# ===================== Sale =====================
-class Sale:
-    def __init__(self, sale_id, product_id, batch_number, quantity_sold, price, date_of_sale):
-        self.sale_id = sale_id
-        self.product_id = product_id
-        self.batch_number = batch_number
-        self.quantity_sold = int(quantity_sold)
-        self.price = float(price)
-        self.total = self.quantity_sold * self.price
-        self.date_of_sale = (
-            datetime.strptime(date_of_sale, "%Y-%m-%d").date()
-            if isinstance(date_of_sale, str)
-            else date_of_sale
-        )
 
 # ===================== ShopSystem =====================
 class ShopSystem:
-    def __init__(self):
+    def __init__(self, journal=None, storage=None):
         self.products = []
         self.sales = []
+        self.storage = storage if storage is not None else CsvStorage()    # CsvStorage or SqliteStorage
+        self.journal = journal      # Optional Journal, when set sales are appended instead of rewriting the CSVs
+        if journal is not None:
+            journal.stamps = self.storage.journal_stamps
+        self.rollup = SalesRollup() # Daily/weekly/monthly sales totals, updated as sales are recorded
+        self._top_sellers = None    # TopSellers of recent days and months, built on first use (see top_sellers)
+        self.lock = threading.RLock()   # Held by the menu while an option runs and by the expiry sweeper
+
+        # Lookup indexes kept in sync with self.products so a batch is found in O(1)
+        self.batch_index = {}       # (product_id, batch_number) -> Product
+        self.product_batches = {}   # product_id -> {batch_number: Product}
+        self.name_index = {}        # lowercase name -> set of product_ids
+        self.expiry_index = ExpiryIndex()   # Batches ordered by expiry date
+        self.product_expiry = {}            # product_id -> ExpiryIndex of its batches, for FEFO sales
+        self._search_index = None           # ProductSearch, built on the first search (see search_index)
+
+        # O(1) ID allocation with a uniqueness index, high-water marks saved by the storage
+        self.product_ids = IdSequence("P", on_reserve=self._save_sequence)
+        self.sale_ids = IdSequence("S", on_reserve=self._save_sequence)
+        self._sequences_restored = False
+
+        # Product batches changed since the last save, written to the storage's delta file
+        self.dirty_products = {}    # (product_id, batch_number) -> (Product, "put" or "remove")
+
+        # Set by one-shot commands (see main.py) that load only some products or no sales.
+        # Changes are then only appended or updated in place, never saved by rewriting files
+        # from memory, and journal compaction waits for the next full load.
+        self.partial_load = False
+
+    # ---------- ID sequences ----------
+    def _save_sequence(self, name, high):
+        self.storage.save_sequence(name, high)
+
+    def _restore_sequences(self):
+        # Read the saved high-water marks once, the first time data is loaded
+        if not self._sequences_restored:
+            self._sequences_restored = True
+            marks = self.storage.load_sequences()
+            self.product_ids.restore(marks.get("P", 0))
+            self.sale_ids.restore(marks.get("S", 0))
+
+    # self.sales is an ArchivedSales or SalesHistory only with the storage that makes them,
+    # whose module is then imported already
+    def _archived_sales(self):
+        return self.storage.supports_sales_archive and isinstance(self.sales, load("archive").ArchivedSales)
+
+    def _sales_history(self):
+        return self.storage.supports_snapshots and isinstance(self.sales, load("snapshot").SalesHistory)
+
+    def _rebuild_sale_ids(self):
+        self._restore_sequences()
+        self.sale_ids.reset()
+        archived = self._archived_sales()
+        if archived and self.sale_ids.high:
+            # Archived sales were numbered below the saved high-water mark, so only the sales not
+            # archived yet are read. A given sale ID is checked with load_sale_ids (see main.py).
+            ids = (s.sale_id for s in self.sales.tail)
+        elif archived or self._sales_history():
+            ids = self.sales.sale_ids()
+        else:
+            ids = (s.sale_id for s in self.sales)
+        duplicates = [sale_id for sale_id in ids if not self.sale_ids.observe(sale_id)]
+        if duplicates:
+            print(f"Warning: {len(duplicates)} sale ID(s) used more than once in the sales history, e.g. {duplicates[0]}.")
+        if archived:
+            self.sale_ids.save_high()
+
+    @metrics.timed("shop.load_sale_ids")
+    def load_sale_ids(self):
+        # Every sale ID in storage, for recording sales without load_sales: needed to check
+        # given sale IDs, and to continue numbering when no high-water mark has been saved yet
+        self._restore_sequences()
+        for sale in self.stream_sales():
+            self.sale_ids.observe(sale.sale_id)
 
-        init_removed_products_file()
+    # ---------- Indexes ----------
+    def _index_product(self, product):
+        self.batch_index[(product.product_id, product.batch_number)] = product
+        self.product_ids.observe(product.product_id)
+        self.product_batches.setdefault(product.product_id, {})[product.batch_number] = product
+        self.name_index.setdefault(product.name.lower(), set()).add(product.product_id)
+        self.expiry_index.add(product)
+        self.product_expiry.setdefault(product.product_id, ExpiryIndex()).add(product)
+        if self._search_index is not None:
+            self._search_index.add(product)
+
+    def _unindex_product(self, product):
+        self.batch_index.pop((product.product_id, product.batch_number), None)
+        self.expiry_index.remove(product)
+        if self._search_index is not None:
+            self._search_index.remove(product)
+        product_expiry = self.product_expiry.get(product.product_id)
+        if product_expiry is not None:
+            product_expiry.remove(product)
+            if not len(product_expiry):
+                del self.product_expiry[product.product_id]
+
+        batches = self.product_batches.get(product.product_id)
+        if batches is not None:
+            batches.pop(product.batch_number, None)
+            if not batches:
+                del self.product_batches[product.product_id]
+
+        # Only drop the name entry once no batch of this product uses that name
+        name = product.name.lower()
+        still_named = any(b.name.lower() == name for b in self.product_batches.get(product.product_id, {}).values())
+        if not still_named and name in self.name_index:
+            self.name_index[name].discard(product.product_id)
+            if not self.name_index[name]:
+                del self.name_index[name]
+
+    def rebuild_indexes(self):
+        # Useful after self.products has been replaced or edited directly
+        self.batch_index = {}
+        self.product_batches = {}
+        self.name_index = {}
+        self.expiry_index = ExpiryIndex()
+        self.product_expiry = {}
+        self._search_index = None
+        self.product_ids.reset()
+        for p in self.products:
+            self._index_product(p)
+
+    @property
+    def search_index(self):
+        # Words, prefixes and categories of the batch names, see search.py. Built on first use,
+        # so commands that never search do not pay for it at start-up.
+        if self._search_index is None:
+            self._search_index = load("search").ProductSearch(self.products)
+        return self._search_index
+
+    def find_batch(self, product_id, batch_number):
+        return self.batch_index.get((product_id, batch_number))
+
+    def find_batches(self, product_id):
+        return list(self.product_batches.get(product_id, {}).values())
+
+    @metrics.timed("shop.find_by_name")
+    def find_by_name(self, name):
+        # Case-insensitive exact name match, returns every batch of the matching products
+        found = []
+        for pid in self.name_index.get(name.lower(), ()):
+            found.extend(b for b in self.product_batches.get(pid, {}).values() if b.name.lower() == name.lower())
+        return found
+
+    @metrics.timed("shop.search")
+    def search(self, text, limit=20, category=None):
+        # Batches whose name matches `text` by word, prefix, typo or substring, best first.
+        # An empty text with a category lists that category.
+        return [self.batch_index[key] for key in self.search_index.search(text, limit, category)]
+
+    def get_expired_products(self, as_of=None):
+        return [self.batch_index[key] for key in self.expiry_index.expired(as_of)]
+
+    def get_expiring_soon(self, days=7, today=None):
+        return [self.batch_index[key] for key in self.expiry_index.expiring_within(days, today)]
+
+    # ---------- Streaming ----------
+    # These generators build one object at a time, so reports over very large files never hold
+    # the whole file in memory. A bad row is reported and skipped without stopping the stream.
+    def iter_products(self, filename=None, product_ids=None):
+        for row in self.storage.iter_products(filename, product_ids):
+            try:
+                if not row["price"] or not row["quantity"]:
+                         continue
+                yield Product(
+                    row["product_id"],
+                    row["batch_number"],
+                    row["name"],
+                    row["price"],
+                    row["quantity"],
+                    row["expiry_date"],
+                    row.get("category"),
+                )
+            except Exception:
+                print(f"Skipping bad product row: {row}")
+
+    def iter_sales(self, filename=None, start=None, end=None):
+        for row in self.storage.iter_sales(filename, start, end):
+            try:
+                yield Sale(
+                    row["sale_id"],
+                    row["product_id"],
+                    row["batch_number"],
+                    row["quantity_sold"],
+                    row["price"],
+                    row["date_of_sale"],
+                )
+            except Exception:
+                print(f"Skipping bad sale row: {row}")
+
+    def iter_removed(self, start=None, end=None, reason=None, offset=0, limit=None):
+        return self.storage.iter_removed(start, end, reason, offset, limit)
 
     # ---------- Load & Save ----------
-    def load_products(self, filename="products.csv"):
-        try:
-            with open(filename, newline="") as file:
-                reader = csv.DictReader(file)
-                self.products = []
-                for row in reader:
-                    try:
-                        if not row["price"] or not row["quantity"]:
-                                 continue
-                        self.products.append(Product(
-                            row["product_id"],
-                            row["batch_number"],
-                            row["name"],
-                            row["price"],
-                            row["quantity"],
-                            row["expiry_date"],
-                        ))
-                    except Exception:
-                        print(f"Skipping bad product row: {row}")
-        except FileNotFoundError:
-            print("products.csv not found. Starting empty.")
-
-    def save_products(self, filename="products.csv"):
-        with open(filename, "w", newline="") as file:
-            fieldnames = ["product_id", "batch_number", "name", "price", "quantity", "expiry_date"]
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            for p in self.products:
-                writer.writerow({
-                    "product_id": p.product_id,
-                    "batch_number": p.batch_number,
-                    "name": p.name,
-                    "price": p.price,
-                    "quantity": p.quantity,
-                    "expiry_date": p.expiry_date,
-                })
-
-    def load_sales(self, filename="sales.csv"):
+    @metrics.timed("shop.load_products")
+    def load_products(self, filename=None, product_ids=None):
+        # With product_ids only the batches of those products are loaded, e.g. for a one-shot sale
+        self._restore_sequences()
+        self.products = []
+        self.dirty_products = {}
+        self.rebuild_indexes()
+        wanted = None
+        if product_ids is not None:
+            wanted = set(product_ids)
+            self.partial_load = True
+        snapshot = self.storage.open_products_snapshot() if filename is None and self.storage.supports_snapshots else None
+        if snapshot is not None:
+            products = snapshot if wanted is None else snapshot.products_of(wanted)
+        else:
+            products = self.iter_products(filename, wanted)
+        for product in products:
+            if (product.product_id, product.batch_number) in self.batch_index:
+                print(f"Skipping duplicate product batch row: {product.product_id} {product.batch_number}")
+                continue
+            self.products.append(product)
+            self._index_product(product)
+
+        if self.journal is not None and self._journal_pending()[0]:
+            self._replay_product_journal(wanted)
+
+    def _journal_pending(self):
+        # (products, sales): whether each part of the journal still has to be replayed. A file
+        # rewritten since the journal was started already holds its changes, e.g. after a
+        # compaction that stopped before it could clear the journal.
+        base = self.journal.base()
+        if base is None:
+            return True, True       # Journal started before base records were written
+        stamps = self.storage.journal_stamps()
+        return base.get("products") == stamps.get("products"), base.get("sales") == stamps.get("sales")
+
+    def _journal_sales_pending(self):
+        # Journalled sales that are not in the sales storage yet
+        if self.journal is None or not self._journal_pending()[1]:
+            return []
+        sales = []
+        for rec in self.journal.records():
+            if rec["record_type"] != "sale":
+                continue
+            try:
+                sales.append(Sale(rec["sale_id"], rec["product_id"], rec["batch_number"],
+                                  rec["quantity"], rec["price"], rec["date"]))
+            except (KeyError, ValueError):
+                print(f"Skipping bad journal row: {rec}")
+        if sales and self.storage.supports_sales_archive:
+            # The archive has no stamp, so sales it already holds are found by ID in their dates
+            archived = {row["sale_id"] for row in self.storage.iter_sales(
+                None, min(s.date_of_sale for s in sales), max(s.date_of_sale for s in sales))}
+            sales = [s for s in sales if s.sale_id not in archived]
+        return sales
+
+    def _replay_product_journal(self, wanted=None):
+        # Apply the journalled changes that happened after the products snapshot was written.
+        # Removed batches are tracked by object, a batch added again under the same key is a new one.
+        removed = set()         # id() of the removed Product objects
+        for rec in self.journal.records():
+            try:
+                if wanted is not None and rec["product_id"] not in wanted:
+                    continue
+                kind = rec["record_type"]
+                key = (rec["product_id"], rec["batch_number"])
+                p = self.batch_index.get(key)
+                if kind == "product":
+                    if p is None:
+                        p = Product(rec["product_id"], rec["batch_number"], rec["name"],
+                                    rec["price"], rec["quantity"], rec["expiry_date"], rec.get("category"))
+                        self.products.append(p)
+                        self._index_product(p)
+                elif p is None:
+                    continue
+                elif kind == "sale":
+                    p.quantity -= int(rec["quantity"])
+                elif kind == "stock":
+                    p.quantity += int(rec["quantity"])
+                elif kind == "price":
+                    p.price = float(rec["price"])
+                elif kind == "remove":
+                    self._unindex_product(p)
+                    removed.add(id(p))
+            except (KeyError, ValueError):
+                print(f"Skipping bad journal row: {rec}")
+        if removed:
+            self.products = [p for p in self.products if id(p) not in removed]
+
+    @metrics.timed("shop.save_products")
+    def save_products(self, filename=None):
+        self.storage.save_products(self.products, filename)
+        if filename is None:
+            self.dirty_products = {}
+
+    # ---------- Dirty tracking ----------
+    def _mark_changed(self, product):
+        self.dirty_products[(product.product_id, product.batch_number)] = (product, "put")
+
+    def _mark_removed(self, product):
+        self.dirty_products[(product.product_id, product.batch_number)] = (product, "remove")
+
+    @metrics.timed("shop.save_product_changes")
+    def save_product_changes(self):
+        # Writes only the batches changed since the last save, so the cost follows the number of
+        # changes rather than the catalog size. products.csv is rewritten (compacted) only once
+        # the delta file has grown past DELTA_MIN_ROWS and DELTA_RATIO of the catalog.
+        if not self.storage.supports_product_deltas:
+            self.save_products()
+            return
+        if self.dirty_products:
+            changes = list(self.dirty_products.values())
+            self.storage.save_product_changes([p for p, change in changes if change == "put"],
+                                              [p for p, change in changes if change == "remove"])
+            self.dirty_products = {}
+            metrics.count("shop.product_changes_saved", len(changes))
+        if not self.partial_load and self.storage.delta_size() > max(DELTA_MIN_ROWS, len(self.products) * DELTA_RATIO):
+            self.save_products()
+
+    @metrics.timed("shop.load_sales")
+    def load_sales(self, filename=None):
+        # A current binary snapshot is mapped instead of parsing sales.csv, its sales are decoded when read,
+        # and the rollups saved with it are loaded instead of being rebuilt.
+        # Archived sales are not loaded at all, they are streamed from their partitions when read,
+        # and their rollups read only the partitions without saved totals.
+        self._top_sellers = None
+        snapshot = self.storage.open_sales_snapshot() if filename is None and self.storage.supports_snapshots else None
+        if filename is None and self.storage.supports_sales_archive:
+            self.sales = self.storage.open_sales()
+            self.rollup = self.storage.load_sales_rollup()
+        elif snapshot is not None:
+            self.sales = load("snapshot").SalesHistory(snapshot)
+            self.rollup = self.storage.load_sales_rollup()
+            if self.rollup is None:
+                self.rollup = SalesRollup()
+                for product_id, _, quantity, price, day in self.sales.raw_sales():
+                    self.rollup.add_values(day, product_id, quantity, quantity * price)
+        else:
+            self.sales = list(self.iter_sales(filename))
+            self.rollup = SalesRollup()
+            self.rollup.add_all(self.sales)
+
+        for sale in self._journal_sales_pending():
+            self.sales.append(sale)
+            self.rollup.add(sale)
+        self._rebuild_sale_ids()
+
+    @metrics.timed("shop.save_sales")
+    def save_sales(self, filename=None):
+        self.storage.save_sales(self.sales, filename)
+        if filename is None and self.storage.supports_snapshots:
+            self.storage.save_sales_rollup(self.rollup)
+
+    @metrics.timed("shop.compact")
+    def compact(self, products_file=None, sales_file=None):
+        # Fold the journal into fresh snapshot files, then start an empty journal.
+        # The snapshots are written first so a crash cannot lose a journalled sale; after a crash
+        # before the journal is cleared, its base stamps keep it from being applied twice.
+        if self.partial_load:
+            raise StorageError("Only part of the products or sales is loaded, load everything before saving.")
+        self.save_products(products_file)
+        self.save_sales(sales_file)
+        if self.journal is not None:
+            self.journal.clear()
+
+    def save(self):
+        if self.partial_load:
+            raise StorageError("Only part of the products or sales is loaded, load everything before saving.")
+        if self.journal is not None:
+            self.compact()
+        else:
+            self.save_products()
+            self.save_sales()
+
+    # ---------- Persisting single changes ----------
+    # SQLite updates just the touched rows, a Journal appends one record,
+    # otherwise the changed batches go to the products delta file and sales.csv is rewritten.
+    def _after_journal_write(self):
+        if self.journal.needs_compaction() and not self.partial_load:
+            self.compact()
+
+    @metrics.timed("shop.persist_sales")
+    def _persist_sales(self, sales):
+        # The sales are counted first so the rollup saved by save_sales or a compaction includes them,
+        # and taken back out when storing fails. The best sellers are then rebuilt on next use.
+        metrics.count("shop.sale_lines", len(sales))
+        self.rollup.add_all(sales)
+        if self._top_sellers is not None:
+            self._top_sellers.add_all(sales)
         try:
-            with open(filename, newline="") as file:
-                reader = csv.DictReader(file)
-                self.sales = [
-                    Sale(
-                        row["sale_id"],
-                        row["product_id"],
-                        row["batch_number"],
-                        row["quantity_sold"],
-                        row["price"],
-                        row["date_of_sale"],
-                    )
-                    for row in reader
-                ]
-        except FileNotFoundError:
-            print("sales.csv not found. Starting empty.")
-
-    def save_sales(self, filename="sales.csv"):
-        with open(filename, "w", newline="") as file:
-            fieldnames = [
-                "sale_id", "product_id", "batch_number",
-                "quantity_sold", "price", "total", "date_of_sale"
-            ]
-            writer = csv.DictWriter(file, fieldnames=fieldnames)
-            writer.writeheader()
-            for s in self.sales:
-                writer.writerow(vars(s))
+            if self.storage.supports_row_updates:
+                self.storage.record_sales(sales)
+            elif self.journal is not None:
+                # One appended row records both a sale and the stock it took
+                self.journal.append_sales(sales)
+            else:
+                if self.partial_load:
+                    raise StorageError("Sales can only be appended with a journal or SQLite when the sales are not loaded.")
+                for sale in sales:
+                    self._mark_changed(self.batch_index[(sale.product_id, sale.batch_number)])
+                self.save_product_changes()
+                self.save_sales()
+        except StorageError:
+            self.rollup.remove_all(sales)
+            self._top_sellers = None
+            raise
+        if self.journal is not None and not self.storage.supports_row_updates:
+            self._after_journal_write()
+
+    def _persist_stock(self, product, delta):
+        if self.storage.supports_row_updates:
+            self.storage.update_batch(product)
+        elif self.journal is not None:
+            self.journal.append_stock(product, delta)
+            self._after_journal_write()
+        else:
+            self._mark_changed(product)
+            self.save_product_changes()
+
+    def _persist_price(self, product):
+        if self.storage.supports_row_updates:
+            self.storage.update_batch(product)
+        elif self.journal is not None:
+            self.journal.append_price(product)
+            self._after_journal_write()
+        else:
+            self._mark_changed(product)
+            self.save_product_changes()
+
+    def _persist_new_product(self, product):
+        if self.storage.supports_row_updates:
+            self.storage.insert_batch(product)
+        elif self.journal is not None:
+            self.journal.append_product(product)
+            self._after_journal_write()
+        else:
+            self._mark_changed(product)
+            self.save_product_changes()
 
     # ---------- Core Features ----------
     def view_products(self):
         print("\nID | Batch | Name | Price | Qty | Expiry | Status")
         print("-" * 70)
+        today = date.today()
+        expired = set(self.expiry_index.expired(today))
+        expiring_soon = set(self.expiry_index.expiring_within(7, today))
         for p in self.products:
-            status = "EXPIRED" if p.expiry_date < date.today() else (
-                "EXPIRING SOON" if p.expiry_date <= date.today() + timedelta(days=7) else "OK"
-            )
+            key = (p.product_id, p.batch_number)
+            status = "EXPIRED" if key in expired else ("EXPIRING SOON" if key in expiring_soon else "OK")
             print(f"{p.product_id} | {p.batch_number} | {p.name} | {p.price} | {p.quantity} | {p.expiry_date} | {status}")
 
+    def search_products(self):
+        text = input("Search (name, start of a name or part of a word): ").strip()
+        categories = ", ".join(self.search_index.category_names())
+        category = input(f"Category (empty for all; {categories}): ").strip() or None
+        found = self.search(text, category=category)
+        if not found:
+            print("No matching products.")
+            return
+        print("\nID | Batch | Name | Category | Price | Qty | Expiry")
+        print("-" * 70)
+        for p in found:
+            print(f"{p.product_id} | {p.batch_number} | {p.name} | {p.category} | {p.price} | {p.quantity} | {p.expiry_date}")
+
     def suggest_next_product_id(self):
-        if not self.products:
-            return "P001"
-        max_id = max(int(p.product_id[1:]) for p in self.products if p.product_id.startswith("P"))
-        return f"P{max_id + 1:03d}"
+        return self.product_ids.peek()
 
     def add_product(self):
         suggested_id = self.suggest_next_product_id()
@@ -169,11 +525,18 @@ class ShopSystem:
             return
 
         # Prevent same ID with different product name
-        for p in self.products:
-            if p.product_id == pid and p.name.lower() != name.lower():
+        existing = self.find_batches(pid)
+        for p in existing:
+            if p.name.lower() != name.lower():
                 print("Error: This product ID is already used for a different product.")
                 return
 
+        # A new batch of a known product keeps its category
+        if existing:
+            category = existing[0].category
+        else:
+            category = input(f"Category [{DEFAULT_CATEGORY}]: ").strip() or DEFAULT_CATEGORY
+
         try:
             price = float(input("Price: "))
             qty = int(input("Quantity: "))
@@ -193,23 +556,81 @@ class ShopSystem:
             return
 
         # Merge ONLY if everything matches (ID + batch + name + price)
-        for p in self.products:
-            if (
-                    p.product_id == pid
-                    and p.batch_number == batch
-                    and p.name.lower() == name.lower()
-                    and p.price == price
-            ):
+        p = self.find_batch(pid, batch)
+        if p is not None:
+            if p.name.lower() == name.lower() and p.price == price:
                 p.quantity += qty
-                self.save_products()
+                try:
+                    self._persist_stock(p, qty)
+                except StorageError as e:
+                    p.quantity -= qty
+                    print(f"Could not save the new quantity: {e}")
+                    return
                 print("Existing product matched exactly. Quantities merged.")
-                return
+            else:
+                # (product_id, batch_number) is the batch key, so it cannot be reused for another price
+                print("Error: This batch already exists with a different price. Use Update Product Price instead.")
+            return
 
         #  Otherwise, add as new product
-        self.products.append(Product(pid, batch, name, price, qty, expiry_date))
-        self.save_products()
+        try:
+            self._add_new_batch(Product(pid, batch, name, price, qty, expiry_date, category))
+        except StorageError as e:
+            print(f"Could not save the new product: {e}")
+            return
         print("New product added successfully.")
 
+    def _add_new_batch(self, product):
+        # Indexes and saves a batch whose key is not in use, undoing both if saving fails
+        pid = product.product_id
+        new_id = pid not in self.product_ids
+        self.products.append(product)
+        try:
+            if new_id:
+                self.product_ids.claim(pid)     # Moves the sequence past a typed ID such as P1000
+            self._index_product(product)
+            self._persist_new_product(product)
+        except StorageError:
+            self.products.pop()
+            self._unindex_product(product)
+            if new_id:
+                self.product_ids.release([pid])
+            raise
+
+    def restock(self, product_id, batch_number, quantity, name=None, price=None, expiry_date=None, category=None):
+        # Adds stock without prompting, e.g. from the command line. An existing batch only gets
+        # the quantity, a new batch needs its price and expiry date, and takes its name and
+        # category from the product's other batches when they are not given.
+        # Returns the batch. Raises ValueError for bad input and StorageError when saving fails.
+        if quantity <= 0:
+            raise ValueError("Quantity must be positive.")
+        p = self.find_batch(product_id, batch_number)
+        if p is not None:
+            if price is not None and price != p.price:
+                raise ValueError("This batch already exists with a different price.")
+            p.quantity += quantity
+            try:
+                self._persist_stock(p, quantity)
+            except StorageError:
+                p.quantity -= quantity
+                raise
+            return p
+
+        existing = self.find_batches(product_id)
+        if existing:
+            if name is not None and name.lower() != existing[0].name.lower():
+                raise ValueError("This product ID is already used for a different product.")
+            name = existing[0].name
+            category = existing[0].category
+        if not name or price is None or expiry_date is None:
+            raise ValueError("A new batch needs a name, a price and an expiry date.")
+        if price <= 0:
+            raise ValueError("Price must be positive.")
+        product = Product(product_id, batch_number, name, price, quantity, parse_date(expiry_date),
+                          category or DEFAULT_CATEGORY)
+        self._add_new_batch(product)
+        return product
+
     def update_price(self):
         pid = input("Product ID: ")
         batch = input("Batch number: ")
@@ -224,32 +645,150 @@ class ShopSystem:
             print("Price must be positive.")
             return
 
-        for p in self.products:
-            if p.product_id == pid and p.batch_number == batch:
-                p.price = new_price
-                self.save_products()
-                print("Price updated.")
+        p = self.find_batch(pid, batch)
+        if p is not None:
+            old_price, p.price = p.price, new_price
+            try:
+                self._persist_price(p)
+            except StorageError as e:
+                p.price = old_price
+                print(f"Could not save the new price: {e}")
                 return
+            print("Price updated.")
+            return
 
         print("Product batch not found.")
 
     def suggest_next_sale_id(self):
-        if not self.sales:
-            return "S001"  # First sale ID
+        return self.sale_ids.peek()
+
+    def _next_sale_ids(self, count, first=None):
+        # `count` unused sale IDs, starting with `first` when the clerk typed one (checked unused by the caller)
+        if first:
+            self.sale_ids.claim(first)
+            return [first] + self.sale_ids.take_block(count - 1)
+        return self.sale_ids.take_block(count)
+
+    @metrics.timed("shop.sell_product")
+    def sell_product(self, product_id, quantity, sale_id=None):
+        # Sells `quantity` units of a product across its batches, soonest expiry first (FEFO),
+        # one Sale line per batch touched. Either every line is recorded or none is.
+        # Returns the Sale lines, or an empty list when the sale failed.
+        if quantity <= 0:
+            print("Quantity must be positive.")
+            return []
+        if sale_id and sale_id in self.sale_ids:
+            print("Sale ID already used.")
+            return []
+
+        product_expiry = self.product_expiry.get(product_id)
+        if product_expiry is None:
+            print("Product not found.")
+            return []
+        plan = product_expiry.allocate(quantity, self.batch_index.get)
+        if plan is None:
+            print("Insufficient unexpired stock.")
+            return []
+
+        today = date.today()
+        sales = []
+        for (p, units), line_id in zip(plan, self._next_sale_ids(len(plan), sale_id)):
+            p.quantity -= units
+            sales.append(Sale(line_id, p.product_id, p.batch_number, units, p.price, today))
+        self.sales.extend(sales)
+        try:
+            self._persist_sales(sales)
+        except StorageError as e:
+            # Nothing was stored, so undo the in-memory changes too
+            del self.sales[-len(sales):]
+            for p, units in plan:
+                p.quantity += units
+            self.sale_ids.release(sale.sale_id for sale in sales)
+            print(f"Sale failed: {e}")
+            return []
+        return sales
+
+    @metrics.timed("shop.record_sales")
+    def record_sales(self, lines):
+        # Records many sales without prompting, e.g. a basket or a day's POS export.
+        # Each line is a dict with product_id and quantity_sold, and optionally sale_id,
+        # batch_number (empty means FEFO) and date_of_sale (default today).
+        # Lines are checked against the in-memory indexes and applied in one pass, bad lines are
+        # reported and skipped, and everything is saved once at the end.
+        # Returns (sales, failures) where failures is a list of (line_number, reason).
+        today = date.today()
+        sales = []
+        taken = []          # (product, units) for undoing if saving fails
+        failures = []
 
-        # Extract numeric part of Sale IDs that start with "S"
-        ids = [int(s.sale_id[1:]) for s in self.sales if s.sale_id.startswith("S")]
-        max_id = max(ids) if ids else 0
-        return f"S{max_id + 1:03d}"
+        for line_number, line in enumerate(lines, start=1):
+            try:
+                pid = line["product_id"].strip()
+                batch = (line.get("batch_number") or "").strip()
+                qty = int(line["quantity_sold"])
+                sale_date = parse_date(line.get("date_of_sale") or today)
+            except (KeyError, ValueError, TypeError, AttributeError) as e:
+                failures.append((line_number, f"Bad line: {e!r}"))
+                continue
+            if qty <= 0:
+                failures.append((line_number, "Quantity must be positive."))
+                continue
+
+            if batch:
+                p = self.batch_index.get((pid, batch))
+                if p is None:
+                    failures.append((line_number, "Product batch not found."))
+                    continue
+                if p.expiry_date < sale_date:
+                    failures.append((line_number, "Cannot sell expired product."))
+                    continue
+                if p.quantity < qty:
+                    failures.append((line_number, "Insufficient stock."))
+                    continue
+                plan = [(p, qty)]
+            else:
+                product_expiry = self.product_expiry.get(pid)
+                plan = product_expiry.allocate(qty, self.batch_index.get, sale_date) if product_expiry else None
+                if plan is None:
+                    failures.append((line_number, "Insufficient unexpired stock."))
+                    continue
+
+            # A given sale ID goes to the first batch, a FEFO line spread over more batches
+            # numbers the rest as sell_product does
+            given_id = (line.get("sale_id") or "").strip()
+            if given_id and given_id in self.sale_ids:
+                failures.append((line_number, f"Sale ID {given_id} already used."))
+                continue
+            for (p, units), sale_id in zip(plan, self._next_sale_ids(len(plan), given_id)):
+                p.quantity -= units
+                taken.append((p, units))
+                sales.append(Sale(sale_id, p.product_id, p.batch_number, units, p.price, sale_date))
+
+        if sales:
+            self.sales.extend(sales)
+            try:
+                self._persist_sales(sales)
+            except StorageError as e:
+                del self.sales[-len(sales):]
+                for p, units in taken:
+                    p.quantity += units
+                self.sale_ids.release(sale.sale_id for sale in sales)
+                print(f"Nothing was recorded, saving failed: {e}")
+                return [], failures
+        metrics.count("shop.sale_failures", len(failures))
+        return sales, failures
 
     def make_sale(self):
         suggested_id = self.suggest_next_sale_id()
         sale_id = input(f"Sale ID [suggested ID: {suggested_id}]: ").strip()
         if not sale_id:
             sale_id = suggested_id
+        elif sale_id in self.sale_ids:
+            print("Sale ID already used.")
+            return
 
         pid = input("Product ID: ")
-        batch = input("Batch number: ")
+        batch = input("Batch number (leave empty to sell the soonest-expiring stock first): ").strip()
 
         # Ensure quantity is a positive integer
         try:
@@ -262,72 +801,209 @@ class ShopSystem:
             print("Quantity must be positive.")
             return
 
-        for p in self.products:
-            if p.product_id == pid and p.batch_number == batch:
-                if p.expiry_date < date.today():
-                    print("Cannot sell expired product.")
-                    return
-                if p.quantity < qty:
-                    print("Insufficient stock.")
-                    return
+        if not batch:
+            sales = self.sell_product(pid, qty, sale_id)
+            if sales:
+                for sale in sales:
+                    print(f"{sale.sale_id}: {sale.quantity_sold} from batch {sale.batch_number}")
+                print(f"Sale completed. Revenue: {sum(sale.total for sale in sales)}")
+            return
 
-                p.quantity -= qty
-                sale = Sale(sale_id, pid, batch, qty, p.price, date.today())
-                self.sales.append(sale)
-                self.save_products()
-                self.save_sales()
-                print(f"Sale completed. Revenue: {sale.total}")
+        p = self.find_batch(pid, batch)
+        if p is not None:
+            if p.expiry_date < date.today():
+                print("Cannot sell expired product.")
+                return
+            if p.quantity < qty:
+                print("Insufficient stock.")
+                return
+
+            p.quantity -= qty
+            self.sale_ids.claim(sale_id)
+            sale = Sale(sale_id, pid, batch, qty, p.price, date.today())
+            self.sales.append(sale)
+            try:
+                self._persist_sales([sale])
+            except StorageError as e:
+                # Nothing was stored, so undo the in-memory change too
+                self.sales.pop()
+                p.quantity += qty
+                self.sale_ids.release([sale_id])
+                print(f"Sale failed: {e}")
                 return
+            print(f"Sale completed. Revenue: {sale.total}")
+            return
 
         print("Product batch not found.")
 
+    def sales_between(self, start=None, end=None):
+        # Sales dated between start and end (both included). Archived sales only open the
+        # partitions covering the range.
+        if self._archived_sales():
+            return self.sales.between(start, end)
+        return (s for s in self.sales
+                if (start is None or s.date_of_sale >= start) and (end is None or s.date_of_sale <= end))
+
+    def stream_sales(self, start=None, end=None):
+        # Sales dated between start and end read straight from storage, without load_sales,
+        # for one-shot reports. A current snapshot is scanned by day number, other storage
+        # filters while reading, and journalled sales not yet compacted come last.
+        snapshot = self.storage.open_sales_snapshot() if self.storage.supports_snapshots else None
+        if snapshot is not None:
+            yield from snapshot.sales_between(start, end)
+        else:
+            yield from self.iter_sales(None, start, end)
+        yield from self._journal_sales(start, end)
+
+    def _journal_sales(self, start=None, end=None):
+        for sale in self._journal_sales_pending():
+            if (start is None or sale.date_of_sale >= start) and (end is None or sale.date_of_sale <= end):
+                yield sale
+
+    @metrics.timed("shop.rollup_between")
+    def rollup_between(self, start=None, end=None):
+        # A SalesRollup of the sales between start and end read straight from storage, for
+        # one-shot reports. A current snapshot is summed without building Sale objects.
+        rollup = SalesRollup()
+        snapshot = self.storage.open_sales_snapshot() if self.storage.supports_snapshots else None
+        if snapshot is None:
+            rollup.add_all(self.stream_sales(start, end))
+            return rollup
+        for product_id, _, quantity, price, day in snapshot.raw_sales(start, end):
+            rollup.add_values(day, product_id, quantity, quantity * price)
+        rollup.add_all(self._journal_sales(start, end))
+        return rollup
+
+    @property
+    def top_sellers(self):
+        # Best sellers per day and month in fixed memory, see top_sellers.py. Started from the
+        # rollups on first use, then fed each recorded sale.
+        if self._top_sellers is None:
+            self._top_sellers = load("top_sellers").TopSellers.from_rollup(self.rollup)
+        return self._top_sellers
+
+    @metrics.timed("shop.best_sellers")
+    def best_sellers(self, n=20, window="day", day=None):
+        # The n best selling products by revenue of the day or month containing `day` (default
+        # today), with error bounds, see TopSellers.top
+        return self.top_sellers.top(n, window, day)
+
+    def ask_date_range(self):
+        # (start, end) typed by the user, either may be None. None for an invalid date.
+        try:
+            start = input("From date (YYYY-MM-DD, empty for the first sale): ").strip()
+            end = input("To date (YYYY-MM-DD, empty for today): ").strip()
+            return (parse_date(start) if start else None), (parse_date(end) if end else None)
+        except ValueError:
+            print("Invalid date.")
+            return None
+
     def view_sales(self):
+        date_range = self.ask_date_range()
+        if date_range is None:
+            return
+        start, end = date_range
         print("\nSaleID | Product | Batch | Qty | Price | Total | Date")
         print("-" * 70)
-        total_revenue = 0
-        for s in self.sales:
-            total_revenue += s.total
-            print(f"{s.sale_id} | {s.product_id} | {s.batch_number} | {s.quantity_sold} | {s.price} | {s.total} | {s.date_of_sale}")
+        lines = (
+            f"{s.sale_id} | {s.product_id} | {s.batch_number} | {s.quantity_sold} | {s.price} | {s.total} | {s.date_of_sale}"
+            for s in self.sales_between(start, end)
+        )
+        print_in_pages(lines)
+        total_revenue = self.rollup.revenue(start, end)
         print(f"\nTOTAL REVENUE: {total_revenue}")
 
-    def remove_expired_products(self):
-        today = date.today()
-        remaining_products = []
+    def view_sales_summary(self):
+        period = input("Summary by day, week or month? [day]: ").strip().lower() or "day"
+        if period not in ("day", "week", "month"):
+            print("Invalid period.")
+            return
+        date_range = self.ask_date_range()
+        if date_range is None:
+            return
+        start, end = date_range
+        print(f"\n{'Period starting':<16}| Revenue")
+        print("-" * 30)
+        for first, revenue in self.rollup.revenue_by_period(period, start, end).items():
+            print(f"{str(first):<16}| {revenue}")
 
-        for product in self.products:
-            # Handle both string and date expiry formats
-            if isinstance(product.expiry_date, str):
-                expiry = datetime.strptime(product.expiry_date, "%Y-%m-%d").date()
-            else:
-                expiry = product.expiry_date
+        print("\nTop 5 products by revenue")
+        for product_id, revenue in self.rollup.top_products(5, start, end):
+            print(f"{product_id:<16}| {revenue}")
 
-            if expiry < today:
-                log_removed_product(product, "Expired")
-            else:
-                remaining_products.append(product)
+        # Live estimates, the true revenue is within the error below each estimate
+        for window, title in (("day", "today"), ("month", "this month")):
+            print(f"\nBest sellers {title}")
+            for product_id, revenue, error, _ in self.best_sellers(5, window)["top"]:
+                print(f"{product_id:<16}| {revenue}" + (f" (-{error})" if error else ""))
 
-        self.products = remaining_products
-        self.save_products()
+    def remove_expired_products(self):
+        self.sweep_expired()
         print("Expired products removed and logged successfully.")
 
+    @metrics.timed("shop.expiry_sweep")
+    def sweep_expired(self, today=None):
+        # The expiry index hands back only the batches expired before today, in expiry order,
+        # so a sweep costs as much as the batches it removes. Also run by the ExpirySweeper.
+        expired = [self.batch_index[key] for key in self.expiry_index.pop_expired(today or date.today())]
+        self._remove_batches(expired, "Expired")
+        return expired
+
+    def remove_batch(self, product_id, batch_number, reason):
+        # Takes a damaged or recalled batch off the shelf, logged with its reason
+        product = self.find_batch(product_id, batch_number)
+        if product is None:
+            return False
+        self._remove_batches([product], reason)
+        return True
+
+    def _remove_batches(self, products, reason):
+        # The removals are logged in one batch write before the batches are dropped
+        if not products:
+            return
+        self.storage.log_removed_products(products, reason)
+        for product in products:
+            self._unindex_product(product)
+
+        removed = {(p.product_id, p.batch_number) for p in products}
+        self.products = [p for p in self.products if (p.product_id, p.batch_number) not in removed]
+        if self.storage.supports_row_updates:
+            pass    # Logging the removals flagged these batches as removed
+        elif self.journal is not None:
+            for product in products:
+                self.journal.append_remove(product)
+            self._after_journal_write()
+        else:
+            for product in products:
+                self._mark_removed(product)
+            self.save_product_changes()
+
     def view_removed_expired_products(self):
         try:
-            # Try to read the removed products log
-            with open("removed_products.csv", "r", newline="") as file:
-                reader = csv.reader(file)
-                removed = list(reader)
+            date_range = self.ask_date_range()
+            if date_range is None:
+                return
+            start, end = date_range
+            reason = input(f"Reason ({', '.join(REMOVAL_REASONS)}, empty for all): ").strip().capitalize() or None
+            if reason is not None and reason not in REMOVAL_REASONS:
+                print("Invalid reason.")
+                return
 
-            if not removed:
-                print("\nNo expired products have been removed yet.")
+            # Only the rows in the range are read, a page at a time as the user asks for more
+            removed = iter(self.iter_removed(start, end, reason))
+            first = next(removed, None)
+
+            if first is None:
+                print("\nNo products have been removed in that range.")
                 return
 
             # Print header
-            print("\nProductID | Name | Batch | Price | Quantity | Expiry Date | Reason Removed")
+            print(f"\n{self.storage.count_removed(start, end, reason)} removed batch(es)")
+            print("ProductID | Batch | Name | Price | Quantity | Expiry Date | Reason Removed | Removal Date")
             print("-" * 80)
 
-            for row in removed:
-                # Assuming log format: [product_id, name, batch_number, price, quantity, expiry_date, reason]
-                print(" | ".join(row))
+            # Log format: [product_id, batch_number, name, price, quantity, expiry_date, reason, removal_date]
+            print_in_pages(" | ".join(row) for row in itertools.chain([first], removed))
 
         except FileNotFoundError:
             print("\nNo removed products log found.")
@@ -335,9 +1011,30 @@ class ShopSystem:
             print(f"\nAn error occurred while viewing removed products: {e}")
 
     # ---------- Menu ----------
-    def run(self):
+    def view_metrics(self):
+        # Timers and counters collected since start-up, see metrics.py
+        if not metrics.enabled:
+            if input("Metrics are off. Turn them on now? (y/n): ").strip().lower() == "y":
+                metrics.enable()
+                print("Metrics on. Use the shop, then come back here to see the timings.")
+            return
+        print()
+        for line in metrics.report():
+            print(line)
+
+    def run(self, sweep=True):
+        # Returns the exit status. The data lock is held until the menu has saved, so a one-shot
+        # command cannot append a change that the final compaction would then drop.
+        try:
+            data_lock = DataLock(self.storage.lock_file).acquire()
+        except StorageError as e:
+            print(e)
+            return 1
         self.load_products()
         self.load_sales()
+        sweeper = load("sweeper").ExpirySweeper(self) if sweep else None
+        if sweeper is not None:
+            sweeper.start()
 
         while True:
             print("\n--- ShopSystem Menu ---")
@@ -348,32 +1045,76 @@ class ShopSystem:
             print("5. Remove Expired Products")
             print("6. View Sales")
             print("7. View Removed Expired Products")
-            print("8. Save & Exit")
+            print("8. Sales Summary")
+            print("9. Search Products")
+            print("10. Metrics")
+            print("11. Save & Exit")
 
             choice = input("Choose option: ")
 
-            if choice == "1":
-                self.view_products()
-            elif choice == "2":
-                self.add_product()
-            elif choice == "3":
-                self.update_price()
-            elif choice == "4":
-                self.make_sale()
-            elif choice == "5":
-                self.remove_expired_products()
-            elif choice == "6":
-                self.view_sales()
-            elif choice == "7":
-                self.view_removed_expired_products()  # instead of removing again
-            elif choice == "8":
-                self.save_products()
-                self.save_sales()
-                print("Data saved. Goodbye!")
-                break
-            else:
-                print("Invalid choice.")
+            # The sweeper waits while an option runs, so it never changes stock mid-sale
+            with self.lock:
+                if choice == "1":
+                    self.view_products()
+                elif choice == "2":
+                    self.add_product()
+                elif choice == "3":
+                    self.update_price()
+                elif choice == "4":
+                    self.make_sale()
+                elif choice == "5":
+                    self.remove_expired_products()
+                elif choice == "6":
+                    self.view_sales()
+                elif choice == "7":
+                    self.view_removed_expired_products()  # instead of removing again
+                elif choice == "8":
+                    self.view_sales_summary()
+                elif choice == "9":
+                    self.search_products()
+                elif choice == "10":
+                    self.view_metrics()
+                elif choice == "11":
+                    break
+                else:
+                    print("Invalid choice.")
+
+        if sweeper is not None:
+            sweeper.stop()
+        self.save()
+        if self.journal is not None:
+            self.journal.close()
+        self.storage.close()
+        data_lock.release()
+        print("Data saved. Goodbye!")
+        return 0
 
 # ===================== Run =====================
 if __name__ == "__main__":
-    ShopSystem().run()
+    # python shopsystem.py                    -> CSV files with a journal and binary snapshots
+    # python shopsystem.py shop.db            -> SQLite database (see migrate_to_sqlite.py)
+    # python shopsystem.py --archive          -> sales kept in monthly files, see archive.py
+    # python shopsystem.py --profile cpu      -> also write a cProfile capture to shop_profile.txt
+    # python shopsystem.py --no-sweep         -> no background removal of expired stock, see sweeper.py
+    parser = argparse.ArgumentParser(description="Inventory and sales tracking for a small shop.")
+    parser.add_argument("db", nargs="?", help="SQLite database to use instead of the CSV files")
+    parser.add_argument("--metrics", action="store_true", help="collect timings from the start (see menu option 10)")
+    parser.add_argument("--profile", choices=["cpu", "memory"], help="profile with cProfile or tracemalloc")
+    parser.add_argument("--no-sweep", action="store_true", help="only remove expired stock from menu option 5")
+    parser.add_argument("--archive", nargs="?", const="month", choices=sorted(load("archive").PERIODS),
+                        help="keep sales in files per month (or the given period) under sales_archive/")
+    args = parser.parse_args()
+
+    if args.metrics:
+        metrics.enable()
+    start_profiling(args.profile)
+    if args.db:
+        system = ShopSystem(storage=SqliteStorage(args.db))
+    elif args.archive:
+        system = ShopSystem(journal=Journal(), storage=load("archive").ArchiveStorage(period=args.archive))
+    else:
+        system = ShopSystem(journal=Journal(), storage=load("snapshot").SnapshotStorage())
+    system.run(sweep=not args.no_sweep)
+    profile_file = stop_profiling()
+    if profile_file:
+        print(f"Profile written to {profile_file}")
@@ -0,0 +1,373 @@
+import mmap
+import os
+import struct
+from collections.abc import MutableSequence
+from datetime import date
+
+try:
+    from .models import Product, Sale
+    from .rollups import SalesRollup
+    from .storage import CsvStorage, REMOVED_FILE, file_stamp
+except ImportError:  # Running as a script from inside src/
+    from models import Product, Sale
+    from rollups import SalesRollup
+    from storage import CsvStorage, REMOVED_FILE, file_stamp
+
+# Binary snapshots of products.csv and sales.csv, so startup does not parse the CSV files.
+# A snapshot file is a header, a string table (IDs and names, stored once each) and
+# fixed-width records packed with struct. It is opened with mmap and a record is only
+# decoded when it is read, so opening a history of millions of sales takes milliseconds.
+# The CSV files stay the interchange format: a snapshot is only used while the CSV file it
+# was written with is unchanged, otherwise the CSV file is read as before.
+#
+#   header   magic, kind, record count, string count, CSV size, CSV mtime
+#   offsets  string count + 1 uint32 offsets into the string blob
+#   blob     UTF-8 strings
+#   records  product: id, batch, name, category (string numbers), price, quantity, expiry day number
+#            sale:    sale id, product id, batch (string numbers), quantity, price, day number
+
+MAGIC = b"SHOPSNP2"         # SHOPSNP1 had no product category, such snapshots are ignored until the next save
+HEADER = struct.Struct("<8sIIIqq")
+OFFSET = struct.Struct("<I")
+PRODUCT_KIND, SALE_KIND = 1, 2
+RECORDS = {
+    PRODUCT_KIND: struct.Struct("<IIIIdqi"),
+    SALE_KIND: struct.Struct("<IIIqdi"),
+}
+
+
+def _source_stamp(source_file):
+    # (size, mtime) of the CSV file a snapshot was written with
+    try:
+        stat = os.stat(source_file)
+    except FileNotFoundError:
+        return -1, -1
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_snapshot(filename, kind, records, source_file):
+    # records: Product objects for PRODUCT_KIND, Sale objects for SALE_KIND.
+    # Written to a temporary file first, so a crash never leaves a half-written snapshot.
+    strings, numbers = [], {}
+
+    def number(text):
+        n = numbers.get(text)
+        if n is None:
+            n = numbers[text] = len(strings)
+            strings.append(text.encode())
+        return n
+
+    record = RECORDS[kind]
+    packed = bytearray()
+    count = 0
+    for r in records:
+        if kind == PRODUCT_KIND:
+            packed += record.pack(number(r.product_id), number(r.batch_number), number(r.name), number(r.category),
+                                  r.price, r.quantity, r.expiry_date.toordinal())
+        else:
+            packed += record.pack(number(r.sale_id), number(r.product_id), number(r.batch_number),
+                                  r.quantity_sold, r.price, r.date_of_sale.toordinal())
+        count += 1
+
+    offsets = [0]
+    for s in strings:
+        offsets.append(offsets[-1] + len(s))
+    size, mtime = _source_stamp(source_file)
+
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as file:
+        file.write(HEADER.pack(MAGIC, kind, count, len(strings), size, mtime))
+        file.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        file.write(b"".join(strings))
+        file.write(packed)
+    os.replace(tmp, filename)
+
+
+class Snapshot:
+    # Read-only sequence of the Products or Sales in a snapshot file, decoded on access
+    def __init__(self, filename):
+        self.filename = filename
+        with open(filename, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.kind, self.count, string_count, self.source_size, self.source_mtime = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or self.kind not in RECORDS:
+            self.close()
+            raise ValueError(f"{filename} is not a shop snapshot.")
+        self._record = RECORDS[self.kind]
+        self._offsets_at = HEADER.size
+        self._blob_at = self._offsets_at + OFFSET.size * (string_count + 1)
+        blob_size = OFFSET.unpack_from(self._map, self._offsets_at + OFFSET.size * string_count)[0]
+        self._records_at = self._blob_at + blob_size
+        self._string_count = string_count
+        self._strings = {}          # string number -> str, filled as records are read
+        self._days = {}             # day number -> date
+
+    def matches(self, source_file):
+        # True while the CSV file is the one this snapshot was written with
+        return _source_stamp(source_file) == (self.source_size, self.source_mtime)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _string(self, n):
+        text = self._strings.get(n)
+        if text is None:
+            start, end = struct.unpack_from("<II", self._map, self._offsets_at + OFFSET.size * n)
+            text = self._strings[n] = self._map[self._blob_at + start:self._blob_at + end].decode()
+        return text
+
+    def _offset(self, n):
+        return OFFSET.unpack_from(self._map, self._offsets_at + OFFSET.size * n)[0]
+
+    def _number_of(self, text):
+        # String number of `text`, or None when no record uses it. The blob is searched for the
+        # bytes and a match counts only where a string starts and ends, found by binary search
+        # of the offsets, so nothing else is decoded.
+        data = text.encode()
+        at = self._map.find(data, self._blob_at, self._records_at)
+        while at != -1:
+            start = at - self._blob_at
+            low, high = 0, self._string_count
+            while low < high:
+                middle = (low + high) // 2
+                if self._offset(middle) < start:
+                    low = middle + 1
+                else:
+                    high = middle
+            if low < self._string_count and self._offset(low) == start and self._offset(low + 1) == start + len(data):
+                return low
+            at = self._map.find(data, at + 1, self._records_at)
+        return None
+
+    def _records(self):
+        return memoryview(self._map)[self._records_at:self._records_at + self._record.size * self.count]
+
+    def _column(self, word, code="I"):
+        # One 4-byte field of every record as a list, read through a strided view of the
+        # records instead of unpacking each record. `word` is the field's position in 4-byte words.
+        records = self._records()
+        try:
+            return records.cast(code)[word::self._record.size // 4].tolist()
+        finally:
+            records.release()
+
+    def _day(self, number):
+        day = self._days.get(number)
+        if day is None:
+            day = self._days[number] = date.fromordinal(number)
+        return day
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("snapshot index out of range")
+        fields = self._record.unpack_from(self._map, self._records_at + self._record.size * i)
+        if self.kind == PRODUCT_KIND:
+            pid, batch, name, category, price, quantity, day = fields
+            return Product(self._string(pid), self._string(batch), self._string(name), price, quantity,
+                           self._day(day), self._string(category))
+        sale_id, pid, batch, quantity, price, day = fields
+        return Sale(self._string(sale_id), self._string(pid), self._string(batch), quantity, price, self._day(day))
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def products_of(self, product_ids):
+        # The Products of the given product IDs. Only their string numbers are compared while the
+        # records are scanned, so loading one product's batches decodes just those batches.
+        numbers = {n for n in map(self._number_of, product_ids) if n is not None}
+        if not numbers:
+            return []
+        return [self[i] for i, n in enumerate(self._column(0)) if n in numbers]
+
+    def sales_between(self, start=None, end=None):
+        # Sales dated between start and end (both included), compared by day number and only
+        # decoded when they match
+        low = start.toordinal() if start else 0
+        high = end.toordinal() if end else date.max.toordinal()
+        matches = [i for i, day in enumerate(self._column(self._record.size // 4 - 1, "i")) if low <= day <= high]
+        return (self[i] for i in matches)
+
+    def raw_sales(self, start=None, end=None):
+        # (product_id, batch_number, quantity, price, date) per sale without building Sale objects,
+        # for totals such as the sales rollups. Optionally only the sales dated between start and end.
+        low = start.toordinal() if start else 0
+        high = end.toordinal() if end else date.max.toordinal()
+        records = self._records()
+        try:
+            for _, pid, batch, quantity, price, day in self._record.iter_unpack(records):
+                if low <= day <= high:
+                    yield self._string(pid), self._string(batch), quantity, price, self._day(day)
+        finally:
+            records.release()
+
+    def sale_ids(self):
+        # The sale ID of every sale, for rebuilding the sale ID sequence
+        records = self._records()
+        try:
+            for record in self._record.iter_unpack(records):
+                yield self._string(record[0])
+        finally:
+            records.release()
+
+
+class SalesHistory(MutableSequence):
+    # ShopSystem.sales backed by a sales snapshot: the snapshotted sales are read from the
+    # mapped file on access, sales recorded since are kept in a normal list after them.
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.base = len(snapshot)
+        self.tail = []
+
+    def _materialize(self):
+        # Only needed to change a snapshotted sale, which the shop never does in normal use
+        if self.base:
+            self.tail[:0] = list(self.snapshot)
+            self.base = 0
+
+    def __len__(self):
+        return self.base + len(self.tail)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if i < 0:
+            raise IndexError("sales index out of range")
+        if i < self.base:
+            return self.snapshot[i]
+        return self.tail[i - self.base]
+
+    def __iter__(self):
+        yield from self.snapshot if self.base else ()
+        yield from self.tail
+
+    def _tail_index(self, i):
+        # Index into self.tail for an index or slice that only touches the tail, else None
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step == 1 and (start >= self.base or stop <= start):
+                return slice(max(start - self.base, 0), max(stop - self.base, 0))
+            return None
+        if i < 0:
+            i += len(self)
+        return i - self.base if i >= self.base else None
+
+    def __setitem__(self, i, value):
+        j = self._tail_index(i)
+        if j is None:
+            self._materialize()
+            j = i
+        self.tail[j] = value
+
+    def __delitem__(self, i):
+        j = self._tail_index(i)
+        if j is None:
+            self._materialize()
+            j = i
+        del self.tail[j]
+
+    def insert(self, i, value):
+        if i < 0:
+            i += len(self)
+        if i < self.base:
+            self._materialize()
+            self.tail.insert(i, value)
+        else:
+            self.tail.insert(i - self.base, value)
+
+    def append(self, value):
+        self.tail.append(value)
+
+    def extend(self, values):
+        self.tail.extend(values)
+
+    def raw_sales(self):
+        # Same tuples as Snapshot.raw_sales, for every sale in the history
+        if self.base:
+            yield from self.snapshot.raw_sales()
+        for s in self.tail:
+            yield s.product_id, s.batch_number, s.quantity_sold, s.price, s.date_of_sale
+
+    def sale_ids(self):
+        if self.base:
+            yield from self.snapshot.sale_ids()
+        for s in self.tail:
+            yield s.sale_id
+
+
+class SnapshotStorage(CsvStorage):
+    # CSV storage that also writes a binary snapshot next to each CSV file on save,
+    # and loads from the snapshot while it is current
+    supports_snapshots = True
+
+    def __init__(self, products_file="products.csv", sales_file="sales.csv", removed_file=REMOVED_FILE):
+        super().__init__(products_file, sales_file, removed_file)
+        self.products_snapshot = os.path.splitext(products_file)[0] + ".snap"
+        self.sales_snapshot = os.path.splitext(sales_file)[0] + ".snap"
+        self.sales_rollup = os.path.splitext(sales_file)[0] + "_rollup.csv"
+        self._open = {}         # snapshot file -> (file_stamp, Snapshot)
+
+    def _open_snapshot(self, filename, source_file):
+        # Snapshot for the CSV file, or None when it is missing, damaged or out of date.
+        # Each file is mapped once and shared until a save replaces it. The replaced snapshot is
+        # dropped rather than closed, as a SalesHistory may still read it, and is unmapped once unused.
+        stamp = file_stamp(filename)
+        cached = self._open.get(filename)
+        if cached is None or cached[0] != stamp:
+            self._open.pop(filename, None)
+            try:
+                snapshot = Snapshot(filename)
+            except (OSError, ValueError, struct.error):
+                return None
+            self._open[filename] = cached = (stamp, snapshot)
+        snapshot = cached[1]
+        return snapshot if snapshot.matches(source_file) else None
+
+    def open_products_snapshot(self):
+        if self.delta_size():
+            return None         # Changes since products.csv was written are only in the delta file
+        return self._open_snapshot(self.products_snapshot, self.products_file)
+
+    def open_sales_snapshot(self):
+        return self._open_snapshot(self.sales_snapshot, self.sales_file)
+
+    def save_products(self, products, filename=None):
+        super().save_products(products, filename)
+        if filename is None:
+            write_snapshot(self.products_snapshot, PRODUCT_KIND, products, self.products_file)
+
+    def save_sales(self, sales, filename=None):
+        sales = list(sales)     # Read every sale before the files they may come from are replaced
+        super().save_sales(sales, filename)
+        if filename is None:
+            write_snapshot(self.sales_snapshot, SALE_KIND, sales, self.sales_file)
+
+    def save_sales_rollup(self, rollup):
+        rollup.save(self.sales_rollup)
+
+    def load_sales_rollup(self):
+        # The rollups saved with the sales snapshot, or None when they are older than it
+        try:
+            if os.stat(self.sales_rollup).st_mtime_ns < os.stat(self.sales_snapshot).st_mtime_ns:
+                return None
+            return SalesRollup.load(self.sales_rollup)
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def close(self):
+        super().close()
+        for _, snapshot in self._open.values():
+            snapshot.close()
+        self._open = {}
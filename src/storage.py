@@ -0,0 +1,870 @@
+import bisect
+import csv
+import itertools
+import os
+import sqlite3
+import time
+from datetime import date
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+try:
+    from .models import DEFAULT_CATEGORY
+except ImportError:  # Running as a script from inside src/
+    from models import DEFAULT_CATEGORY
+
+# Storage backends for ShopSystem.
+# Both backends share the same API: load_* methods return rows as dictionaries and
+# save_* methods take the in-memory objects, so ShopSystem does not care where data lives.
+# CsvStorage keeps the original flat files, SqliteStorage maps the groupF_ddl.sql schema.
+
+PRODUCT_FIELDS = ["product_id", "batch_number", "name", "category", "price", "quantity", "expiry_date"]
+SALE_FIELDS = ["sale_id", "product_id", "batch_number", "quantity_sold", "price", "total", "date_of_sale"]
+REMOVED_FIELDS = [
+    "product_id",
+    "batch_number",
+    "name",
+    "price",
+    "quantity",
+    "expiry_date",
+    "removal_reason",
+    "removal_date"
+]
+
+REMOVED_FILE = "removed_products.csv"
+REMOVAL_REASONS = ("Expired", "Damaged", "Recalled", "Other")     # As in the RemovedProducts CHECK constraint
+SEQUENCES_FILE = "id_sequences.csv"     # High-water marks of the ID sequences, see sequences.py
+LOCK_FILE = "shop.lock"     # Held by the process changing the data files, see DataLock
+DELTA_FIELDS = ["change", "version"] + PRODUCT_FIELDS    # change is "put" or "remove"
+CHUNK_SIZE = 1000       # Rows read from the database per fetch when streaming
+
+
+class StorageError(Exception):
+    # Raised when a backend refuses a change, e.g. a database constraint
+    pass
+
+
+class DataLock:
+    # Exclusive lock on a data folder (or database), held by the one process changing it: the menu
+    # and the service for as long as they run, a one-shot command for its single change.
+    # The menu and the service keep the data in memory and rewrite the files when they compact,
+    # so a change another process appended meanwhile would be lost; with the lock it is refused instead.
+    # The operating system drops the lock when the process ends, even after a crash.
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def acquire(self, wait=0):
+        # Raises StorageError when another process still holds the lock after `wait` seconds
+        file = open(self.path, "a+")
+        deadline = time.monotonic() + wait
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    file.seek(0)
+                    msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if time.monotonic() >= deadline:
+                    file.close()
+                    raise StorageError(f"The shop data is in use by another process (lock file {self.path}).")
+                time.sleep(0.05)
+        self.file = file
+        return self
+
+    def release(self):
+        # Closing the file releases the lock
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def write_csv_atomically(filename, fieldnames, rows):
+    # Writes a temporary file next to `filename` and swaps it in with os.replace, so a crash
+    # mid-write leaves the old file whole instead of a truncated one
+    tmp = filename + ".tmp"
+    with open(tmp, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, filename)
+
+
+def file_stamp(filename):
+    # Size, modification time and inode of a file, "" when it does not exist. Files are rewritten
+    # by swapping in a new file, so the inode changes even when the time is too coarse to.
+    # A Journal keeps the stamps of the files it was started over, see journal.py.
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return ""
+    return f"{st.st_size}:{st.st_mtime_ns}:{st.st_ino}"
+
+
+def filter_by_date(rows, start=None, end=None, field="date_of_sale"):
+    # ISO dates sort as text, so rows are compared without parsing them
+    if start is None and end is None:
+        return rows
+    low = str(start) if start else ""
+    high = str(end) if end else "9999-12-31"
+    return (row for row in rows if low <= row[field] <= high)
+
+
+# ---------- Product deltas ----------
+def product_delta_file(products_file):
+    return os.path.splitext(products_file)[0] + "_delta.csv"
+
+
+def read_product_changes(delta_file):
+    # ({(product_id, batch_number): delta row}, {(product_id, batch_number): version}) keeping the
+    # highest version of each batch. A row cut short by a crash mid-append is ignored.
+    changes = {}
+    versions = {}
+    try:
+        with open(delta_file, newline="") as file:
+            for row in csv.DictReader(file):
+                if not row.get("expiry_date") or row["change"] not in ("put", "remove"):
+                    continue
+                try:
+                    version = int(row["version"])
+                except ValueError:
+                    continue
+                key = (row["product_id"], row["batch_number"])
+                if version >= versions.get(key, 0):
+                    versions[key] = version
+                    changes[key] = row
+    except FileNotFoundError:
+        pass
+    return changes, versions
+
+
+def apply_product_changes(rows, changes):
+    # products.csv rows with the delta applied: changed rows replace theirs, removed rows are
+    # skipped and new batches come last. `changes` is emptied as it is used.
+    for row in rows:
+        change = changes.pop((row["product_id"], row["batch_number"]), None)
+        if change is None:
+            yield row
+        elif change["change"] == "put":
+            yield change
+    for change in changes.values():
+        if change["change"] == "put":
+            yield change
+
+
+def iter_products_file(products_file):
+    # Rows of products.csv with its delta file applied, for readers that need no CsvStorage
+    # (opening one creates the removed products file)
+    changes = read_product_changes(product_delta_file(products_file))[0]
+    with open(products_file, newline="") as file:
+        yield from apply_product_changes(csv.DictReader(file), changes)
+
+
+def init_removed_products_file(filename=REMOVED_FILE):
+    if not os.path.exists(filename):
+        with open(filename, mode="w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(REMOVED_FIELDS)
+
+
+def chunked(rows, size=CHUNK_SIZE):
+    # Groups any iterable into lists of at most `size` items, so big files can be
+    # processed one bounded chunk at a time
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def log_removed_product(product, reason, filename=REMOVED_FILE):
+    with open(filename, mode="a", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow([
+            product.product_id,
+            product.batch_number,
+            product.name,
+            product.price,
+            product.quantity,
+            product.expiry_date,
+            reason,
+            date.today()
+        ])
+
+
+# ---------- Removed products ----------
+class RemovalLog:
+    # removed_products.csv as an audit store. The file is read once, on first use, into its rows
+    # and three indexes, so queries never read the file again:
+    #   keys       (product_id, batch_number, removal_date) of every row, a removal is logged once
+    #   by_date    removal date -> row numbers, with the dates also kept sorted for range queries
+    #   by_reason  removal reason -> row numbers
+    # add() only buffers a removal, flush() appends everything buffered with one open of the file.
+    # Duplicate rows already in the file are skipped, and the next flush rewrites it without them.
+    def __init__(self, filename=REMOVED_FILE):
+        self.filename = filename
+        self.rows = []          # Rows as lists of strings, in file order
+        self.keys = set()
+        self.by_date = {}
+        self.dates = []
+        self.by_reason = {}
+        self.pending = []       # Rows added since the last flush
+        self.duplicates = 0     # Duplicate rows found in the file
+        self._loaded = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        try:
+            with open(self.filename, newline="") as file:
+                reader = csv.reader(file)
+                next(reader, None)
+                for row in reader:
+                    if len(row) != len(REMOVED_FIELDS):
+                        continue        # Cut short by a crash mid-append
+                    if not self._index(row):
+                        self.duplicates += 1
+        except FileNotFoundError:
+            pass
+
+    def _index(self, row):
+        # Adds a row to the indexes, False when the same removal is already there
+        key = (row[0], row[1], row[7])
+        if key in self.keys:
+            return False
+        self.keys.add(key)
+        number = len(self.rows)
+        self.rows.append(row)
+        numbers = self.by_date.get(row[7])
+        if numbers is None:
+            numbers = self.by_date[row[7]] = []
+            bisect.insort(self.dates, row[7])
+        numbers.append(number)
+        self.by_reason.setdefault(row[6], []).append(number)
+        return True
+
+    def __len__(self):
+        self._load()
+        return len(self.rows)
+
+    def add(self, product, reason, removal_date=None):
+        # Buffers one removal, False when that batch was already logged as removed that day
+        if reason not in REMOVAL_REASONS:
+            raise StorageError(f"Unknown removal reason {reason!r}, expected one of {', '.join(REMOVAL_REASONS)}.")
+        self._load()
+        row = [product.product_id, product.batch_number, product.name, str(product.price), str(product.quantity),
+               str(product.expiry_date), reason, str(removal_date or date.today())]
+        if not self._index(row):
+            return False
+        self.pending.append(row)
+        return True
+
+    def flush(self):
+        self._load()
+        if self.duplicates:
+            write_csv_atomically(self.filename, REMOVED_FIELDS, (dict(zip(REMOVED_FIELDS, row)) for row in self.rows))
+            self.duplicates = 0
+        elif self.pending:
+            init_removed_products_file(self.filename)
+            with open(self.filename, "a", newline="") as file:
+                csv.writer(file).writerows(self.pending)
+                file.flush()
+                os.fsync(file.fileno())
+        self.pending = []
+
+    def select(self, start=None, end=None, reason=None):
+        # Rows removed between start and end (both included) for the reason, when given,
+        # oldest removal first. Only the rows in range are looked at.
+        self._load()
+        if start is None and end is None and reason is not None:
+            numbers = sorted(self.by_reason.get(reason, ()), key=lambda n: (self.rows[n][7], n))
+            return (self.rows[n] for n in numbers)
+        low = bisect.bisect_left(self.dates, str(start)) if start else 0
+        high = bisect.bisect_right(self.dates, str(end)) if end else len(self.dates)
+        numbers = (n for day in self.dates[low:high] for n in self.by_date[day])
+        return (self.rows[n] for n in numbers if reason is None or self.rows[n][6] == reason)
+
+    def count(self, start=None, end=None, reason=None):
+        self._load()
+        if start is None and end is None:
+            return len(self.rows) if reason is None else len(self.by_reason.get(reason, ()))
+        if reason is None:
+            low = bisect.bisect_left(self.dates, str(start)) if start else 0
+            high = bisect.bisect_right(self.dates, str(end)) if end else len(self.dates)
+            return sum(len(self.by_date[day]) for day in self.dates[low:high])
+        return sum(1 for _ in self.select(start, end, reason))
+
+
+def page(rows, offset=0, limit=None):
+    # Rows offset .. offset + limit of an iterable
+    return itertools.islice(rows, offset, None if limit is None else offset + limit)
+
+
+# ===================== CSV backend =====================
+class CsvStorage:
+    # Flat files cannot update one row in place, so ShopSystem rewrites them or uses a Journal.
+    # Without a Journal, changed product batches are appended to a delta file next to
+    # products.csv (products_delta.csv) and products.csv is only rewritten once the delta grows
+    # large. Each delta row carries the batch's version, a count of its changes, and the row
+    # with the highest version wins when products are read back.
+    supports_row_updates = False
+    supports_product_deltas = True
+    supports_snapshots = False      # See SnapshotStorage in snapshot.py
+    supports_sales_archive = False  # See ArchiveStorage in archive.py
+
+    def __init__(self, products_file="products.csv", sales_file="sales.csv", removed_file=REMOVED_FILE,
+                 sequences_file=None):
+        self.products_file = products_file
+        self.sales_file = sales_file
+        self.removed_file = removed_file
+        # Kept next to products.csv so each data folder has its own sequences
+        self.sequences_file = sequences_file or os.path.join(os.path.dirname(products_file), SEQUENCES_FILE)
+        self.lock_file = os.path.join(os.path.dirname(products_file), LOCK_FILE)
+        self.delta_file = product_delta_file(products_file)
+        self.delta_versions = None      # (product_id, batch_number) -> latest version in the delta file
+        init_removed_products_file(self.removed_file)
+        self.removals = RemovalLog(self.removed_file)
+
+    # iter_* read the file lazily, one row at a time, so memory use does not grow with the file
+    def iter_products(self, filename=None, product_ids=None):
+        # products.csv with the delta file applied, only the delta is held in memory.
+        # With product_ids, only the batches of those products.
+        changes = self.read_product_changes() if filename is None else {}
+        rows = apply_product_changes(self._iter_product_rows(filename), changes)
+        if product_ids is not None:
+            rows = (row for row in rows if row["product_id"] in product_ids)
+        yield from rows
+
+    def _iter_product_rows(self, filename=None):
+        try:
+            with open(filename or self.products_file, newline="") as file:
+                yield from csv.DictReader(file)
+        except FileNotFoundError:
+            print("products.csv not found. Starting empty.")
+
+    def load_products(self, filename=None):
+        return list(self.iter_products(filename))
+
+    def save_products(self, products, filename=None):
+        write_csv_atomically(filename or self.products_file, PRODUCT_FIELDS, (p.as_row() for p in products))
+        if filename is None or os.path.abspath(filename) == os.path.abspath(self.products_file):
+            # Everything in the delta is in products.csv now
+            if os.path.exists(self.delta_file):
+                os.remove(self.delta_file)
+            self.delta_versions = {}
+
+    # ---------- Product deltas ----------
+    def read_product_changes(self):
+        changes, self.delta_versions = read_product_changes(self.delta_file)
+        return changes
+
+    def delta_size(self):
+        # Batches with a change in the delta file, i.e. rows a compaction would fold in
+        if self.delta_versions is None:
+            self.read_product_changes()
+        return len(self.delta_versions)
+
+    def save_product_changes(self, changed, removed):
+        # Appends one row per changed or removed Product, numbered with the next version of its batch
+        if self.delta_versions is None:
+            self.read_product_changes()
+        is_new = not os.path.exists(self.delta_file) or os.path.getsize(self.delta_file) == 0
+        with open(self.delta_file, "a", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=DELTA_FIELDS)
+            if is_new:
+                writer.writeheader()
+            for change, products in (("put", changed), ("remove", removed)):
+                for p in products:
+                    key = (p.product_id, p.batch_number)
+                    version = self.delta_versions.get(key, 0) + 1
+                    self.delta_versions[key] = version
+                    row = p.as_row()
+                    row["change"] = change
+                    row["version"] = version
+                    writer.writerow(row)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def iter_sales(self, filename=None, start=None, end=None):
+        # Rows dated between start and end (both included) when given. The file is still read
+        # to the end, see ArchiveStorage in archive.py for sales split into monthly files.
+        try:
+            with open(filename or self.sales_file, newline="") as file:
+                yield from filter_by_date(csv.DictReader(file), start, end)
+        except FileNotFoundError:
+            print("sales.csv not found. Starting empty.")
+
+    def load_sales(self, filename=None):
+        return list(self.iter_sales(filename))
+
+    def save_sales(self, sales, filename=None):
+        write_csv_atomically(filename or self.sales_file, SALE_FIELDS, (s.as_row() for s in sales))
+
+    def log_removed_product(self, product, reason):
+        return self.log_removed_products([product], reason)
+
+    def log_removed_products(self, products, reason, removal_date=None):
+        # One append for the whole batch, e.g. an expiry sweep. Returns how many were new.
+        logged = sum(self.removals.add(p, reason, removal_date) for p in products)
+        self.removals.flush()
+        return logged
+
+    def iter_removed(self, start=None, end=None, reason=None, offset=0, limit=None):
+        # Removed product rows, oldest removal first, optionally by removal date range, reason and page
+        return page(self.removals.select(start, end, reason), offset, limit)
+
+    def count_removed(self, start=None, end=None, reason=None):
+        return self.removals.count(start, end, reason)
+
+    def load_removed(self):
+        return list(self.iter_removed())
+
+    def journal_stamps(self):
+        # Stamps of the files a compaction rewrites, written at the start of each Journal
+        return {"products": file_stamp(self.products_file), "sales": file_stamp(self.sales_file)}
+
+    def load_sequences(self):
+        # {prefix: high-water mark}
+        try:
+            with open(self.sequences_file, newline="") as file:
+                return {row["name"]: int(row["high"]) for row in csv.DictReader(file)}
+        except FileNotFoundError:
+            return {}
+
+    def save_sequence(self, name, high):
+        # The file is tiny, so it is rewritten whole: to a temporary file first, then swapped in
+        marks = self.load_sequences()
+        marks[name] = high
+        tmp = self.sequences_file + ".tmp"
+        with open(tmp, "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["name", "high"])
+            writer.writerows(sorted(marks.items()))
+        os.replace(tmp, self.sequences_file)
+
+    def close(self):
+        pass
+
+
+# ===================== SQLite backend =====================
+# SQLite version of groupF_ddl.sql. REGEXP is not built into SQLite so the ID checks use GLOB:
+# a letter, at least three digits and nothing else.
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS Products (
+    product_id      TEXT            NOT NULL,
+    name            TEXT            NOT NULL,
+    category        TEXT            NOT NULL DEFAULT 'General',
+    unit            TEXT            NOT NULL DEFAULT 'unit',
+
+    CONSTRAINT pk_products          PRIMARY KEY (product_id),
+    CONSTRAINT uq_products_name     UNIQUE (name),
+    CONSTRAINT ck_products_id       CHECK (product_id GLOB 'P[0-9][0-9][0-9]*' AND product_id NOT GLOB 'P*[^0-9]*')
+);
+
+CREATE TABLE IF NOT EXISTS Batches (
+    product_id      TEXT            NOT NULL,
+    batch_number    TEXT            NOT NULL,
+    price           REAL            NOT NULL,
+    quantity        INTEGER         NOT NULL DEFAULT 0,
+    expiry_date     TEXT            NOT NULL,
+    removed         INTEGER         NOT NULL DEFAULT 0,     -- Set by a removal, cleared by a restock
+
+    CONSTRAINT pk_batches           PRIMARY KEY (product_id, batch_number),
+    CONSTRAINT fk_batches_product   FOREIGN KEY (product_id)
+                                    REFERENCES Products(product_id)
+                                    ON DELETE RESTRICT
+                                    ON UPDATE CASCADE,
+    CONSTRAINT ck_batches_price     CHECK (price > 0),
+    CONSTRAINT ck_batches_qty       CHECK (quantity >= 0),
+    CONSTRAINT ck_batch_number      CHECK (batch_number GLOB 'B[0-9][0-9][0-9]*' AND batch_number NOT GLOB 'B*[^0-9]*')
+);
+
+CREATE TABLE IF NOT EXISTS Sales (
+    sale_id         TEXT            NOT NULL,
+    product_id      TEXT            NOT NULL,
+    batch_number    TEXT            NOT NULL,
+    quantity_sold   INTEGER         NOT NULL,
+    price           REAL            NOT NULL,
+    date_of_sale    TEXT            NOT NULL,
+
+    CONSTRAINT pk_sales             PRIMARY KEY (sale_id),
+    CONSTRAINT fk_sales_batch       FOREIGN KEY (product_id, batch_number)
+                                    REFERENCES Batches(product_id, batch_number)
+                                    ON DELETE RESTRICT
+                                    ON UPDATE CASCADE,
+    CONSTRAINT ck_sales_qty         CHECK (quantity_sold > 0),
+    CONSTRAINT ck_sales_price       CHECK (price > 0),
+    CONSTRAINT ck_sales_id          CHECK (sale_id GLOB 'S[0-9][0-9][0-9]*' AND sale_id NOT GLOB 'S*[^0-9]*')
+);
+
+CREATE TABLE IF NOT EXISTS RemovedProducts (
+    removal_id      INTEGER         PRIMARY KEY AUTOINCREMENT,
+    product_id      TEXT,
+    batch_number    TEXT,
+    price           REAL,                                   -- The batch as it was when removed,
+    quantity        INTEGER,                                -- a restock later changes the Batches row
+    expiry_date     TEXT,
+    removal_reason  TEXT            NOT NULL DEFAULT 'Expired',
+    removal_date    TEXT            NOT NULL,
+
+    CONSTRAINT fk_removed_batch     FOREIGN KEY (product_id, batch_number)
+                                    REFERENCES Batches(product_id, batch_number)
+                                    ON DELETE SET NULL
+                                    ON UPDATE CASCADE,
+    CONSTRAINT ck_removed_reason    CHECK (removal_reason IN
+                                    ('Expired', 'Damaged', 'Recalled', 'Other'))
+);
+
+CREATE TABLE IF NOT EXISTS IdSequences (
+    name            TEXT            PRIMARY KEY,
+    high            INTEGER         NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_batch ON Sales (product_id, batch_number);
+CREATE INDEX IF NOT EXISTS idx_sales_date ON Sales (date_of_sale);
+CREATE INDEX IF NOT EXISTS idx_removed_batch ON RemovedProducts (product_id, batch_number);
+CREATE INDEX IF NOT EXISTS idx_removed_date ON RemovedProducts (removal_date);
+CREATE INDEX IF NOT EXISTS idx_removed_reason ON RemovedProducts (removal_reason, removal_date);
+"""
+
+# Statements are kept as constants so sqlite3 reuses its prepared statement cache
+SELECT_ACTIVE_BATCHES = """
+    SELECT b.product_id, b.batch_number, p.name, p.category, b.price, b.quantity, b.expiry_date
+    FROM Batches b
+    JOIN Products p ON p.product_id = b.product_id
+    WHERE b.removed = 0
+    ORDER BY b.product_id, b.batch_number
+"""
+SELECT_ACTIVE_BATCHES_OF = """
+    SELECT b.product_id, b.batch_number, p.name, p.category, b.price, b.quantity, b.expiry_date
+    FROM Batches b
+    JOIN Products p ON p.product_id = b.product_id
+    WHERE b.product_id IN ({}) AND b.removed = 0
+    ORDER BY b.product_id, b.batch_number
+"""
+SELECT_SALES = """
+    SELECT sale_id, product_id, batch_number, quantity_sold, price, date_of_sale
+    FROM Sales ORDER BY rowid
+"""
+SELECT_SALES_BETWEEN = """
+    SELECT sale_id, product_id, batch_number, quantity_sold, price, date_of_sale
+    FROM Sales WHERE date_of_sale BETWEEN ? AND ? ORDER BY rowid
+"""
+SELECT_REMOVED = """
+    SELECT r.product_id, r.batch_number, p.name, r.price, r.quantity, r.expiry_date,
+           r.removal_reason, r.removal_date
+    FROM RemovedProducts r
+    LEFT JOIN Products p ON p.product_id = r.product_id
+    WHERE r.removal_date BETWEEN ? AND ? AND (? IS NULL OR r.removal_reason = ?)
+    ORDER BY r.removal_date, r.removal_id
+    LIMIT ? OFFSET ?
+"""
+COUNT_REMOVED = """
+    SELECT COUNT(*) FROM RemovedProducts
+    WHERE removal_date BETWEEN ? AND ? AND (? IS NULL OR removal_reason = ?)
+"""
+INSERT_PRODUCT = "INSERT OR IGNORE INTO Products (product_id, name, category) VALUES (?, ?, ?)"
+SELECT_PRODUCT = "SELECT 1 FROM Products WHERE product_id = ?"
+SELECT_PRODUCT_BY_NAME = "SELECT product_id FROM Products WHERE name = ?"
+UPSERT_BATCH = """
+    INSERT INTO Batches (product_id, batch_number, price, quantity, expiry_date)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (product_id, batch_number)
+    DO UPDATE SET price = excluded.price, quantity = excluded.quantity, expiry_date = excluded.expiry_date,
+                  removed = 0
+"""
+INSERT_BATCH_IF_MISSING = """
+    INSERT OR IGNORE INTO Batches (product_id, batch_number, price, quantity, expiry_date)
+    VALUES (?, ?, ?, ?, ?)
+"""
+UPDATE_BATCH = "UPDATE Batches SET price = ?, quantity = ? WHERE product_id = ? AND batch_number = ?"
+TAKE_STOCK = """
+    UPDATE Batches SET quantity = quantity - ?
+    WHERE product_id = ? AND batch_number = ? AND quantity >= ?
+"""
+INSERT_SALE = """
+    INSERT INTO Sales (sale_id, product_id, batch_number, quantity_sold, price, date_of_sale)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+INSERT_SALE_IF_MISSING = INSERT_SALE.replace("INSERT INTO", "INSERT OR IGNORE INTO")
+SELECT_SEQUENCES = "SELECT name, high FROM IdSequences"
+UPSERT_SEQUENCE = """
+    INSERT INTO IdSequences (name, high) VALUES (?, ?)
+    ON CONFLICT (name) DO UPDATE SET high = MAX(high, excluded.high)
+"""
+INSERT_REMOVED = """
+    INSERT INTO RemovedProducts (product_id, batch_number, removal_reason, removal_date, price, quantity, expiry_date)
+    SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7
+    WHERE NOT EXISTS (SELECT 1 FROM RemovedProducts
+                      WHERE product_id = ?1 AND batch_number = ?2 AND removal_date = ?4)
+"""
+MARK_REMOVED = "UPDATE Batches SET removed = 1 WHERE product_id = ? AND batch_number = ?"
+# Databases created before Batches.removed: a batch with a logged removal is a removed one
+ADD_REMOVED_COLUMN = "ALTER TABLE Batches ADD COLUMN removed INTEGER NOT NULL DEFAULT 0"
+MARK_LOGGED_REMOVALS = """
+    UPDATE Batches SET removed = 1
+    WHERE EXISTS (SELECT 1 FROM RemovedProducts r
+                  WHERE r.product_id = Batches.product_id AND r.batch_number = Batches.batch_number)
+"""
+# Databases created before RemovedProducts kept the batch: older rows take what the batch holds now
+ADD_REMOVED_DETAILS = (
+    "ALTER TABLE RemovedProducts ADD COLUMN price REAL",
+    "ALTER TABLE RemovedProducts ADD COLUMN quantity INTEGER",
+    "ALTER TABLE RemovedProducts ADD COLUMN expiry_date TEXT",
+)
+FILL_REMOVED_DETAILS = """
+    UPDATE RemovedProducts
+    SET (price, quantity, expiry_date) = (SELECT b.price, b.quantity, b.expiry_date FROM Batches b
+                                          WHERE b.product_id = RemovedProducts.product_id
+                                            AND b.batch_number = RemovedProducts.batch_number)
+"""
+
+
+class SqliteStorage:
+    # One sale updates a single Batches row and inserts a single Sales row
+    supports_row_updates = True
+    supports_product_deltas = False
+    supports_snapshots = False
+    supports_sales_archive = False
+
+    def __init__(self, db_file="shop.db"):
+        self.db_file = db_file
+        self.lock_file = db_file + ".lock"
+        # Shared with the expiry sweeper thread, which only uses it while holding ShopSystem.lock
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SQLITE_SCHEMA)
+        if "removed" not in {row["name"] for row in self.conn.execute("PRAGMA table_info(Batches)")}:
+            with self.conn:
+                self.conn.execute(ADD_REMOVED_COLUMN)
+                self.conn.execute(MARK_LOGGED_REMOVALS)
+        if "price" not in {row["name"] for row in self.conn.execute("PRAGMA table_info(RemovedProducts)")}:
+            with self.conn:
+                for statement in ADD_REMOVED_DETAILS:
+                    self.conn.execute(statement)
+                self.conn.execute(FILL_REMOVED_DETAILS)
+
+    def _insert_product(self, product_id, name, category):
+        # INSERT OR IGNORE keeps an existing product, but would also skip a new one whose name another
+        # product has (uq_products_name), which then only shows up as a foreign key error on its batch
+        if self.conn.execute(INSERT_PRODUCT, (product_id, name, category)).rowcount == 0 \
+                and self.conn.execute(SELECT_PRODUCT, (product_id,)).fetchone() is None:
+            other = self.conn.execute(SELECT_PRODUCT_BY_NAME, (name,)).fetchone()
+            owner = other["product_id"] if other else "another product"
+            raise StorageError(f"Product name {name!r} is already used by {owner}.")
+
+    def _stream(self, query, params=()):
+        # fetchmany keeps at most CHUNK_SIZE rows in memory at a time
+        cursor = self.conn.execute(query, params)
+        try:
+            rows = cursor.fetchmany(CHUNK_SIZE)
+            while rows:
+                yield from rows
+                rows = cursor.fetchmany(CHUNK_SIZE)
+        finally:
+            cursor.close()
+
+    # ---------- Same API as CsvStorage ----------
+    def iter_products(self, filename=None, product_ids=None):
+        if product_ids is None:
+            rows = self._stream(SELECT_ACTIVE_BATCHES)
+        else:
+            # Uses the Batches primary key instead of reading every batch
+            product_ids = list(product_ids)
+            rows = self._stream(SELECT_ACTIVE_BATCHES_OF.format(", ".join("?" * len(product_ids))), product_ids)
+        for row in rows:
+            yield dict(row)
+
+    def load_products(self, filename=None):
+        return list(self.iter_products(filename))
+
+    def save_products(self, products, filename=None):
+        with self.conn:
+            for p in products:
+                self._insert_product(p.product_id, p.name, p.category)
+                self.conn.execute(UPSERT_BATCH, (p.product_id, p.batch_number, p.price,
+                                                 p.quantity, str(p.expiry_date)))
+
+    def iter_sales(self, filename=None, start=None, end=None):
+        if start is None and end is None:
+            rows = self._stream(SELECT_SALES)
+        else:
+            rows = self._stream(SELECT_SALES_BETWEEN, (str(start or date.min), str(end or date.max)))
+        for row in rows:
+            yield dict(row)
+
+    def load_sales(self, filename=None):
+        return list(self.iter_sales(filename))
+
+    def save_sales(self, sales, filename=None):
+        # Sales are never edited, so saving only inserts the ones not stored yet
+        with self.conn:
+            self.conn.executemany(INSERT_SALE_IF_MISSING, [
+                (s.sale_id, s.product_id, s.batch_number, s.quantity_sold, s.price, str(s.date_of_sale))
+                for s in sales
+            ])
+
+    def log_removed_product(self, product, reason):
+        return self.log_removed_products([product], reason)
+
+    def log_removed_products(self, products, reason, removal_date=None):
+        # One transaction for the whole batch. A batch already removed that day is not logged again.
+        # The batches are flagged as removed until a restock upserts them again.
+        removal_date = str(removal_date or date.today())
+        try:
+            with self.conn:
+                cursor = self.conn.executemany(INSERT_REMOVED, [
+                    (p.product_id, p.batch_number, reason, removal_date, p.price, p.quantity, str(p.expiry_date))
+                    for p in products
+                ])
+                logged = cursor.rowcount
+                self.conn.executemany(MARK_REMOVED, [(p.product_id, p.batch_number) for p in products])
+        except sqlite3.Error as e:
+            raise StorageError(str(e))
+        return logged
+
+    @staticmethod
+    def _removed_params(start, end, reason):
+        return str(start or date.min), str(end or date.max), reason, reason
+
+    def iter_removed(self, start=None, end=None, reason=None, offset=0, limit=None):
+        params = self._removed_params(start, end, reason) + (-1 if limit is None else limit, offset)
+        for row in self._stream(SELECT_REMOVED, params):
+            yield ["" if value is None else str(value) for value in row]
+
+    def count_removed(self, start=None, end=None, reason=None):
+        return self.conn.execute(COUNT_REMOVED, self._removed_params(start, end, reason)).fetchone()[0]
+
+    def load_removed(self):
+        return list(self.iter_removed())
+
+    # ---------- Row level updates ----------
+    def record_sale(self, sale, product):
+        self.record_sales([sale])
+
+    def record_sales(self, sales):
+        # The sale rows and their stock deductions commit together or not at all
+        try:
+            with self.conn:
+                for sale in sales:
+                    cursor = self.conn.execute(TAKE_STOCK, (sale.quantity_sold, sale.product_id,
+                                                            sale.batch_number, sale.quantity_sold))
+                    if cursor.rowcount != 1:
+                        raise StorageError(f"Not enough stock stored for {sale.product_id} {sale.batch_number}")
+                    self.conn.execute(INSERT_SALE, (sale.sale_id, sale.product_id, sale.batch_number,
+                                                    sale.quantity_sold, sale.price, str(sale.date_of_sale)))
+        except sqlite3.Error as e:
+            raise StorageError(str(e))
+
+    def update_batch(self, product):
+        try:
+            with self.conn:
+                self.conn.execute(UPDATE_BATCH, (product.price, product.quantity,
+                                                 product.product_id, product.batch_number))
+        except sqlite3.Error as e:
+            raise StorageError(str(e))
+
+    def insert_batch(self, product):
+        try:
+            with self.conn:
+                self._insert_product(product.product_id, product.name, product.category)
+                self.conn.execute(UPSERT_BATCH, (product.product_id, product.batch_number, product.price,
+                                                 product.quantity, str(product.expiry_date)))
+        except sqlite3.Error as e:
+            raise StorageError(str(e))
+
+    # ---------- Migration ----------
+    def import_csv(self, products_file="products.csv", sales_file="sales.csv", removed_file=REMOVED_FILE):
+        # Imports the flat files in one transaction. Removed batches are imported as batches plus a
+        # RemovedProducts row so old sales of them still satisfy the foreign keys.
+        counts = {"products": 0, "removed": 0, "sales": 0, "skipped": 0}
+        with self.conn:
+            changes = read_product_changes(product_delta_file(products_file))[0]
+            for row in apply_product_changes(_read_csv(products_file), changes):
+                try:
+                    self._insert_product(row["product_id"], row["name"], row.get("category") or DEFAULT_CATEGORY)
+                    self.conn.execute(UPSERT_BATCH, _batch_values(row))
+                    counts["products"] += 1
+                except (KeyError, ValueError, sqlite3.IntegrityError, StorageError) as e:
+                    print(f"Skipping product row {row}: {e}")
+                    counts["skipped"] += 1
+
+            for row in _read_csv(removed_file):
+                try:
+                    self._insert_product(row["product_id"], row["name"], row.get("category") or DEFAULT_CATEGORY)
+                    # A batch also in products.csv was restocked after its removal and stays active
+                    if self.conn.execute(INSERT_BATCH_IF_MISSING, _batch_values(row)).rowcount:
+                        self.conn.execute(MARK_REMOVED, (row["product_id"], row["batch_number"]))
+                    cursor = self.conn.execute(INSERT_REMOVED, (row["product_id"], row["batch_number"],
+                                                                row["removal_reason"], row["removal_date"],
+                                                                float(row["price"]), int(row["quantity"]),
+                                                                row["expiry_date"]))
+                    if cursor.rowcount == 0:
+                        print(f"Skipping duplicate removal of {row['product_id']} {row['batch_number']}")
+                        counts["skipped"] += 1
+                    else:
+                        counts["removed"] += 1
+                except (KeyError, ValueError, sqlite3.IntegrityError, StorageError) as e:
+                    print(f"Skipping removed product row {row}: {e}")
+                    counts["skipped"] += 1
+
+            for row in _read_csv(sales_file):
+                try:
+                    cursor = self.conn.execute(INSERT_SALE_IF_MISSING, (
+                        row["sale_id"], row["product_id"], row["batch_number"],
+                        int(row["quantity_sold"]), float(row["price"]), row["date_of_sale"]))
+                    if cursor.rowcount == 0:
+                        print(f"Skipping duplicate sale ID {row['sale_id']}")
+                        counts["skipped"] += 1
+                    else:
+                        counts["sales"] += 1
+                except (KeyError, ValueError, sqlite3.IntegrityError) as e:
+                    print(f"Skipping sale row {row}: {e}")
+                    counts["skipped"] += 1
+        return counts
+
+    def journal_stamps(self):
+        # Rows are updated in place, there is no Journal to compact
+        return {}
+
+    def load_sequences(self):
+        return {row["name"]: row["high"] for row in self.conn.execute(SELECT_SEQUENCES)}
+
+    def save_sequence(self, name, high):
+        with self.conn:
+            self.conn.execute(UPSERT_SEQUENCE, (name, high))
+
+    def close(self):
+        self.conn.close()
+
+
+def _read_csv(filename):
+    if not os.path.exists(filename):
+        print(f"{filename} not found. Nothing to import.")
+        return []
+    with open(filename, newline="") as file:
+        return list(csv.DictReader(file))
+
+
+def _batch_values(row):
+    return (row["product_id"], row["batch_number"], float(row["price"]),
+            int(row["quantity"]), row["expiry_date"])
@@ -0,0 +1,87 @@
+import logging
+import threading
+from datetime import datetime, time, timedelta
+
+# Removes expired stock in the background instead of waiting for menu option 5.
+# A batch counts as expired from the day after its expiry date, so the set of expired batches
+# only changes at midnight. The sweeper sleeps until the next midnight (or the time of day
+# given), then ShopSystem.sweep_expired pops just the batches that expired since the last
+# sweep from the expiry index, logs them as removed and persists the change. The first sweep
+# runs at start-up, for stock that expired while the shop was closed.
+#
+#   ExpirySweeper   a daemon thread, for the interactive menu. It holds ShopSystem.lock only
+#                   while it removes batches, the menu holds it while an option runs.
+#   sweep_forever   the same schedule as an asyncio task, for service.py
+
+SWEEP_AT = time(0, 0)
+MAX_SLEEP = 3600.0          # Seconds; waking up hourly keeps the schedule right across clock changes
+
+logger = logging.getLogger("shop")
+
+
+def next_run(now, at=SWEEP_AT):
+    # The first datetime after `now` at the time of day `at`
+    run = datetime.combine(now.date(), at)
+    return run if run > now else run + timedelta(days=1)
+
+
+class ExpirySweeper(threading.Thread):
+    def __init__(self, system, at=SWEEP_AT, clock=datetime.now):
+        super().__init__(name="expiry-sweeper", daemon=True)
+        self.system = system
+        self.at = at
+        self.clock = clock
+        self.sweeps = 0
+        self.removed = 0            # Batches removed by every sweep so far
+        self.swept = threading.Event()      # Set after each sweep, for callers that wait for one
+        self._wake = threading.Event()
+        self._stopping = False
+
+    def run(self):
+        due = self.clock()
+        while not self._stopping:
+            now = self.clock()
+            if now >= due or self._wake.is_set():
+                self._wake.clear()
+                self.sweep(now.date())
+                due = next_run(now, self.at)
+            self._wake.wait(min(MAX_SLEEP, max((due - self.clock()).total_seconds(), 0)))
+
+    def sweep(self, today=None):
+        try:
+            with self.system.lock:
+                removed = self.system.sweep_expired(today)
+        except Exception:
+            logger.exception("Expiry sweep failed")
+            removed = []
+        if removed:
+            logger.info(f"Expiry sweep removed {len(removed)} expired batch(es).")
+        self.sweeps += 1
+        self.removed += len(removed)
+        self.swept.set()
+        return removed
+
+    def wake(self):
+        # Sweeps now instead of at the next scheduled time
+        self._wake.set()
+
+    def stop(self, timeout=None):
+        self._stopping = True
+        self._wake.set()
+        if self.is_alive():
+            self.join(timeout)
+
+
+async def sweep_forever(sweep, at=SWEEP_AT, clock=datetime.now):
+    # Awaits sweep(today) at start-up and then every day at `at`, until cancelled.
+    # asyncio is imported here so the menu and one-shot commands do not load it.
+    import asyncio
+    while True:
+        now = clock()
+        try:
+            await sweep(now.date())
+        except Exception:
+            logger.exception("Expiry sweep failed")
+        due = next_run(now, at)
+        while clock() < due:
+            await asyncio.sleep(min(MAX_SLEEP, (due - clock()).total_seconds()))
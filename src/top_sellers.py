@@ -0,0 +1,329 @@
+import heapq
+import math
+from array import array
+from datetime import date, timedelta
+from hashlib import blake2b
+
+try:
+    from .rollups import month_start
+except ImportError:  # Running as a script from inside src/
+    from rollups import month_start
+
+# Live "top sellers today / this month" in fixed memory, fed one sale at a time.
+# SalesRollup keeps exact totals for every product and day, so its top_products has to add up
+# the whole range; these summaries answer in time and memory set by their size instead.
+#
+#   SpaceSaving     the `capacity` products with the largest counts (Metwally et al.). A new
+#                   product takes over the smallest counter when all are in use, inheriting its
+#                   count as its possible error. Every count is an upper bound, count - error a
+#                   lower bound, and no product left out sold more than the smallest count
+#                   (at most total / capacity).
+#   CountMinSketch  an estimate for any product, also an upper bound, over by at most
+#                   e / width * total with probability 1 - e^-depth (Cormode and Muthukrishnan)
+#   TopSellers      one of each per day and per month, so results carry the tighter of the two
+#                   upper bounds. Old windows are dropped, so memory does not grow with history.
+#
+# Summaries of the same size merge into one (merge), e.g. the days of a week or the summaries
+# of several shops or terminals sent as JSON (as_dict / from_dict).
+
+CAPACITY = 200          # Counters per window, ten times the top 20 shown
+WIDTH = 1024            # Count-Min columns: error within 0.27% of the window's total
+DEPTH = 4               # Count-Min rows: the error bound holds with probability 98%
+KEEP_DAYS = 35          # Daily windows kept, so any range in the last month can be merged
+KEEP_MONTHS = 13        # Monthly windows kept
+
+
+class SpaceSaving:
+    def __init__(self, capacity=CAPACITY):
+        self.capacity = capacity
+        self.counters = {}      # item -> [count, error]
+        self.total = 0          # Weight of every update
+        self._heap = []         # (count, item) with outdated entries left in, skipped when popped
+
+    def __len__(self):
+        return len(self.counters)
+
+    def add(self, item, weight=1):
+        if weight <= 0:
+            return              # Space-Saving cannot take counts back
+        self.total += weight
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            counter = self.counters[item] = [weight, 0]
+        else:
+            smallest, evicted = self._pop_smallest()
+            del self.counters[evicted]
+            counter = self.counters[item] = [smallest + weight, smallest]
+        heapq.heappush(self._heap, (counter[0], item))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = [(count, item) for item, (count, _) in self.counters.items()]
+        heapq.heapify(self._heap)
+
+    def _smallest(self):
+        # Drops outdated heap entries until the top one is a current counter
+        while True:
+            count, item = self._heap[0]
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                return count, item
+            heapq.heappop(self._heap)
+
+    def _pop_smallest(self):
+        smallest = self._smallest()
+        heapq.heappop(self._heap)
+        return smallest
+
+    def min_count(self):
+        # Upper bound for any item without a counter: 0 until every counter is in use
+        if len(self.counters) < self.capacity:
+            return 0
+        return self._smallest()[0]
+
+    def estimate(self, item):
+        # (count, error): the item's true count is between count - error and count
+        counter = self.counters.get(item)
+        if counter is None:
+            smallest = self.min_count()
+            return smallest, smallest
+        return counter[0], counter[1]
+
+    def top(self, n=20):
+        # [(item, count, error)] for the n largest counts
+        best = heapq.nlargest(n, self.counters.items(), key=lambda entry: (entry[1][0], entry[0]))
+        return [(item, count, error) for item, (count, error) in best]
+
+    def merge(self, other):
+        # A summary of both streams. An item missing from one summary is counted there at that
+        # summary's min_count, so every count stays an upper bound, and the `capacity` largest
+        # counts are kept.
+        if other.capacity != self.capacity:
+            raise ValueError("Only summaries with the same capacity can be merged.")
+        low, other_low = self.min_count(), other.min_count()
+        merged = {}
+        for item in self.counters.keys() | other.counters.keys():
+            count, error = self.counters.get(item, (low, low))
+            other_count, other_error = other.counters.get(item, (other_low, other_low))
+            merged[item] = [count + other_count, error + other_error]
+        result = SpaceSaving(self.capacity)
+        result.counters = dict(heapq.nlargest(self.capacity, merged.items(), key=lambda entry: (entry[1][0], entry[0])))
+        result.total = self.total + other.total
+        result._rebuild_heap()
+        return result
+
+    def as_dict(self):
+        return {"capacity": self.capacity, "total": self.total,
+                "counters": [[item, count, error] for item, (count, error) in self.counters.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data["capacity"])
+        summary.total = data["total"]
+        summary.counters = {item: [count, error] for item, count, error in data["counters"]}
+        summary._rebuild_heap()
+        return summary
+
+
+class CountMinSketch:
+    def __init__(self, width=WIDTH, depth=DEPTH):
+        self.width = width
+        self.depth = depth
+        self.rows = [array("d", bytes(8 * width)) for _ in range(depth)]
+        self.total = 0
+
+    @classmethod
+    def for_error(cls, epsilon, delta):
+        # Estimates over by at most epsilon * total, except with probability delta
+        return cls(math.ceil(math.e / epsilon), math.ceil(math.log(1 / delta)))
+
+    def _columns(self, item):
+        # A stable hash (not hash(), which changes between runs) so sketches from different
+        # processes can be merged; the rows use h1 + i * h2 (Kirsch and Mitzenmacher)
+        digest = blake2b(item.encode(), digest_size=8).digest()
+        h1 = int.from_bytes(digest[:4], "little")
+        h2 = int.from_bytes(digest[4:], "little") | 1
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item, weight=1):
+        if weight <= 0:
+            return
+        self.total += weight
+        for row, column in zip(self.rows, self._columns(item)):
+            row[column] += weight
+
+    def estimate(self, item):
+        return min(row[column] for row, column in zip(self.rows, self._columns(item)))
+
+    def error_bound(self):
+        return math.e / self.width * self.total
+
+    def merge(self, other):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Only sketches of the same size can be merged.")
+        result = CountMinSketch(self.width, self.depth)
+        result.rows = [array("d", map(sum, zip(row, other_row))) for row, other_row in zip(self.rows, other.rows)]
+        result.total = self.total + other.total
+        return result
+
+    def as_dict(self):
+        return {"width": self.width, "depth": self.depth, "total": self.total,
+                "rows": [list(row) for row in self.rows]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["width"], data["depth"])
+        sketch.rows = [array("d", row) for row in data["rows"]]
+        sketch.total = data["total"]
+        return sketch
+
+
+class Summary:
+    # The Space-Saving counters and Count-Min sketch of one window
+    def __init__(self, capacity=CAPACITY, width=WIDTH, depth=DEPTH, heavy=None, sketch=None):
+        # SpaceSaving has a length, so an empty one given here is still used
+        self.heavy = heavy if heavy is not None else SpaceSaving(capacity)
+        self.sketch = sketch if sketch is not None else CountMinSketch(width, depth)
+
+    def add(self, item, weight=1):
+        self.heavy.add(item, weight)
+        self.sketch.add(item, weight)
+
+    def estimate(self, item):
+        # (estimate, error): the true value is between estimate - error and estimate
+        count, error = self.heavy.estimate(item)
+        upper = min(count, self.sketch.estimate(item))
+        return upper, upper - (count - error)
+
+    def top(self, n=20):
+        # {"top": [(item, estimate, error, certain)], "total": ..., "max_error": ...}
+        # The true value of a listed item is between estimate - error and estimate. max_error
+        # bounds the value of any item not listed. `certain` is True when the item's lower bound
+        # is at least the upper bound of every item not listed, so it is surely in the true top n.
+        # With no more items than counters, every count is exact.
+        candidates = self.heavy.top(n + 1)
+        rest = candidates[n][1] if len(candidates) > n else self.heavy.min_count()
+        results = []
+        for item, count, error in candidates[:n]:
+            upper = min(count, self.sketch.estimate(item))
+            lower = count - error
+            results.append((item, upper, upper - lower, lower >= rest))
+        results.sort(key=lambda entry: (-entry[1], entry[0]))
+        return {"top": results, "total": self.heavy.total, "max_error": self.heavy.min_count()}
+
+    def merge(self, other):
+        return Summary(heavy=self.heavy.merge(other.heavy), sketch=self.sketch.merge(other.sketch))
+
+    def as_dict(self):
+        return {"heavy": self.heavy.as_dict(), "sketch": self.sketch.as_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(heavy=SpaceSaving.from_dict(data["heavy"]), sketch=CountMinSketch.from_dict(data["sketch"]))
+
+
+class TopSellers:
+    def __init__(self, by="revenue", capacity=CAPACITY, width=WIDTH, depth=DEPTH,
+                 keep_days=KEEP_DAYS, keep_months=KEEP_MONTHS):
+        self.by = by                # "revenue" or "quantity"
+        self.size = (capacity, width, depth)
+        self.keep_days = keep_days
+        self.keep_months = keep_months
+        self.days = {}              # date -> Summary
+        self.months = {}            # first of month -> Summary
+        self.dropped = None         # Latest day whose window was dropped or never kept
+
+    def add(self, sale):
+        self.add_values(sale.date_of_sale, sale.product_id, sale.quantity_sold, sale.total)
+
+    def add_values(self, day, product_id, quantity, revenue):
+        weight = revenue if self.by == "revenue" else quantity
+        self._add(self.days, day, product_id, weight)
+        self._add(self.months, month_start(day), product_id, weight)
+
+    def add_all(self, sales):
+        for sale in sales:
+            self.add(sale)
+
+    @classmethod
+    def from_rollup(cls, rollup, today=None, by="revenue", **size):
+        # Top sellers of the windows kept, from the per day and per month totals of a
+        # SalesRollup instead of replaying every sale. Each product's total for a window is
+        # added as one weighted update.
+        top = cls(by, **size)
+        today = today or date.today()
+        first_day = today - timedelta(days=top.keep_days - 1)
+        months = today.year * 12 + today.month - top.keep_months
+        first_month = date(months // 12, months % 12 + 1, 1)
+        column = 1 if by == "revenue" else 0
+        for windows, table, first in ((top.days, rollup.daily, first_day), (top.months, rollup.monthly, first_month)):
+            for (key, product_id), totals in table.items():
+                if key >= first:
+                    top._add(windows, key, product_id, totals[column])
+        top.dropped = first_day - timedelta(days=1)
+        return top
+
+    def _add(self, windows, key, product_id, weight):
+        summary = windows.get(key) or self._open(windows, key)
+        if summary is not None:
+            summary.add(product_id, weight)
+
+    def _open(self, windows, key):
+        # A new window, dropping the oldest one past the number kept. None when `key` is older
+        # than every window kept.
+        keep = self.keep_days if windows is self.days else self.keep_months
+        if len(windows) >= keep:
+            oldest = min(windows)
+            if key < oldest:
+                self._drop(windows, key)
+                return None
+            del windows[oldest]
+            self._drop(windows, oldest)
+        summary = windows[key] = Summary(*self.size)
+        return summary
+
+    def _drop(self, windows, key):
+        if windows is self.days and (self.dropped is None or key > self.dropped):
+            self.dropped = key
+
+    def merge(self, other):
+        # Both shops' or terminals' sales, window by window
+        if (other.by, other.size) != (self.by, self.size):
+            raise ValueError("Only top sellers of the same measure and size can be merged.")
+        result = TopSellers(self.by, *self.size, keep_days=self.keep_days, keep_months=self.keep_months)
+        for windows, other_windows, merged in ((self.days, other.days, result.days),
+                                               (self.months, other.months, result.months)):
+            for key in sorted(windows.keys() | other_windows.keys(), reverse=True):
+                empty = Summary(*self.size)
+                summary = windows.get(key, empty).merge(other_windows.get(key, empty))
+                if result._open(merged, key) is not None:
+                    merged[key] = summary
+        dropped = [d for d in (self.dropped, other.dropped, result.dropped) if d is not None]
+        result.dropped = max(dropped) if dropped else None
+        return result
+
+    # ---------- Reports ----------
+    def day(self, day=None):
+        return self.days.get(day or date.today()) or Summary(*self.size)
+
+    def month(self, day=None):
+        return self.months.get(month_start(day or date.today())) or Summary(*self.size)
+
+    def between(self, start, end):
+        # The daily windows from start to end (both included) merged, None when the range
+        # reaches back to days no longer kept
+        if self.dropped is not None and start <= self.dropped:
+            return None
+        merged = Summary(*self.size)
+        for day, summary in self.days.items():
+            if start <= day <= end:
+                merged = merged.merge(summary)
+        return merged
+
+    def top(self, n=20, window="day", day=None):
+        # Top n of the day or month containing `day` (default today), see Summary.top
+        summary = self.day(day) if window == "day" else self.month(day)
+        return summary.top(n)
@@ -0,0 +1,128 @@
+import argparse
+from array import array
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional, the same figures are computed in plain Python without it
+    np = None
+
+try:
+    from .models import parse_date
+    from .storage import iter_products_file
+except ImportError:  # Running as a script from inside src/
+    from models import parse_date
+    from storage import iter_products_file
+
+# Stock valuation reports.
+# Batches are loaded once into columns (price, quantity, expiry day number, product code).
+# With NumPy each report is one vectorised operation over those columns.
+# Without it the same reports are plain Python loops over the columns.
+# Usage: python valuation.py [products.csv] [--days 7] [--threshold 10]
+
+
+class StockValuation:
+    def __init__(self, products, use_numpy=None):
+        # products: Product objects or product rows (dicts) as read from products.csv
+        self.use_numpy = (np is not None) if use_numpy is None else use_numpy
+        if self.use_numpy and np is None:
+            raise ImportError("NumPy is not installed.")
+        self.product_ids = []               # product code -> product_id
+        codes = {}                          # product_id -> product code
+        prices, quantities, expiries, product_codes = array("d"), array("q"), array("l"), array("l")
+        for p in products:
+            if isinstance(p, dict):
+                product_id, price, quantity, expiry = p["product_id"], p["price"], p["quantity"], p["expiry_date"]
+            else:
+                product_id, price, quantity, expiry = p.product_id, p.price, p.quantity, p.expiry_date
+            code = codes.get(product_id)
+            if code is None:
+                code = codes[product_id] = len(self.product_ids)
+                self.product_ids.append(product_id)
+            prices.append(float(price))
+            quantities.append(int(quantity))
+            expiries.append(parse_date(expiry).toordinal())
+            product_codes.append(code)
+
+        if self.use_numpy:
+            # The arrays share the buffers of the array.array columns, nothing is copied
+            self.prices = np.frombuffer(prices, dtype=np.float64)
+            self.quantities = np.frombuffer(quantities, dtype=np.int64)
+            self.expiries = np.frombuffer(expiries, dtype=np.dtype("l"))
+            self.product_codes = np.frombuffer(product_codes, dtype=np.dtype("l"))
+        else:
+            self.prices, self.quantities = prices, quantities
+            self.expiries, self.product_codes = expiries, product_codes
+
+    def __len__(self):
+        return len(self.prices)
+
+    # ---------- Reports ----------
+    def total_value(self):
+        # Price x quantity over every batch
+        if self.use_numpy:
+            return float(np.dot(self.prices, self.quantities))
+        return sum(price * quantity for price, quantity in zip(self.prices, self.quantities))
+
+    def value_at_risk(self, days=7, today=None):
+        # Value of the batches that are not expired yet but expire within `days` days
+        start = (today or date.today()).toordinal()
+        end = start + days
+        if self.use_numpy:
+            mask = (self.expiries >= start) & (self.expiries <= end)
+            return float(np.dot(self.prices[mask], self.quantities[mask]))
+        return sum(price * quantity for price, quantity, expiry in zip(self.prices, self.quantities, self.expiries)
+                   if start <= expiry <= end)
+
+    def expired_value(self, today=None):
+        # Value of the batches whose expiry date has passed
+        start = (today or date.today()).toordinal()
+        if self.use_numpy:
+            mask = self.expiries < start
+            return float(np.dot(self.prices[mask], self.quantities[mask]))
+        return sum(price * quantity for price, quantity, expiry in zip(self.prices, self.quantities, self.expiries)
+                   if expiry < start)
+
+    def average_cost(self):
+        # {product_id: price per unit weighted by the quantity of each batch}; products with no stock are left out
+        count = len(self.product_ids)
+        if self.use_numpy:
+            value = np.bincount(self.product_codes, weights=self.prices * self.quantities, minlength=count)
+            units = np.bincount(self.product_codes, weights=self.quantities, minlength=count)
+            return {self.product_ids[code]: float(value[code] / units[code]) for code in np.flatnonzero(units)}
+        value, units = [0.0] * count, [0] * count
+        for code, price, quantity in zip(self.product_codes, self.prices, self.quantities):
+            value[code] += price * quantity
+            units[code] += quantity
+        return {self.product_ids[code]: value[code] / units[code] for code in range(count) if units[code]}
+
+    def low_stock_mask(self, threshold=10):
+        # One flag per batch, True where the quantity is at or below the threshold, as in Inventory
+        if self.use_numpy:
+            return self.quantities <= threshold
+        return [quantity <= threshold for quantity in self.quantities]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stock valuation report for products.csv.")
+    parser.add_argument("products_file", nargs="?", default="products.csv")
+    parser.add_argument("--days", type=int, default=7, help="expiry window for the value at risk")
+    parser.add_argument("--threshold", type=int, default=10, help="low stock threshold")
+    args = parser.parse_args(argv)
+
+    try:
+        stock = StockValuation(iter_products_file(args.products_file))
+    except FileNotFoundError:
+        parser.error(f"{args.products_file} not found")
+    print(f"Batches: {len(stock)}")
+    print(f"Total stock value: {stock.total_value():.2f}")
+    print(f"Value expiring within {args.days} days: {stock.value_at_risk(args.days):.2f}")
+    print(f"Value already expired: {stock.expired_value():.2f}")
+    print(f"Low stock batches (<= {args.threshold}): {sum(stock.low_stock_mask(args.threshold))}")
+    print("\nAverage cost per unit:")
+    for product_id, cost in sorted(stock.average_cost().items()):
+        print(f"  {product_id:<10} {cost:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
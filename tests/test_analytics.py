@@ -0,0 +1,68 @@
+# Unit tests for the parallel sales totals in analytics.py
+# These tests write a small sales.csv, split it into several shards and check that the
+# merged totals match totals computed in one pass.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from src import analytics
+from src.analytics import shard_offsets, total_sales
+from src.models import Sale
+from src.storage import CsvStorage
+
+class TestAnalytics(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Writes 300 sales of three products spread over 90 days.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.sales_file = os.path.join(self.folder, "sales.csv")
+        start = date(2026, 1, 1)
+        self.sales = [Sale(f"S{i:03d}", f"P00{i % 3 + 1}", "B001", i % 4 + 1, 100.0 * (i % 3 + 1),
+                           start + timedelta(days=i * 90 // 300)) for i in range(300)]
+        CsvStorage(sales_file=self.sales_file).save_sales(self.sales)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    # 1. Shards cover every line exactly once
+    def test_shard_offsets(self):
+        """
+        Test that the shards are back to back, skip the header and end at line breaks.
+        """
+        ranges = shard_offsets(self.sales_file, 7)
+        self.assertEqual(len(ranges), 7)
+        self.assertEqual(ranges[-1][1], os.path.getsize(self.sales_file))
+        with open(self.sales_file, "rb") as file:
+            data = file.read()
+        for (_, end), (start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, start)
+            self.assertEqual(data[end - 1:end], b"\n")
+
+    # 2. Parallel totals match a single pass
+    def test_parallel_totals(self):
+        """
+        Test that totals from 4 worker processes equal totals from one process and from the Sale list.
+        """
+        old_min = analytics.MIN_SHARD_BYTES
+        analytics.MIN_SHARD_BYTES = 1000
+        try:
+            parallel = total_sales(self.sales_file, workers=4)
+        finally:
+            analytics.MIN_SHARD_BYTES = old_min
+        single = total_sales(self.sales_file, workers=1)
+
+        self.assertEqual(parallel.rows, 300)
+        self.assertEqual(parallel.quantity, sum(s.quantity_sold for s in self.sales))
+        self.assertAlmostEqual(parallel.revenue, sum(s.total for s in self.sales))
+        self.assertEqual(parallel.by_batch.keys(), single.by_batch.keys())
+        for product_id, (quantity, revenue) in single.by_product.items():
+            self.assertEqual(parallel.by_product[product_id][0], quantity)
+            self.assertAlmostEqual(parallel.by_product[product_id][1], revenue)
+        self.assertEqual(sorted(parallel.by_period), [date(2026, 1, 1), date(2026, 2, 1), date(2026, 3, 1)])
+
+if __name__ == "__main__":
+    unittest.main()
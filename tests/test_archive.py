@@ -0,0 +1,127 @@
+# Unit tests for the partitioned sales archive in archive.py
+# These tests split sales into monthly files, query date ranges, compress old partitions
+# and run a ShopSystem on ArchiveStorage.
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from src.archive import ArchivedSales, ArchiveStorage, SalesArchive
+from src.journal import Journal
+from src.shopsystem import ShopSystem, Product, Sale
+
+class TestArchive(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a temporary folder with an archive of 90 sales over January to March 2026.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.archive = SalesArchive(os.path.join(self.folder, "sales_archive"))
+        self.archive.append([Sale(f"S{i:03d}", "P001", "B001", 1, 100.0, date(2026, 1, 1) + timedelta(days=i - 1))
+                             for i in range(1, 91)])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    # 1. One partition per month, listed in the manifest
+    def test_partitions(self):
+        """
+        Test that sales are split by month and the manifest holds dates and row counts.
+        """
+        self.assertEqual(sorted(self.archive.partitions), ["2026-01", "2026-02", "2026-03"])
+        february = self.archive.partitions["2026-02"]
+        self.assertEqual((february.min_date, february.max_date, february.rows), (date(2026, 2, 1), date(2026, 2, 28), 28))
+        reopened = SalesArchive(self.archive.folder)
+        self.assertEqual(reopened.row_count(), 90)
+
+    # 2. Range queries open only the matching partitions
+    def test_range_query(self):
+        """
+        Test that a range inside February reads only the February file and only its days.
+        """
+        start, end = date(2026, 2, 10), date(2026, 2, 12)
+        self.assertEqual([p.name for p in self.archive.select(start, end)], ["2026-02"])
+        os.remove(self.archive.path(self.archive.partitions["2026-01"].file))     # Never opened
+        self.assertEqual([s.sale_id for s in self.archive.iter_sales(start, end)], ["S041", "S042", "S043"])
+
+    # 3. Old partitions are compressed and still readable and appendable
+    def test_compress(self):
+        """
+        Test that gzip and lzma partitions stream back the same sales and accept a late sale.
+        """
+        self.assertEqual(self.archive.compress("gz", before=date(2026, 3, 1)), ["2026-01", "2026-02"])
+        self.assertEqual(self.archive.compress("xz", before=date(2026, 4, 15)), ["2026-03"])
+        self.assertEqual(self.archive.partitions["2026-01"].file, "sales_2026-01.csv.gz")
+        self.assertFalse(os.path.exists(self.archive.path("sales_2026-01.csv")))
+        self.archive.append([Sale("S091", "P001", "B001", 2, 100.0, date(2026, 1, 31))])
+        self.assertEqual([s.sale_id for s in self.archive.iter_sales(date(2026, 1, 31), date(2026, 1, 31))],
+                         ["S031", "S091"])
+        self.assertEqual(len(list(SalesArchive(self.archive.folder).iter_sales())), 91)
+
+    # 4. ShopSystem on ArchiveStorage
+    def test_shop_on_archive(self):
+        """
+        Test that sales.csv is imported, new sales are appended to their partition and
+        journalled sales are archived on compaction.
+        """
+        with open(self.path("sales.csv"), "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["sale_id", "product_id", "batch_number", "quantity_sold", "price", "total", "date_of_sale"])
+            writer.writerow(["S001", "P001", "B001", 2, 70.0, 140.0, "2026-01-05"])
+        storage = ArchiveStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv"),
+                                 archive_folder=self.path("archive"))
+        system = ShopSystem(storage=storage)
+        system.products = [Product("P001", "B001", "Milk", 70.0, 10, date.today() + timedelta(days=5))]
+        system.rebuild_indexes()
+        system.save_products()
+        system.load_sales()
+        self.assertIsInstance(system.sales, ArchivedSales)
+
+        sale = system.sell_product("P001", 3)[0]
+        self.assertEqual(system.sales.tail, [])          # Written to this month's partition
+        self.assertEqual([s.sale_id for s in system.sales_between(date.today(), date.today())], [sale.sale_id])
+        self.assertEqual(len(system.sales), 2)
+
+        journalled = ShopSystem(journal=Journal(self.path("journal.csv")), storage=storage)
+        journalled.load_products()
+        journalled.load_sales()
+        journalled.sell_product("P001", 1)
+        self.assertEqual(len(journalled.sales.tail), 1)
+        journalled.compact()
+        self.assertEqual(journalled.sales.tail, [])
+        self.assertEqual(storage.archive.row_count(), 3)
+        self.assertEqual(journalled.rollup.revenue(), 140.0 + 4 * 70.0)
+        journalled.journal.close()
+
+    # 5. Loading reads only partitions without saved totals
+    def test_load_without_scanning(self):
+        """
+        Test that the second load takes the totals of finished partitions from their rollup files and
+        numbers sales after the saved high-water mark, without opening a partition, and that a late
+        sale makes its partition be read again.
+        """
+        storage = ArchiveStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv"),
+                                 archive_folder=self.archive.folder)
+        ShopSystem(storage=storage).load_sales()
+        self.assertTrue(os.path.exists(self.archive.rollup_path(self.archive.partitions["2026-02"])))
+
+        system = ShopSystem(storage=storage)
+        with mock.patch.object(SalesArchive, "_read", side_effect=AssertionError("partition read")):
+            system.load_sales()
+        self.assertEqual(system.rollup.revenue(), 9000.0)
+        self.assertGreater(system.sale_ids.number_of(system.sale_ids.take()), 90)
+
+        storage.archive.append([Sale("S092", "P001", "B001", 2, 100.0, date(2026, 1, 31))])
+        system.load_sales()
+        self.assertEqual(system.rollup.revenue(date(2026, 1, 31), date(2026, 1, 31)), 300.0)
+        self.assertEqual(system.rollup.revenue(), 9200.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# Unit tests for the data generators in datagen.py and the benchmark harness in benchmark.py
+# These tests use tiny sizes, they only check that the harness runs and compares results.
+
+import unittest
+from src.benchmark import BENCHMARKS, compare, run
+from src.datagen import generate_products, generate_sales
+from src.events import logger, set_silent
+
+class TestBenchmark(unittest.TestCase):
+    # 1. Generated data is repeatable and well formed
+    def test_generators(self):
+        """
+        Test that the same seed gives the same rows and that batch keys are unique.
+        """
+        products = list(generate_products(300, seed=4))
+        self.assertEqual(products, list(generate_products(300, seed=4)))
+        self.assertEqual(len({(p["product_id"], p["batch_number"]) for p in products}), 300)
+        sales = list(generate_sales(50, 300))
+        self.assertEqual(len(sales), 50)
+        self.assertEqual(sales[0]["sale_id"], "S001")
+        self.assertTrue(all(a["date_of_sale"] <= b["date_of_sale"] for a, b in zip(sales, sales[1:])))
+
+    # 2. Every benchmark runs on a small size
+    def test_run(self):
+        """
+        Test that one result comes back per registered benchmark and that the log is left as it was.
+        """
+        set_silent(False)
+        results = run([30], repeat=1)
+        self.assertEqual([r["name"] for r in results], list(BENCHMARKS))
+        self.assertTrue(all(r["median"] >= 0 for r in results))
+        self.assertFalse(logger.disabled)
+
+    # 3. Regressions beyond the threshold are reported
+    def test_compare(self):
+        """
+        Test that only the benchmark more than 25% slower than the baseline is reported.
+        """
+        baseline = {"results": [{"name": "a", "size": 10, "median": 1.0},
+                                {"name": "b", "size": 10, "median": 1.0}]}
+        results = [{"name": "a", "size": 10, "median": 1.2},
+                   {"name": "b", "size": 10, "median": 1.5},
+                   {"name": "c", "size": 10, "median": 9.0}]
+        self.assertEqual([(r[0], r[1]) for r in compare(results, baseline, 0.25)], [("b", 10)])
+
+if __name__ == "__main__":
+    unittest.main()
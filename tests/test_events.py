@@ -0,0 +1,77 @@
+# Unit tests for the results, event bus and background logging in events.py
+# These tests check that Inventory operations return Result objects, publish them on the
+# inventory's event bus and can be silenced for batch work.
+
+import logging
+import unittest
+from datetime import date, timedelta
+from src import events
+from src.events import InventoryError
+from src.inventory import Inventory, Product
+
+class TestEvents(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates an Inventory with one Milk batch of 15 units and records every published Result.
+        """
+        self.inventory = Inventory(low_stock_threshold=10)
+        self.inventory.add_product(Product("J001", "B001", "Milk", 70.0, 15, date.today() + timedelta(days=5)))
+        self.published = []
+        self.inventory.events.subscribe("*", self.published.append)
+
+    def tearDown(self):
+        events.set_silent(False)
+
+    # 1. Results are truthy on success and carry the details
+    def test_result(self):
+        """
+        Test that a sale returns a truthy Result with its code and data, and a failed one a falsy Result.
+        """
+        sold = self.inventory.product_sale("J001", "B001", 2)
+        self.assertTrue(sold)
+        self.assertEqual(sold.code, "sale")
+        self.assertEqual(sold.data["quantity"], 2)
+
+        failed = self.inventory.product_sale("J001", "B001", 500)
+        self.assertFalse(failed)
+        self.assertEqual(failed.code, "insufficient_stock")
+        with self.assertRaises(InventoryError) as raised:
+            failed.raise_for_error()
+        self.assertIs(raised.exception.result, failed)
+
+    # 2. Operations and low stock crossings are published
+    def test_event_bus(self):
+        """
+        Test that subscribers get every Result and a low_stock event when a batch drops to the threshold.
+        """
+        low = []
+        self.inventory.events.subscribe("low_stock", low.append)
+        self.inventory.product_sale("J001", "B001", 6)          # 15 -> 9
+        self.inventory.remove_product("J009", "B001")
+        self.assertEqual([r.code for r in self.published], ["low_stock", "sale", "not_found"])
+        self.assertEqual(low[0].data["product"].name, "Milk")
+
+    # 3. Messages go through the log queue and can be silenced
+    def test_logging(self):
+        """
+        Test that messages reach the "shop" logger, and that nothing is logged once silenced.
+        """
+        with self.assertLogs("shop", level="INFO") as logs:
+            self.inventory.update_stock("J001", "B001", "increase", 5)
+        self.assertEqual(logs.records[0].getMessage(), "Increased Milk stock by 5")
+
+        events.set_silent(True)
+        handler_calls = []
+        handler = logging.Handler()
+        handler.emit = handler_calls.append
+        events.logger.addHandler(handler)
+        try:
+            result = self.inventory.update_stock("J001", "B001", "increase", 5)
+        finally:
+            events.logger.removeHandler(handler)
+        self.assertTrue(result)
+        self.assertEqual(handler_calls, [])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+# Unit tests for ExpiryIndex in expiry_index.py
+# These tests check that batches are kept in expiry order and that the expired and
+# expiring-soon queries return exactly the matching batches.
+
+import unittest
+from datetime import date, timedelta
+from src.expiry_index import ExpiryIndex
+from src.models import Product
+
+class TestExpiryIndex(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Builds an index with one expired, one soon-to-expire and one long-life batch.
+        """
+        self.today = date(2026, 1, 10)
+        self.bread = Product("P003", "B001", "Bread", 1200.0, 5, self.today - timedelta(days=1))
+        self.milk = Product("P002", "B001", "Milk", 1500.0, 20, self.today + timedelta(days=3))
+        self.sugar = Product("P001", "B001", "Sugar", 2500.0, 10, self.today + timedelta(days=300))
+        self.index = ExpiryIndex([self.sugar, self.milk, self.bread])
+
+    # 1. Expired as of a date
+    def test_expired(self):
+        """
+        Test that only batches with an expiry date before the given day are expired.
+        """
+        self.assertEqual(self.index.expired(self.today), [("P003", "B001")])
+        self.assertEqual(self.index.expired(self.today - timedelta(days=5)), [])
+
+    # 2. Expiring within N days
+    def test_expiring_within(self):
+        """
+        Test that the window includes today and the last day, but not expired batches.
+        """
+        self.assertEqual(self.index.expiring_within(3, self.today), [("P002", "B001")])
+        self.assertEqual(self.index.expiring_within(2, self.today), [])
+
+    # 3. Remove and update
+    def test_remove_and_update(self):
+        """
+        Test that removed batches disappear and updated expiry dates move the batch.
+        """
+        self.assertTrue(self.index.remove(self.bread))
+        self.assertFalse(self.index.remove(self.bread))
+        self.milk.expiry_date = self.today - timedelta(days=2)
+        self.index.update(self.milk)
+        self.assertEqual(self.index.expired(self.today), [("P002", "B001")])
+        self.assertEqual(len(self.index), 2)
+
+    # 4. Bulk removal
+    def test_pop_expired(self):
+        """
+        Test that pop_expired returns the expired batches and leaves the rest in order.
+        """
+        self.assertEqual(self.index.pop_expired(self.today + timedelta(days=4)), [("P003", "B001"), ("P002", "B001")])
+        self.assertEqual(self.index.next_expiry(), self.sugar.expiry_date)
+
+if __name__ == "__main__":
+    unittest.main()
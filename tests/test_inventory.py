@@ -142,5 +142,89 @@ class TestInventory(unittest.TestCase):
         result = self.inventory.product_sale("J001", "B001", 50)
         self.assertFalse(result)
 
+    # 15. Expiring soon
+    def test_get_expiring_soon(self):
+        """
+        Test that only batches expiring within the given days are returned, not expired ones.
+        """
+        later = Product("J005", "B005", "Rice", 50.0, 20, date.today() + timedelta(days=30))
+        expired = Product("J006", "B006", "Cream", 60.0, 4, date.today() - timedelta(days=2))
+        self.inventory.add_product(later)
+        self.inventory.add_product(expired)
+        soon = self.inventory.get_expiring_soon(7)
+        self.assertEqual(list(soon), [("J001", "B001")])
+
+    # 16. Remove expired products
+    def test_remove_expired_products(self):
+        """
+        Test that removing expired products takes out only the expired batches.
+        """
+        expired = Product("J006", "B006", "Cream", 60.0, 4, date.today() - timedelta(days=2))
+        self.inventory.add_product(expired)
+        removed = self.inventory.remove_expired_products()
+        self.assertEqual(list(removed), [("J006", "B006")])
+        self.assertIsNone(self.inventory.find_product("J006", "B006"))
+        self.assertEqual(self.inventory.get_expired_products(), {})
+
+    # 17. Removed product leaves the expiry index
+    def test_remove_product_updates_expiry_index(self):
+        """
+        Test that a removed product no longer shows up as expiring soon.
+        """
+        self.inventory.remove_product("J001", "B001")
+        self.assertEqual(self.inventory.get_expiring_soon(7), {})
+
+    # 18. Low-stock callback fires only on threshold crossings
+    def test_low_stock_callback(self):
+        """
+        Test that subscribers hear about a batch going low and being restocked, but not about
+        changes that stay on the same side of the threshold.
+        """
+        events = []
+        self.inventory.subscribe_low_stock(lambda product, is_low: events.append((product.name, is_low)))
+        self.inventory.update_stock("J001", "B001", "increase", 10)     # 10 -> 20, leaves low stock
+        self.inventory.product_sale("J001", "B001", 5)                  # 20 -> 15, still normal
+        self.inventory.product_sale("J001", "B001", 6)                  # 15 -> 9, becomes low
+        self.assertEqual(events, [("Milk", False), ("Milk", True)])
+        self.assertIn(("J001", "B001"), self.inventory.get_low_stock_products())
+
+    # 19. Running totals stay in sync
+    def test_running_totals(self):
+        """
+        Test that total quantity and low-stock count follow adds, sales and removals.
+        """
+        self.inventory.add_product(Product("J002", "B002", "Sugar", 40.0, 50, date.today() + timedelta(days=10)))
+        self.assertEqual(self.inventory.total_quantity, 60)
+        self.inventory.product_sale("J002", "B002", 45)
+        self.assertEqual(self.inventory.total_quantity, 15)
+        self.assertEqual(len(self.inventory.low_stock), 2)
+        self.inventory.remove_product("J001", "B001")
+        self.assertEqual(self.inventory.total_quantity, 5)
+        self.assertEqual(list(self.inventory.low_stock), [("J002", "B002")])
+
+    # 20. FEFO sale across batches
+    def test_product_sale_fefo(self):
+        """
+        Test that a sale bigger than one batch takes the soonest-expiring batch first and
+        skips expired batches.
+        """
+        self.inventory.add_product(Product("J001", "B002", "Milk", 70.0, 20, date.today() + timedelta(days=2)))
+        self.inventory.add_product(Product("J001", "B003", "Milk", 70.0, 50, date.today() - timedelta(days=1)))
+        result = self.inventory.product_sale_fefo("J001", 25)
+        self.assertTrue(result)
+        self.assertEqual(result.data["taken"], [(("J001", "B002"), 20), (("J001", "B001"), 5)])
+        self.assertEqual(self.product.quantity, 5)
+        self.assertEqual(self.inventory.find_product("J001", "B003").quantity, 50)
+
+    # 21. FEFO sale with too little stock changes nothing
+    def test_product_sale_fefo_insufficient(self):
+        """
+        Test that a FEFO sale larger than all unexpired stock fails without taking anything.
+        """
+        result = self.inventory.product_sale_fefo("J001", 11)
+        self.assertFalse(result)
+        self.assertEqual(result.code, "insufficient_stock")
+        self.assertEqual(self.product.quantity, 10)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,146 @@
+# Unit tests for the append-only Journal in journal.py
+# These tests check that journalled sales and stock changes are replayed over the
+# CSV snapshots on load, and that compaction folds them back into the snapshots.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from src.journal import Journal
+from src.shopsystem import ShopSystem, Product, Sale
+from src.storage import CsvStorage
+
+class TestJournal(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a temporary folder holding a products snapshot with one batch (Milk),
+        an empty sales snapshot and a fresh journal.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.products_file = os.path.join(self.folder, "products.csv")
+        self.sales_file = os.path.join(self.folder, "sales.csv")
+        self.journal = Journal(os.path.join(self.folder, "journal.csv"), fsync_every=0, compact_every=0)
+
+        writer = ShopSystem()
+        writer.products.append(Product("J001", "B001", "Milk", 70.0, 10, date.today() + timedelta(days=5)))
+        writer.save_products(self.products_file)
+        writer.save_sales(self.sales_file)
+
+    def tearDown(self):
+        self.journal.close()
+        shutil.rmtree(self.folder)
+
+    def load_system(self):
+        storage = CsvStorage(self.products_file, self.sales_file, os.path.join(self.folder, "removed.csv"))
+        system = ShopSystem(journal=self.journal, storage=storage)
+        system.load_products()
+        system.load_sales()
+        return system
+
+    # 1. Journalled sale is replayed on load
+    def test_replay_sale(self):
+        """
+        Test that a sale written only to the journal reduces stock and appears in the sales list.
+        """
+        self.journal.append_sale(Sale("S001", "J001", "B001", 3, 70.0, date.today()))
+        system = self.load_system()
+        self.assertEqual(system.find_batch("J001", "B001").quantity, 7)
+        self.assertEqual(len(system.sales), 1)
+        self.assertEqual(system.sales[0].total, 210.0)
+
+    # 2. Journalled stock, price and new product records are replayed
+    def test_replay_product_changes(self):
+        """
+        Test that stock deltas, price changes and new batches are applied in order.
+        """
+        milk = Product("J001", "B001", "Milk", 70.0, 10, date.today())
+        self.journal.append_stock(milk, 5)
+        milk.price = 80.0
+        self.journal.append_price(milk)
+        self.journal.append_product(Product("J002", "B001", "Sugar", 40.0, 3, date.today() + timedelta(days=30)))
+        system = self.load_system()
+        self.assertEqual(system.find_batch("J001", "B001").quantity, 15)
+        self.assertEqual(system.find_batch("J001", "B001").price, 80.0)
+        self.assertEqual(system.find_batch("J002", "B001").name, "Sugar")
+
+    # 3. Compaction folds the journal into the snapshots
+    def test_compact(self):
+        """
+        Test that after compaction the journal is empty and reloading gives the same state.
+        """
+        self.journal.append_sale(Sale("S001", "J001", "B001", 4, 70.0, date.today()))
+        system = self.load_system()
+        system.compact()
+        self.assertEqual(self.journal.record_count, 0)
+        self.assertEqual(list(self.journal.records()), [])
+
+        reloaded = self.load_system()
+        self.assertEqual(reloaded.find_batch("J001", "B001").quantity, 6)
+        self.assertEqual(len(reloaded.sales), 1)
+
+    # 4. Compaction threshold
+    def test_needs_compaction(self):
+        """
+        Test that the journal asks for compaction once compact_every records were written.
+        """
+        self.journal.compact_every = 2
+        self.journal.append_sale(Sale("S001", "J001", "B001", 1, 70.0, date.today()))
+        self.assertFalse(self.journal.needs_compaction())
+        self.journal.append_sale(Sale("S002", "J001", "B001", 1, 70.0, date.today()))
+        self.assertTrue(self.journal.needs_compaction())
+
+    # 5. Expired batches removed in journal mode
+    def test_remove_expired_is_journalled(self):
+        """
+        Test that removing an expired batch appends a remove record and the batch stays gone after reloading.
+        """
+        self.journal.append_product(Product("J002", "B001", "Bread", 25.0, 5, date.today() - timedelta(days=1)))
+        system = self.load_system()
+        system.remove_expired_products()
+        self.assertIsNone(system.find_batch("J002", "B001"))
+        self.assertEqual(list(self.journal.records())[-1]["record_type"], "remove")
+
+        reloaded = self.load_system()
+        self.assertIsNone(reloaded.find_batch("J002", "B001"))
+        self.assertEqual(len(reloaded.products), 1)
+
+    # 6. A removed batch added again under the same key
+    def test_remove_then_restock(self):
+        """
+        Test that a batch written off and then restocked under the same batch number comes back once,
+        with the restocked quantity only.
+        """
+        system = self.load_system()
+        system.remove_batch("J001", "B001", "Damaged")
+        system.restock("J001", "B001", 7, name="Milk", price=70.0, expiry_date=date.today() + timedelta(days=9))
+        reloaded = self.load_system()
+        self.assertEqual([(p.batch_number, p.quantity) for p in reloaded.products], [("B001", 7)])
+        reloaded.save()
+        self.assertEqual([(p.batch_number, p.quantity) for p in self.load_system().products], [("B001", 7)])
+
+    # 7. Crash during compaction
+    def test_compact_interrupted(self):
+        """
+        Test that a compaction stopped after writing products.csv, or before clearing the journal,
+        neither loses nor applies twice the journalled sale.
+        """
+        system = self.load_system()
+        system.sell_product("J001", 3)
+        self.assertEqual(self.journal.base()["products"], system.storage.journal_stamps()["products"])
+
+        def crash(*args):
+            raise OSError("power cut")
+        for step in ("save_sales", "clear"):
+            target = self.journal if step == "clear" else system
+            setattr(target, step, crash)
+            with self.assertRaises(OSError):
+                system.compact()
+            del target.__dict__[step]
+            reloaded = self.load_system()
+            self.assertEqual(reloaded.find_batch("J001", "B001").quantity, 7)
+            self.assertEqual([s.quantity_sold for s in reloaded.sales], [3])
+
+if __name__ == "__main__":
+    unittest.main()
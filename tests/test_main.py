@@ -0,0 +1,122 @@
+# Unit tests for the command line in main.py
+# These tests run one-shot commands against a data folder, and check that each one loads
+# only the products it needs and leaves the data files to the journal.
+
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from src.journal import Journal
+from src.main import main
+from src.shopsystem import ShopSystem, Product, Sale
+from src.snapshot import SnapshotStorage
+from src.storage import DataLock
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Saves two products, one with an expired batch, and two sales in a temporary data folder.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.today = date.today()
+        system = ShopSystem(storage=self.storage())
+        system.products = [
+            Product("P001", "B001", "Milk", 70.0, 10, self.today + timedelta(days=10), "Dairy"),
+            Product("P001", "B002", "Milk", 70.0, 5, self.today + timedelta(days=2), "Dairy"),
+            Product("P002", "B001", "Bread", 1200.0, 4, self.today - timedelta(days=1), "Bakery"),
+        ]
+        system.sales = [Sale("S001", "P001", "B001", 2, 70.0, date(2026, 1, 5)),
+                        Sale("S002", "P002", "B001", 1, 1200.0, date(2026, 2, 1))]
+        system.rebuild_indexes()
+        system.save()
+        system.storage.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def storage(self):
+        return SnapshotStorage(os.path.join(self.folder, "products.csv"), os.path.join(self.folder, "sales.csv"),
+                               os.path.join(self.folder, "removed_products.csv"))
+
+    def run_command(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(out):
+            status = main(["--data", self.folder] + list(argv))
+        return status, out.getvalue()
+
+    # 1. Selling and restocking one product
+    def test_sell_and_restock(self):
+        """
+        Test that a sale takes the soonest expiring batch first, a restock adds a new batch, and both are
+        journalled without rewriting products.csv.
+        """
+        products_csv = os.path.join(self.folder, "products.csv")
+        before = os.path.getmtime(products_csv)
+        status, out = self.run_command("sell", "P001", "7")
+        self.assertEqual(status, 0)
+        self.assertIn("S003: 5 x P001 from batch B002", out)
+        self.assertIn("Revenue: 490.0", out)
+
+        status, _ = self.run_command("restock", "P001", "B003", "20", "--price", "75", "--expiry", "2030-01-01")
+        self.assertEqual(status, 0)
+        self.assertEqual(self.run_command("sell", "P001", "100")[0], 1)
+        status, out = self.run_command("sell", "P001", "1")
+        self.assertIn("S005: 1 x P001", out)        # Numbering goes on from S004, no block is skipped
+        self.assertEqual(self.run_command("restock", "P003", "B001", "5")[0], 1)
+
+        status, out = self.run_command("stock", "P001")
+        self.assertEqual(out.splitlines()[-1], "Total: 27")
+        self.assertEqual(os.path.getmtime(products_csv), before)
+        self.assertTrue(os.path.exists(os.path.join(self.folder, "shop_journal.csv")))
+
+    # 2. Reports without loading anything
+    def test_report_sales(self):
+        """
+        Test that a sales report covers only its date range, including sales made since the last save.
+        """
+        self.run_command("sell", "P001", "1")
+        status, out = self.run_command("report", "sales", "--from", "2026-01-01", "--to", "2026-01-31")
+        self.assertEqual(status, 0)
+        self.assertIn("Total revenue: 140.0", out)
+        status, out = self.run_command("report", "sales", "--period", "month", "--top", "1")
+        self.assertIn(f"Total revenue: {140.0 + 1200.0 + 70.0}", out)
+        self.assertIn("P002", out)
+
+    # 3. Expiring stock from cron
+    def test_expire(self):
+        """
+        Test that expire removes and logs the expired batch and that the next load no longer has it.
+        """
+        status, out = self.run_command("expire")
+        self.assertEqual(status, 0)
+        self.assertIn("1 expired batch(es) removed.", out)
+        status, out = self.run_command("report", "removed", "--reason", "Expired")
+        self.assertIn("P002 | B001 | Bread", out)
+
+        system = ShopSystem(journal=Journal(os.path.join(self.folder, "shop_journal.csv")), storage=self.storage())
+        system.load_products()
+        self.assertEqual(sorted(p.product_id for p in system.products), ["P001", "P001"])
+        system.journal.close()
+
+    # 4. Changes refused while another process holds the data
+    def test_data_locked(self):
+        """
+        Test that while the menu (or the service) holds the data lock a sale is refused and changes nothing,
+        a stock query still runs, and the sale goes through once the lock is released.
+        """
+        with mock.patch("src.main.LOCK_WAIT", 0):
+            with DataLock(self.storage().lock_file):
+                status, out = self.run_command("sell", "P001", "1")
+                self.assertEqual(status, 1)
+                self.assertIn("in use by another process", out)
+                status, out = self.run_command("stock", "P001")
+                self.assertEqual(out.splitlines()[-1], "Total: 15")
+            self.assertEqual(self.run_command("sell", "P001", "1")[0], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# Unit tests for the metrics registry in metrics.py
+# These tests check the timers, counters and percentiles, and that nothing is recorded while metrics are off.
+
+import unittest
+from src.metrics import Histogram, Metrics, metrics
+from src.inventory import Inventory
+from src.models import Product
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a separate registry and clears the shared one.
+        """
+        self.registry = Metrics()
+        metrics.reset()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+
+    # 1. Percentiles from the histogram buckets
+    def test_percentiles(self):
+        """
+        Test that p50 and p99 land within one bucket (33%) of the real values.
+        """
+        histogram = Histogram()
+        for i in range(1, 101):
+            histogram.record(i / 1000)          # 1 ms .. 100 ms
+        self.assertEqual(histogram.count, 100)
+        self.assertTrue(0.050 <= histogram.percentile(50) <= 0.050 * 1.34)
+        self.assertTrue(0.099 <= histogram.percentile(99) <= 0.100)
+        self.assertEqual(histogram.summary()["max"], 0.1)
+
+    # 2. Nothing is recorded while disabled
+    def test_disabled(self):
+        """
+        Test that timed functions and counters record nothing until metrics are enabled.
+        """
+        @self.registry.timed("work")
+        def work():
+            return 42
+
+        self.assertEqual(work(), 42)
+        self.registry.count("things")
+        self.assertEqual(self.registry.snapshot(), {"timers": {}, "counters": {}})
+
+        self.registry.enable()
+        work()
+        self.registry.count("things", 3)
+        snapshot = self.registry.snapshot()
+        self.assertEqual(snapshot["timers"]["work"]["count"], 1)
+        self.assertEqual(snapshot["counters"], {"things": 3})
+
+    # 3. Inventory hot paths are timed
+    def test_inventory_instrumented(self):
+        """
+        Test that sales through Inventory show up in the shared registry when it is enabled.
+        """
+        metrics.enable()
+        inventory = Inventory(low_stock_threshold=10)
+        inventory.add_product(Product("P001", "B001", "Sugar", 2500.0, 20, "2099-01-01"))
+        inventory.product_sale("P001", "B001", 2)
+        inventory.product_sale("P001", "B001", 3)
+        self.assertEqual(metrics.timers["inventory.product_sale"].count, 2)
+        self.assertIn("inventory.product_sale", "\n".join(metrics.report()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# Unit tests for the shared Product/Sale classes and the SalesColumns store in models.py
+# These tests check that the compact classes keep the old behaviour and that the
+# columnar store gives back the same sales it was given.
+
+import unittest
+from datetime import date, timedelta
+from src.models import Product, Sale, SalesColumns, parse_date
+from src import inventory, product, sale, shopsystem
+
+class TestModels(unittest.TestCase):
+
+    # 1. Every module uses the same Product
+    def test_single_product_class(self):
+        """
+        Test that product.py, inventory.py and shopsystem.py all expose the models.Product class.
+        """
+        self.assertIs(product.Product, Product)
+        self.assertIs(inventory.Product, Product)
+        self.assertIs(shopsystem.Product, Product)
+
+    # 2. Records have no per-object dictionary
+    def test_slots(self):
+        """
+        Test that Product and Sale objects use __slots__ and reject unknown attributes.
+        """
+        milk = Product("P001", "B001", "Milk", "70", "10", "2026-12-31")
+        with self.assertRaises(AttributeError):
+            milk.colour = "white"
+        self.assertFalse(hasattr(Sale("S001", "P001", "B001", 1, 70.0, date.today()), "__dict__"))
+
+    # 3. CSV text is converted
+    def test_product_from_text(self):
+        """
+        Test that text values from a CSV row are converted to numbers and a date.
+        """
+        milk = Product("P001", "B001", "Milk", "70", "10", "2026-12-31")
+        self.assertEqual(milk.price, 70.0)
+        self.assertEqual(milk.quantity, 10)
+        self.assertEqual(milk.expiry_date, date(2026, 12, 31))
+
+    # 4. Date parsing
+    def test_parse_date(self):
+        """
+        Test that parse_date accepts ISO strings and date objects, and rejects bad text.
+        """
+        self.assertEqual(parse_date("2026-01-05"), date(2026, 1, 5))
+        self.assertEqual(parse_date(date(2026, 1, 5)), date(2026, 1, 5))
+        with self.assertRaises(ValueError):
+            parse_date("05/01/2026")
+
+    # 5. Till-side Sale keeps its original API
+    def test_till_sale(self):
+        """
+        Test that sale.Sale is stored in the shared slots but keeps price_per_unit and to_record.
+        """
+        till_sale = sale.Sale("J001", "B001", 4, 140.0)
+        self.assertIsInstance(till_sale, Sale)
+        self.assertEqual(till_sale.total_price, 560.0)
+        self.assertEqual(till_sale.to_record()["sale_date"], date.today())
+
+    # 6. Columnar store round trip and totals
+    def test_sales_columns(self):
+        """
+        Test that SalesColumns returns the same sales and computes revenue by date range.
+        """
+        today = date.today()
+        sales = [
+            Sale("S001", "P001", "B001", 2, 2500.0, today - timedelta(days=2)),
+            Sale("S002", "P002", "B001", 1, 1500.0, today - timedelta(days=1)),
+            Sale("S003", "P001", "B001", 3, 2500.0, today),
+        ]
+        columns = SalesColumns(sales)
+        self.assertEqual(len(columns), 3)
+        self.assertEqual(columns[2].as_row(), sales[2].as_row())
+        self.assertEqual(len(columns.batch_keys), 2)     # P001/B001 is stored once
+        self.assertEqual(columns.revenue(), 14000.0)
+        self.assertEqual(columns.revenue(start=today - timedelta(days=1)), 9000.0)
+        self.assertEqual(columns.quantity_sold(), 6)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+# Unit tests for the POS export import in pos_import.py
+# These tests run the command on a small export file against a temporary SQLite database.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from src.pos_import import main
+from src.shopsystem import Product
+from src.storage import SqliteStorage
+
+class TestPosImport(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a database with one batch (Sugar, 10 units) and an export file with three lines.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.db_file = os.path.join(self.folder, "shop.db")
+        storage = SqliteStorage(self.db_file)
+        storage.insert_batch(Product("P001", "B001", "Sugar", 2500.0, 10, date.today() + timedelta(days=30)))
+        storage.close()
+
+        self.export_file = os.path.join(self.folder, "export.csv")
+        with open(self.export_file, "w", newline="") as file:
+            file.write("product_id,batch_number,quantity_sold\n"
+                       "P001,B001,3\n"
+                       "P001,,4\n"
+                       "P002,B001,1\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    # 1. Import records the good lines and reports the bad one
+    def test_import(self):
+        """
+        Test that the import stores two sales, takes 7 units and exits with 1 because one line failed.
+        """
+        self.assertEqual(main([self.export_file, "--db", self.db_file]), 1)
+        storage = SqliteStorage(self.db_file)
+        self.assertEqual(len(storage.load_sales()), 2)
+        self.assertEqual(int(storage.load_products()[0]["quantity"]), 3)
+        storage.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+# Unit tests for SalesRollup in rollups.py
+# These tests check that the daily, weekly and monthly totals match the sales they were fed
+# and that the rollups can be rebuilt from sales.csv.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date
+from src.models import Sale
+from src.rollups import SalesRollup
+from src.storage import CsvStorage
+
+class TestSalesRollup(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Builds a rollup from four sales over two weeks and two months.
+        """
+        self.sales = [
+            Sale("S001", "P001", "B001", 2, 2500.0, date(2026, 1, 30)),    # Friday
+            Sale("S002", "P002", "B001", 1, 1500.0, date(2026, 1, 31)),    # Saturday, same week
+            Sale("S003", "P001", "B001", 1, 2500.0, date(2026, 2, 2)),     # Monday, new week and month
+            Sale("S004", "P001", "B002", 3, 2600.0, date(2026, 2, 2)),
+        ]
+        self.rollup = SalesRollup()
+        self.rollup.add_all(self.sales)
+
+    # 1. Totals by period
+    def test_revenue_by_period(self):
+        """
+        Test that revenue is grouped by day, by week (starting Monday) and by month.
+        """
+        self.assertEqual(self.rollup.revenue_by_period("day")[date(2026, 2, 2)], 10300.0)
+        self.assertEqual(self.rollup.revenue_by_period("week"), {date(2026, 1, 26): 6500.0, date(2026, 2, 2): 10300.0})
+        self.assertEqual(self.rollup.revenue_by_period("month"), {date(2026, 1, 1): 6500.0, date(2026, 2, 1): 10300.0})
+        self.assertEqual(self.rollup.revenue_by_period("month", start=date(2026, 1, 31)),
+                         {date(2026, 1, 1): 1500.0, date(2026, 2, 1): 10300.0})
+
+    # 2. Revenue between dates
+    def test_revenue_range(self):
+        """
+        Test that revenue over a date range only counts the days inside it.
+        """
+        self.assertEqual(self.rollup.revenue(), 16800.0)
+        self.assertEqual(self.rollup.revenue(start=date(2026, 1, 31), end=date(2026, 1, 31)), 1500.0)
+
+    # 3. Top products
+    def test_top_products(self):
+        """
+        Test that products are ranked by revenue or by quantity, with batches of a product added together.
+        """
+        self.assertEqual(self.rollup.top_products(1), [("P001", 15300.0)])
+        self.assertEqual(self.rollup.top_products(2, by="quantity"), [("P001", 6), ("P002", 1)])
+
+    # 4. Rebuild from sales.csv and reload from the rollup file
+    def test_rebuild(self):
+        """
+        Test that rebuilding from sales.csv and saving/loading the rollup give the same totals.
+        """
+        folder = tempfile.mkdtemp()
+        try:
+            storage = CsvStorage(os.path.join(folder, "products.csv"), os.path.join(folder, "sales.csv"),
+                                 os.path.join(folder, "removed.csv"))
+            storage.save_sales(self.sales)
+            rebuilt = SalesRollup.from_sales_file(os.path.join(folder, "sales.csv"))
+            self.assertEqual(rebuilt.daily, self.rollup.daily)
+
+            rebuilt.save(os.path.join(folder, "rollup.csv"))
+            loaded = SalesRollup.load(os.path.join(folder, "rollup.csv"))
+            self.assertEqual(loaded.monthly, self.rollup.monthly)
+        finally:
+            shutil.rmtree(folder)
+
+    # 5. Taking back sales that were not stored
+    def test_remove_all(self):
+        """
+        Test that removing the last two sales gives the totals of the first two, without empty entries.
+        """
+        self.rollup.remove_all(self.sales[2:])
+        expected = SalesRollup()
+        expected.add_all(self.sales[:2])
+        self.assertEqual(self.rollup.daily, expected.daily)
+        self.assertEqual(self.rollup.monthly, expected.monthly)
+        self.assertEqual(self.rollup.day_totals, expected.day_totals)
+
+if __name__ == "__main__":
+    unittest.main()
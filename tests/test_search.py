@@ -0,0 +1,102 @@
+# Unit tests for the product search in search.py
+# These tests look products up by whole word, prefix, typo and part of a word, filter by
+# category, and check that ShopSystem keeps the search index in step with its products.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from src.search import ProductSearch, tokenize
+from src.shopsystem import ShopSystem, Product
+from src.storage import CsvStorage
+
+class TestSearch(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a search index over a few products in two categories.
+        """
+        expiry = date.today() + timedelta(days=30)
+        self.products = [
+            Product("P001", "B001", "Milk 1L", 70.0, 10, expiry, "Dairy"),
+            Product("P001", "B002", "Milk 1L", 70.0, 5, expiry, "Dairy"),
+            Product("P002", "B001", "Millet Flour", 900.0, 8, expiry, "Groceries"),
+            Product("P003", "B001", "Greek Yoghurt", 350.0, 12, expiry, "Dairy"),
+            Product("P004", "B001", "Crème Fraîche", 400.0, 3, expiry, "Dairy"),
+            Product("P005", "B001", "Brown Sugar", 2500.0, 20, expiry, "Groceries"),
+        ]
+        self.index = ProductSearch(self.products)
+
+    def names(self, keys):
+        return [self.index.names[key][0] for key in keys]
+
+    # 1. Whole words and prefixes
+    def test_prefix(self):
+        """
+        Test that the word being typed matches by prefix, shortest word first, and earlier words match whole.
+        """
+        self.assertEqual(tokenize("Crème Fraîche"), ["creme", "fraiche"])
+        self.assertEqual(self.names(self.index.search("mil")), ["milk 1l", "milk 1l", "millet flour"])
+        self.assertEqual(self.index.search("milk 1"), [("P001", "B001"), ("P001", "B002")])
+        self.assertEqual(self.names(self.index.search("creme")), ["creme fraiche"])
+        self.assertEqual(self.index.search("sugar milk"), [])
+
+    # 2. Typos and parts of words
+    def test_typos_and_substrings(self):
+        """
+        Test that a missing letter, a swapped pair of letters and the middle of a word still find the product.
+        """
+        self.assertEqual(self.names(self.index.search("sugr")), ["brown sugar"])
+        self.assertEqual(self.names(self.index.search("suagr")), ["brown sugar"])
+        self.assertEqual(self.names(self.index.search("ogh")), ["greek yoghurt"])
+        self.assertEqual(self.index.search("xyzzy"), [])
+
+    # 3. Categories
+    def test_category(self):
+        """
+        Test that a category narrows the results and lists its products by name on its own.
+        """
+        self.assertEqual(self.names(self.index.search("mil", category="groceries")), ["millet flour"])
+        self.assertEqual(self.names(self.index.search("", category="Dairy", limit=2)), ["creme fraiche", "greek yoghurt"])
+        self.assertEqual(self.index.category_names(), ["dairy", "groceries"])
+        self.assertEqual(self.index.search("", category="Bakery"), [])
+
+    # 4. Removing products
+    def test_remove(self):
+        """
+        Test that a removed batch is no longer found and that removing every batch empties the index.
+        """
+        self.index.remove(self.products[0])
+        self.assertEqual(self.index.search("milk"), [("P001", "B002")])
+        for product in self.products:
+            self.index.remove(product)
+        self.assertEqual((self.index.tokens, self.index.trie, self.index.trigrams, self.index.categories), ({}, {}, {}, {}))
+
+    # 5. ShopSystem keeps the index up to date
+    def test_shop_search(self):
+        """
+        Test that products loaded and removed by ShopSystem are reflected in its search, with their category.
+        """
+        folder = tempfile.mkdtemp()
+        try:
+            storage = CsvStorage(os.path.join(folder, "products.csv"), os.path.join(folder, "sales.csv"),
+                                 os.path.join(folder, "removed.csv"))
+            system = ShopSystem(storage=storage)
+            system.products = self.products + [Product("P006", "B001", "Rye Bread", 1200.0, 4,
+                                                       date.today() - timedelta(days=1), "Bakery")]
+            system.rebuild_indexes()
+            system.save_products()
+
+            reloaded = ShopSystem(storage=storage)
+            reloaded.load_products()
+            self.assertEqual([p.category for p in reloaded.search("yog")], ["Dairy"])
+            self.assertEqual([p.name for p in reloaded.search("", category="bakery")], ["Rye Bread"])
+            reloaded.remove_expired_products()
+            self.assertEqual(reloaded.search("rye"), [])
+            self.assertNotIn("bakery", reloaded.search_index.category_names())
+        finally:
+            shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+# Unit tests for the ID sequences in sequences.py and their use by ShopSystem
+# These tests allocate IDs, restart the shop on the same storage and check that no
+# ID is handed out twice, with CSV files and with SQLite.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from src.sequences import IdSequence
+from src.shopsystem import ShopSystem, Product, Sale
+from src.storage import CsvStorage, SqliteStorage
+
+class TestSequences(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a temporary folder with an empty shop.
+        """
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def csv_system(self):
+        storage = CsvStorage(os.path.join(self.folder, "products.csv"), os.path.join(self.folder, "sales.csv"),
+                             os.path.join(self.folder, "removed.csv"))
+        system = ShopSystem(storage=storage)
+        system.load_products()
+        system.load_sales()
+        return system
+
+    # 1. Allocation, blocks and uniqueness
+    def test_sequence(self):
+        """
+        Test that IDs are consecutive, that a block is saved once and that used IDs are refused.
+        """
+        saved = []
+        sequence = IdSequence("S", block_size=10, on_reserve=lambda name, high: saved.append((name, high)))
+        self.assertEqual(sequence.peek(), "S001")
+        self.assertEqual([sequence.take() for _ in range(3)], ["S001", "S002", "S003"])
+        self.assertEqual(sequence.take_block(4), ["S004", "S005", "S006", "S007"])
+        self.assertEqual(saved, [("S", 10)])
+        self.assertFalse(sequence.claim("S002"))
+        self.assertTrue(sequence.claim("S998"))
+        self.assertEqual(sequence.take(), "S999")
+        self.assertEqual(sequence.take(), "S1000")
+        self.assertTrue(sequence.claim("X-17"))         # IDs in another format are only checked for uniqueness
+        self.assertEqual(sequence.peek(), "S1001")
+
+    # 2. Numbering continues after a restart
+    def test_restart(self):
+        """
+        Test that a restarted shop never reuses an ID handed out before, even one never saved.
+        """
+        system = self.csv_system()
+        system.products = [Product("P001", "B001", "Sugar", 2500.0, 100, date.today() + timedelta(days=30))]
+        system.rebuild_indexes()
+        system.save_products()
+        sales = system.record_sales([{"product_id": "P001", "quantity_sold": 1}] * 3)[0]
+        self.assertEqual([s.sale_id for s in sales], ["S001", "S002", "S003"])
+        system.sale_ids.take()                          # Handed out but the sale never stored
+
+        restarted = self.csv_system()
+        self.assertEqual(len(restarted.sales), 3)
+        next_id = restarted.sale_ids.take()
+        self.assertGreater(restarted.sale_ids.number_of(next_id), 4)
+        self.assertEqual(restarted.suggest_next_product_id(), "P002")
+
+    # 3. Duplicate sale IDs are refused
+    def test_duplicate_sale_id(self):
+        """
+        Test that a typed sale ID that is already used fails without taking stock, and that a new one
+        given for a line spread over two batches is kept for the first of them.
+        """
+        system = self.csv_system()
+        system.products = [Product("P001", "B001", "Sugar", 2500.0, 10, date.today() + timedelta(days=30))]
+        system.rebuild_indexes()
+        system.sales = [Sale("S005", "P001", "B001", 1, 2500.0, date.today())]
+        system._rebuild_sale_ids()                      # Sales were set by hand, index them as loading does
+        self.assertEqual(system.sell_product("P001", 2, "S005"), [])
+        sales, failures = system.record_sales([{"product_id": "P001", "quantity_sold": 1, "sale_id": "S005"},
+                                               {"product_id": "P001", "quantity_sold": 1}])
+        self.assertEqual(failures, [(1, "Sale ID S005 already used.")])
+        self.assertEqual([s.sale_id for s in sales], ["S006"])
+        self.assertEqual(system.find_batch("P001", "B001").quantity, 9)
+
+        system.products.append(Product("P001", "B002", "Sugar", 2500.0, 10, date.today() + timedelta(days=60)))
+        system.rebuild_indexes()
+        sales, failures = system.record_sales([{"product_id": "P001", "quantity_sold": 12, "sale_id": "S050"}])
+        self.assertEqual(failures, [])
+        self.assertEqual([(s.sale_id, s.batch_number, s.quantity_sold) for s in sales],
+                         [("S050", "B001", 9), ("S051", "B002", 3)])
+
+    # 4. SQLite keeps the mark and accepts IDs past 999
+    def test_sqlite(self):
+        """
+        Test that SQLite stores the high-water mark and a four digit sale ID.
+        """
+        storage = SqliteStorage(os.path.join(self.folder, "shop.db"))
+        storage.insert_batch(Product("P001", "B001", "Sugar", 2500.0, 10, date.today() + timedelta(days=30)))
+        system = ShopSystem(storage=storage)
+        system.load_products()
+        system.load_sales()
+        sales = system.record_sales([{"product_id": "P001", "quantity_sold": 1, "sale_id": "S1000"},
+                                     {"product_id": "P001", "quantity_sold": 1}])[0]
+        self.assertEqual([s.sale_id for s in sales], ["S1000", "S1001"])
+        self.assertEqual(storage.load_sequences()["S"], 1019)
+        storage.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+# Unit tests for the multi-terminal service in service.py
+# These tests run the service on a free local port against a temporary SQLite database
+# and send it sales from several terminals at once, and check the expiry sweep against sales.
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from src.journal import Journal
+from src.service import ShopService
+from src.shopsystem import ShopSystem, Product
+from src.storage import CsvStorage, SqliteStorage, StorageError
+
+class TestShopService(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        """
+        Runs before each test.
+        Creates a database with two batches of Sugar (B001 expires first) and one of Milk,
+        then starts the service on a free port.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.storage = SqliteStorage(os.path.join(self.folder, "shop.db"))
+        self.storage.insert_batch(Product("P001", "B001", "Sugar", 2500.0, 10, date.today() + timedelta(days=5)))
+        self.storage.insert_batch(Product("P001", "B002", "Sugar", 2500.0, 10, date.today() + timedelta(days=30)))
+        self.storage.insert_batch(Product("P002", "B001", "Milk", 70.0, 100, date.today() + timedelta(days=3)))
+        self.system = ShopSystem(storage=self.storage)
+        self.system.load_products()
+        self.service = ShopService(self.system)
+        server = await self.service.start(port=0)
+        self.port = server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        await self.service.stop()
+        self.storage.close()
+        shutil.rmtree(self.folder)
+
+    async def terminal(self, requests):
+        # One till: sends its requests in order over one connection and returns the replies
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        replies = []
+        for request in requests:
+            writer.write((json.dumps(request) + "\n").encode())
+            await writer.drain()
+            replies.append(json.loads(await reader.readline()))
+        writer.close()
+        await writer.wait_closed()
+        return replies
+
+    # 1. Concurrent terminals never oversell a batch
+    async def test_concurrent_sales(self):
+        """
+        Test that 30 one-unit sales of a 10-unit batch from 3 terminals sell exactly 10 units.
+        """
+        sale = {"op": "sell", "product_id": "P001", "batch_number": "B001", "quantity": 1}
+        results = await asyncio.gather(*(self.terminal([sale] * 10) for _ in range(3)))
+        replies = [reply for replies in results for reply in replies]
+        self.assertEqual(sum(reply["ok"] for reply in replies), 10)
+        self.assertEqual(self.system.find_batch("P001", "B001").quantity, 0)
+        self.assertEqual(len(self.storage.load_sales()), 10)
+        self.assertEqual(len({s.sale_id for s in self.system.sales}), 10)
+
+    # 2. Sales of different batches are stored in one group
+    async def test_group_commit(self):
+        """
+        Test that sales arriving together are written with a single storage call.
+        """
+        calls = []
+        record_sales = self.storage.record_sales
+        self.storage.record_sales = lambda sales: (calls.append(len(sales)), record_sales(sales))
+        await asyncio.gather(
+            self.terminal([{"op": "sell", "product_id": "P001", "batch_number": "B002", "quantity": 2}]),
+            self.terminal([{"op": "sell", "product_id": "P002", "batch_number": "B001", "quantity": 5}]),
+        )
+        self.assertEqual(calls, [2])
+
+    # 3. Sale without a batch uses first-expiry-first-out
+    async def test_fefo_sale(self):
+        """
+        Test that selling 12 units of P001 takes 10 from B001 and 2 from B002.
+        """
+        [reply] = await self.terminal([{"op": "sell", "product_id": "P001", "quantity": 12}])
+        self.assertTrue(reply["ok"])
+        self.assertEqual([(s["batch_number"], s["quantity_sold"]) for s in reply["sales"]],
+                         [("B001", 10), ("B002", 2)])
+
+    # 4. Errors are reported to the terminal
+    async def test_errors(self):
+        """
+        Test that unknown batches, overselling, unknown ops and requests that are not JSON objects
+        get an error reply and change nothing.
+        """
+        replies = await self.terminal([
+            {"op": "sell", "product_id": "P009", "batch_number": "B001", "quantity": 1},
+            {"op": "sell", "product_id": "P002", "batch_number": "B001", "quantity": 500},
+            {"op": "dance"},
+            ["sell", "P002"],
+        ])
+        self.assertFalse(any(reply["ok"] for reply in replies))
+        self.assertEqual(self.system.find_batch("P002", "B001").quantity, 100)
+        self.assertEqual(self.system.sales, [])
+
+    # 5. The expiry sweep waits for a sale of a batch it removes
+    async def test_expiry_sweep(self):
+        """
+        Test that a batch expiring mid-sale is removed only after the sale is stored, and the others stay.
+        """
+        sale = asyncio.ensure_future(self.service.sell("P002", 4, "B001"))
+        await asyncio.sleep(0)              # The sale is waiting for its group commit
+        removed = await self.service.sweep_expired(date.today() + timedelta(days=4))
+        self.assertEqual([(p.product_id, p.batch_number) for p in removed], [("P002", "B001")])
+        self.assertTrue(sale.done())
+        self.assertEqual(len(self.storage.load_sales()), 1)
+        self.assertEqual([(p.product_id, p.batch_number) for p in self.system.products],
+                         [("P001", "B001"), ("P001", "B002")])
+        self.assertEqual(self.storage.count_removed(reason="Expired"), 1)
+
+    # 6. Best sellers for the dashboard
+    async def test_top_sellers(self):
+        """
+        Test that the top sellers follow the sales made through the service, with exact counts while
+        every product fits in the counters.
+        """
+        replies = await self.terminal([
+            {"op": "sell", "product_id": "P002", "quantity": 10},
+            {"op": "sell", "product_id": "P001", "quantity": 1},
+            {"op": "top", "n": 1},
+            {"op": "top", "window": "month", "summary": True},
+            {"op": "top", "window": "year"},
+        ])
+        self.assertEqual(replies[2]["top"], [{"product_id": "P001", "revenue": 2500.0, "error": 0, "certain": True}])
+        self.assertEqual(replies[2]["total"], 3200.0)
+        self.assertEqual([row["product_id"] for row in replies[3]["top"]], ["P001", "P002"])
+        self.assertEqual(replies[3]["summary"]["heavy"]["total"], 3200.0)
+        self.assertFalse(replies[4]["ok"])
+
+    # 7. Journal mode: one fsync per group
+    async def test_journal_group_commit(self):
+        """
+        Test that a second sale of a batch goes ahead while the first waits for its group commit,
+        and that the journal is synced once per group.
+        """
+        storage = CsvStorage(os.path.join(self.folder, "products.csv"), os.path.join(self.folder, "sales.csv"),
+                             os.path.join(self.folder, "removed.csv"))
+        journal = Journal(os.path.join(self.folder, "journal.csv"), fsync_every=0)
+        system = ShopSystem(journal=journal, storage=storage)
+        system.products = [Product("P001", "B001", "Sugar", 2500.0, 10, date.today() + timedelta(days=5))]
+        system.rebuild_indexes()
+        service = ShopService(system, expiry_sweep=False)
+        syncs = []
+        sync = journal.sync
+        journal.sync = lambda: (syncs.append(journal._unsynced), sync())
+
+        first = asyncio.ensure_future(service.sell("P001", 2, "B001"))
+        await asyncio.sleep(0)
+        self.assertEqual(system.find_batch("P001", "B001").quantity, 8)
+        second = asyncio.ensure_future(service.sell("P001", 3, "B001"))
+        await asyncio.gather(first, second)
+        self.assertEqual(syncs, [2])
+        self.assertEqual(system.find_batch("P001", "B001").quantity, 5)
+        journal.close()
+
+    # 8. A failed group commit answers every terminal
+    async def test_commit_failure(self):
+        """
+        Test that an unexpected error while storing a group is reported to each sale in it
+        instead of leaving the terminals waiting.
+        """
+        def fail(sales):
+            raise OSError("disk full")
+        self.storage.record_sales = fail
+        replies = await asyncio.wait_for(asyncio.gather(
+            self.terminal([{"op": "sell", "product_id": "P001", "batch_number": "B002", "quantity": 2}]),
+            self.terminal([{"op": "sell", "product_id": "P002", "batch_number": "B001", "quantity": 5}]),
+        ), timeout=5)
+        self.assertEqual([reply["ok"] for [reply] in replies], [False, False])
+        self.assertIn("disk full", replies[0][0]["error"])
+
+    # 9. A refused sale in a group is taken back, the others are stored
+    async def test_commit_one_refused(self):
+        """
+        Test that when the database refuses one sale of a group, only that sale is undone and the
+        others keep their place in the sales list.
+        """
+        record_sales = self.storage.record_sales
+        def refuse_milk(sales):
+            if any(sale.product_id == "P002" for sale in sales):
+                raise StorageError("refused")
+            record_sales(sales)
+        self.storage.record_sales = refuse_milk
+        results = await asyncio.gather(
+            self.service.sell("P001", 2, "B002"),
+            self.service.sell("P002", 5, "B001"),
+            self.service.sell("P001", 1, "B001"),
+            return_exceptions=True,
+        )
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(self.system.sales, results[0] + results[2])
+        self.assertEqual(self.system.find_batch("P002", "B001").quantity, 100)
+        self.assertEqual(len(self.storage.load_sales()), 2)
+
+if __name__ == "__main__":
+    unittest.main()
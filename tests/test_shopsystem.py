@@ -4,9 +4,13 @@
 # NOTE: We do not change ShopSystem code itself.
 # Instead, we adapt tests to match existing methods.
 
+import os
+import shutil
+import tempfile
 import unittest
 from datetime import date, timedelta
 from src.shopsystem import ShopSystem, Product, Sale
+from src.storage import CsvStorage
 
 class TestShopSystem(unittest.TestCase):
     """
@@ -111,5 +115,83 @@ class TestShopSystem(unittest.TestCase):
         """
         self.skipTest("Interactive add_product cannot be tested without mocking input.")
 
+    # 8. Test batch lookup through the indexes
+    def test_find_batch_uses_index(self):
+        """
+        Test that after rebuilding the indexes a batch can be found by its
+        (product_id, batch_number) key, by product ID and by name in any case.
+        """
+        self.system.rebuild_indexes()
+        self.assertIs(self.system.find_batch("J001", "B001"), self.product)
+        self.assertIsNone(self.system.find_batch("J001", "B999"))
+        self.assertEqual(self.system.find_batches("J001"), [self.product])
+        self.assertEqual(self.system.find_by_name("mILK"), [self.product])
+
+    # 9. Test that removing a batch keeps the indexes in sync
+    def test_unindex_product(self):
+        """
+        Test that an unindexed batch can no longer be found.
+        """
+        self.system.rebuild_indexes()
+        self.system._unindex_product(self.product)
+        self.assertIsNone(self.system.find_batch("J001", "B001"))
+        self.assertEqual(self.system.find_batches("J001"), [])
+        self.assertEqual(self.system.find_by_name("Milk"), [])
+
+    # 10. Test FEFO sale over several batches
+    def test_sell_product_fefo(self):
+        """
+        Test that sell_product splits a sale over batches, soonest expiry first,
+        and gives every line its own sale ID.
+        """
+        folder = tempfile.mkdtemp()
+        try:
+            storage = CsvStorage(os.path.join(folder, "products.csv"), os.path.join(folder, "sales.csv"),
+                                 os.path.join(folder, "removed.csv"))
+            system = ShopSystem(storage=storage)
+            system.products.append(self.product)
+            system.products.append(Product("J001", "B002", "Milk", 75.0, 4, date.today() + timedelta(days=1)))
+            system.rebuild_indexes()
+
+            sales = system.sell_product("J001", 6)
+            self.assertEqual([(s.sale_id, s.batch_number, s.quantity_sold) for s in sales],
+                             [("S001", "B002", 4), ("S002", "B001", 2)])
+            self.assertEqual(self.product.quantity, 8)
+            self.assertEqual(system.sell_product("J001", 100), [])
+            self.assertEqual(len(system.sales), 2)
+        finally:
+            shutil.rmtree(folder)
+
+    # 11. Test recording a whole basket at once
+    def test_record_sales(self):
+        """
+        Test that record_sales applies the good lines, reports the bad ones by line number
+        and checks stock against what earlier lines already took.
+        """
+        folder = tempfile.mkdtemp()
+        try:
+            storage = CsvStorage(os.path.join(folder, "products.csv"), os.path.join(folder, "sales.csv"),
+                                 os.path.join(folder, "removed.csv"))
+            system = ShopSystem(storage=storage)
+            system.products.append(self.product)
+            system.rebuild_indexes()
+
+            sales, failures = system.record_sales([
+                {"product_id": "J001", "batch_number": "B001", "quantity_sold": "6"},
+                {"product_id": "J001", "batch_number": "B001", "quantity_sold": "6"},   # only 4 left
+                {"product_id": "X999", "quantity_sold": "1"},
+                {"product_id": "J001", "quantity_sold": "abc"},
+                {"sale_id": "S100", "product_id": "J001", "quantity_sold": "4"},
+            ])
+            self.assertEqual([(s.sale_id, s.quantity_sold) for s in sales], [("S001", 6), ("S100", 4)])
+            self.assertEqual([line for line, _ in failures], [2, 3, 4])
+            self.assertEqual(self.product.quantity, 0)
+
+            reloaded = ShopSystem(storage=storage)
+            reloaded.load_sales()
+            self.assertEqual(len(reloaded.sales), 2)     # Saved once, at the end
+        finally:
+            shutil.rmtree(folder)
+
 if __name__ == "__main__":
     unittest.main()
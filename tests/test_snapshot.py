@@ -0,0 +1,148 @@
+# Unit tests for the binary snapshots in snapshot.py
+# These tests save through SnapshotStorage, reload from the snapshots and check that
+# an edited CSV file is read instead of an out-of-date snapshot.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from src.journal import Journal
+from src.rollups import SalesRollup
+from src.shopsystem import ShopSystem, Product, Sale
+from src.snapshot import SalesHistory, Snapshot, SnapshotStorage
+from src.storage import CsvStorage
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Saves two batches and 100 sales through SnapshotStorage in a temporary folder.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.products_file = os.path.join(self.folder, "products.csv")
+        self.sales_file = os.path.join(self.folder, "sales.csv")
+        system = ShopSystem(storage=self.storage())
+        system.products = [
+            Product("P001", "B001", "Sugar", 2500.0, 10, date.today() + timedelta(days=30)),
+            Product("P002", "B001", "Milk", 70.0, 5, date.today() + timedelta(days=3)),
+        ]
+        system.sales = [Sale(f"S{i:03d}", "P001", "B001", 1 + i % 2, 2500.0, date(2026, 1, 1) + timedelta(days=i % 40))
+                        for i in range(1, 101)]
+        system.rollup.add_all(system.sales)
+        system.save_products()
+        system.save_sales()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def storage(self):
+        return SnapshotStorage(self.products_file, self.sales_file, os.path.join(self.folder, "removed.csv"))
+
+    def load_system(self, storage):
+        system = ShopSystem(storage=storage)
+        system.load_products()
+        system.load_sales()
+        return system
+
+    # 1. Records read back from the mapped file
+    def test_snapshot_records(self):
+        """
+        Test that the snapshot holds every sale and decodes one on access.
+        """
+        snapshot = Snapshot(os.path.join(self.folder, "sales.snap"))
+        self.assertEqual(len(snapshot), 100)
+        self.assertEqual(snapshot[-1].sale_id, "S100")
+        self.assertEqual(snapshot[0].date_of_sale, date(2026, 1, 2))
+        self.assertTrue(snapshot.matches(self.sales_file))
+        snapshot.close()
+
+    # 2. Loading uses the snapshots and matches the CSV files
+    def test_load_from_snapshot(self):
+        """
+        Test that a reload maps the sales snapshot and gives the same products, sales and revenue as CSV.
+        """
+        storage = self.storage()
+        system = self.load_system(storage)
+        from_csv = self.load_system(CsvStorage(self.products_file, self.sales_file))
+        self.assertIsInstance(system.sales, SalesHistory)
+        self.assertEqual([p.as_row() for p in system.products], [p.as_row() for p in from_csv.products])
+        self.assertEqual([s.as_row() for s in system.sales], [s.as_row() for s in from_csv.sales])
+        self.assertEqual(system.rollup.revenue(), from_csv.rollup.revenue())
+        storage.close()
+
+    # 3. New sales go after the snapshot and can be rolled back
+    def test_sales_history_changes(self):
+        """
+        Test that appended sales are kept after the mapped ones and that deleting them works like a list.
+        """
+        storage = self.storage()
+        system = self.load_system(storage)
+        system.sales.extend([Sale("S101", "P002", "B001", 1, 70.0, date.today()),
+                             Sale("S102", "P002", "B001", 2, 70.0, date.today())])
+        self.assertEqual(len(system.sales), 102)
+        self.assertEqual(system.sales[-1].sale_id, "S102")
+        del system.sales[-2:]
+        self.assertEqual(len(system.sales), 100)
+        self.assertEqual(system.sales.tail, [])
+        storage.close()
+
+    # 4. Edited CSV file wins over an old snapshot
+    def test_stale_snapshot_ignored(self):
+        """
+        Test that after sales.csv is rewritten by plain CSV storage the snapshot is not used.
+        """
+        writer = ShopSystem(storage=CsvStorage(self.products_file, self.sales_file))
+        writer.sales = [Sale("S001", "P002", "B001", 1, 70.0, date.today())]
+        writer.save_sales()
+        storage = self.storage()
+        system = self.load_system(storage)
+        self.assertIsInstance(system.sales, list)
+        self.assertEqual(len(system.sales), 1)
+        storage.close()
+
+    # 5. Each snapshot file is mapped once
+    def test_snapshot_reused(self):
+        """
+        Test that opening a snapshot again returns the same mapping until a save replaces the file,
+        and that the sales read before the save still read from the replaced one.
+        """
+        storage = self.storage()
+        system = self.load_system(storage)
+        first = storage.open_sales_snapshot()
+        for _ in range(5):
+            self.assertIs(storage.open_sales_snapshot(), first)
+        self.assertEqual(len(storage._open), 2)
+
+        system.save_sales()
+        second = storage.open_sales_snapshot()
+        self.assertIsNot(second, first)
+        self.assertEqual(len(second), 100)
+        self.assertEqual(system.sales[0].sale_id, "S001")
+        storage.close()
+
+    # 6. Saved rollup after a compaction started by a sale
+    def test_rollup_saved_by_compaction(self):
+        """
+        Test that when a sale makes the journal compact, the saved rollup already counts that sale
+        and matches one rebuilt from the reloaded sales.
+        """
+        journal = Journal(os.path.join(self.folder, "journal.csv"), fsync_every=0, compact_every=3)
+        storage = self.storage()
+        system = ShopSystem(journal=journal, storage=storage)
+        system.load_products()
+        system.load_sales()
+        for _ in range(3):
+            system.sell_product("P002", 1)
+        self.assertEqual(journal.record_count, 0)
+
+        reloaded = self.load_system(self.storage())
+        expected = SalesRollup()
+        expected.add_all(reloaded.sales)
+        self.assertEqual(len(reloaded.sales), 103)
+        self.assertEqual(reloaded.rollup.daily, expected.daily)
+        journal.close()
+        storage.close()
+
+if __name__ == "__main__":
+    unittest.main()
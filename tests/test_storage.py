@@ -0,0 +1,297 @@
+# Unit tests for the storage backends in storage.py
+# These tests check that CsvStorage and SqliteStorage offer the same load/save API,
+# that a SQLite sale is one transaction, that the CSV files can be migrated, that
+# CSV product changes go to the delta file until it is compacted, and that removed
+# batches are logged once each and can be queried by date, reason and page.
+
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, timedelta
+from unittest import mock
+from src.storage import CsvStorage, RemovalLog, SqliteStorage, StorageError, chunked
+from src.shopsystem import ShopSystem, Product, Sale
+
+class TestStorage(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a temporary folder and one product batch (Milk) used by every test.
+        """
+        self.folder = tempfile.mkdtemp()
+        self.product = Product("P001", "B001", "Milk", 70.0, 10, date.today() + timedelta(days=5))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def round_trip(self, storage):
+        system = ShopSystem(storage=storage)
+        system.products.append(self.product)
+        system.sales.append(Sale("S001", "P001", "B001", 2, 70.0, date.today()))
+        system.save_products()
+        system.save_sales()
+
+        reloaded = ShopSystem(storage=storage)
+        reloaded.load_products()
+        reloaded.load_sales()
+        return reloaded
+
+    def csv_system(self):
+        storage = CsvStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv"))
+        system = ShopSystem(storage=storage)
+        system.products = [self.product, Product("P002", "B001", "Sugar", 2500.0, 20, date.today() + timedelta(days=30))]
+        system.rebuild_indexes()
+        system.save_products()
+        return system
+
+    # 1. CSV backend round trip
+    def test_csv_round_trip(self):
+        """
+        Test that products and sales saved through CsvStorage load back unchanged.
+        """
+        storage = CsvStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv"))
+        reloaded = self.round_trip(storage)
+        self.assertEqual(reloaded.find_batch("P001", "B001").quantity, 10)
+        self.assertEqual(reloaded.sales[0].total, 140.0)
+
+    # 2. SQLite backend round trip
+    def test_sqlite_round_trip(self):
+        """
+        Test that the same ShopSystem calls work on SqliteStorage.
+        """
+        storage = SqliteStorage(":memory:")
+        reloaded = self.round_trip(storage)
+        self.assertEqual(reloaded.find_batch("P001", "B001").quantity, 10)
+        self.assertEqual(reloaded.sales[0].total, 140.0)
+        storage.close()
+
+    # 3. SQLite sale updates one batch row
+    def test_sqlite_record_sale(self):
+        """
+        Test that record_sale stores the sale and takes the stock in the Batches row.
+        """
+        storage = SqliteStorage(":memory:")
+        storage.insert_batch(self.product)
+        storage.record_sale(Sale("S001", "P001", "B001", 3, 70.0, date.today()), self.product)
+        self.assertEqual(int(storage.load_products()[0]["quantity"]), 7)
+        self.assertEqual(len(storage.load_sales()), 1)
+        storage.close()
+
+    # 4. SQLite sale with too little stock is rolled back
+    def test_sqlite_record_sale_rollback(self):
+        """
+        Test that a sale larger than the stored stock raises StorageError and stores nothing.
+        """
+        storage = SqliteStorage(":memory:")
+        storage.insert_batch(self.product)
+        with self.assertRaises(StorageError):
+            storage.record_sale(Sale("S001", "P001", "B001", 50, 70.0, date.today()), self.product)
+        self.assertEqual(int(storage.load_products()[0]["quantity"]), 10)
+        self.assertEqual(storage.load_sales(), [])
+        storage.close()
+
+    # 5. Removed batches are hidden from the product list
+    def test_sqlite_removed_product(self):
+        """
+        Test that a logged removal hides the batch but keeps it in the removed list, and that restocking
+        the batch shows it again, also in a database made before batches had a removed flag.
+        """
+        storage = SqliteStorage(self.path("shop.db"))
+        storage.insert_batch(self.product)
+        storage.log_removed_product(self.product, "Expired")
+        self.assertEqual(storage.load_products(), [])
+        self.assertEqual(storage.load_removed()[0][6], "Expired")
+        storage.insert_batch(self.product)
+        self.assertEqual([row["batch_number"] for row in storage.iter_products(product_ids=["P001"])], ["B001"])
+
+        storage.log_removed_product(self.product, "Damaged")
+        with storage.conn:
+            storage.conn.execute("ALTER TABLE Batches DROP COLUMN removed")
+        storage.close()
+        storage = SqliteStorage(self.path("shop.db"))
+        self.assertEqual(storage.load_products(), [])
+        storage.close()
+
+    # 6. Migration from the CSV files
+    def test_import_csv(self):
+        """
+        Test that products, removed products and sales are imported and the duplicate sale ID is skipped.
+        """
+        with open(self.path("products.csv"), "w", newline="") as file:
+            file.write("product_id,batch_number,name,price,quantity,expiry_date\n"
+                       "P001,B001,Sugar,2500.0,10,2026-12-31\n")
+        with open(self.path("removed.csv"), "w", newline="") as file:
+            file.write("product_id,batch_number,name,price,quantity,expiry_date,removal_reason,removal_date\n"
+                       "P003,B001,Bread,1200.0,15,2026-01-10,Expired,2026-01-14\n")
+        with open(self.path("sales.csv"), "w", newline="") as file:
+            writer = csv.writer(file)
+            writer.writerow(["sale_id", "product_id", "batch_number", "quantity_sold", "price", "total", "date_of_sale"])
+            writer.writerow(["S001", "P001", "B001", 2, 2500.0, 5000.0, "2026-01-05"])
+            writer.writerow(["S002", "P003", "B001", 5, 1200.0, 6000.0, "2026-01-07"])
+            writer.writerow(["S001", "P001", "B001", 20, 2500.0, 50000.0, "2026-01-13"])
+
+        storage = SqliteStorage(":memory:")
+        counts = storage.import_csv(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv"))
+        self.assertEqual(counts, {"products": 1, "removed": 1, "sales": 2, "skipped": 1})
+        self.assertEqual([row["product_id"] for row in storage.load_products()], ["P001"])
+        storage.close()
+
+    # 7. Streaming skips bad rows without stopping
+    def test_iter_sales_skips_bad_rows(self):
+        """
+        Test that iter_sales reports a bad row and still yields the rows after it.
+        """
+        with open(self.path("sales.csv"), "w", newline="") as file:
+            file.write("sale_id,product_id,batch_number,quantity_sold,price,total,date_of_sale\n"
+                       "S001,P001,B001,2,70.0,140.0,2026-01-05\n"
+                       "S002,P001,B001,two,70.0,140.0,2026-01-05\n"
+                       "S003,P001,B001,1,70.0,70.0,2026-01-06\n")
+        system = ShopSystem(storage=CsvStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv")))
+        sales = system.iter_sales()
+        self.assertNotIsInstance(sales, list)   # It is a lazy generator
+        self.assertEqual([s.sale_id for s in sales], ["S001", "S003"])
+
+    # 8. Chunking keeps every row in order
+    def test_chunked(self):
+        """
+        Test that chunked() splits a stream into lists of at most the chunk size.
+        """
+        self.assertEqual(list(chunked(iter(range(5)), 2)), [[0, 1], [2, 3], [4]])
+        self.assertEqual(list(chunked([], 2)), [])
+
+    # 9. Changed batches go to the delta file
+    def test_product_delta(self):
+        """
+        Test that a price change, a sale and a removal leave products.csv alone and load back from the delta.
+        """
+        system = self.csv_system()
+        with open(self.path("products.csv")) as file:
+            before = file.read()
+        system.find_batch("P002", "B001").price = 2600.0
+        system._persist_price(system.find_batch("P002", "B001"))
+        system.sell_product("P001", 4)
+        system._mark_removed(system.find_batch("P002", "B001"))
+        system.save_product_changes()
+        with open(self.path("products.csv")) as file:
+            self.assertEqual(file.read(), before)
+
+        rows = system.storage.load_products()
+        self.assertEqual([(r["product_id"], int(r["quantity"])) for r in rows], [("P001", 6)])
+        self.assertEqual(system.storage.delta_versions[("P002", "B001")], 2)
+
+    # 10. A large delta is folded into products.csv
+    def test_product_delta_compaction(self):
+        """
+        Test that products.csv is rewritten and the delta file removed once the delta passes the limits.
+        """
+        system = self.csv_system()
+        with mock.patch("src.shopsystem.DELTA_MIN_ROWS", 1):
+            system.sell_product("P001", 1)
+            self.assertTrue(os.path.exists(system.storage.delta_file))
+            system.sell_product("P002", 1)
+        self.assertFalse(os.path.exists(system.storage.delta_file))
+        quantities = {r["product_id"]: int(r["quantity"]) for r in system.storage.load_products()}
+        self.assertEqual(quantities, {"P001": 9, "P002": 19})
+
+    # 11. A row cut short by a crash is ignored
+    def test_product_delta_torn_row(self):
+        """
+        Test that a half-written last delta row is skipped and the earlier change still applies.
+        """
+        system = self.csv_system()
+        system.sell_product("P001", 3)
+        with open(system.storage.delta_file, "a", newline="") as file:
+            file.write("put,2,P001,B001,Milk,70.0,1")
+        rows = CsvStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv")).load_products()
+        self.assertEqual(int(rows[0]["quantity"]), 7)
+        self.assertFalse(os.path.exists(self.path("products.csv.tmp")))
+
+    # 12. Removals are written in one batch and logged once
+    def test_removal_log_dedup(self):
+        """
+        Test that a sweep is one append, a repeated removal is skipped, and duplicate rows already in the file are dropped.
+        """
+        with open(self.path("removed.csv"), "w", newline="") as file:
+            file.write("product_id,batch_number,name,price,quantity,expiry_date,removal_reason,removal_date\n"
+                       "P003,B001,Bread,1200.0,15,2026-01-10,Expired,2026-01-14\n"
+                       "P003,B001,Bread,1200.0,15,2026-01-10,Expired,2026-01-14\n")
+        storage = CsvStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv"))
+        products = [Product("P001", f"B{i:03d}", "Milk", 70.0, 1, date(2026, 1, 1)) for i in range(1, 4)]
+        self.assertEqual(storage.log_removed_products([], "Expired"), 0)     # Rewrites the file without the duplicate
+        self.assertEqual(RemovalLog(self.path("removed.csv")).duplicates, 0)
+        with mock.patch("builtins.open", wraps=open) as opened:
+            self.assertEqual(storage.log_removed_products(products + products[:1], "Expired"), 3)
+        self.assertEqual([c.args[1] for c in opened.call_args_list if c.args[0] == self.path("removed.csv")], ["a"])
+        self.assertEqual(storage.log_removed_product(products[0], "Expired"), 0)
+        with self.assertRaises(StorageError):
+            storage.log_removed_product(products[0], "Lost")
+
+        self.assertEqual(len(RemovalLog(self.path("removed.csv"))), 4)
+
+    # 13. Removed products are queried by date range, reason and page
+    def test_removed_queries(self):
+        """
+        Test that both backends answer the same range, reason and paged queries.
+        """
+        products = [Product("P001", f"B{i:03d}", "Milk", 70.0, 1, date(2026, 1, 1)) for i in range(1, 7)]
+        for storage in (CsvStorage(self.path("products.csv"), self.path("sales.csv"), self.path("removed.csv")),
+                        SqliteStorage(":memory:")):
+            if storage.supports_row_updates:
+                for product in products:
+                    storage.insert_batch(product)
+            storage.log_removed_products(products[:3], "Expired", date(2026, 1, 5))
+            storage.log_removed_products(products[3:5], "Damaged", date(2026, 1, 2))
+            storage.log_removed_products(products[5:], "Recalled", date(2026, 2, 1))
+
+            batches = lambda rows: [row[1] for row in rows]
+            self.assertEqual(batches(storage.iter_removed()), ["B004", "B005", "B001", "B002", "B003", "B006"])
+            self.assertEqual(batches(storage.iter_removed(date(2026, 1, 3), date(2026, 1, 31))), ["B001", "B002", "B003"])
+            self.assertEqual(batches(storage.iter_removed(reason="Damaged")), ["B004", "B005"])
+            self.assertEqual(batches(storage.iter_removed(end=date(2026, 1, 5), offset=1, limit=2)), ["B005", "B001"])
+            self.assertEqual(storage.count_removed(start=date(2026, 1, 2)), 6)
+            self.assertEqual(storage.count_removed(date(2026, 1, 1), date(2026, 1, 31), "Expired"), 3)
+            storage.close()
+
+    # 14. A SQLite removal keeps the batch as it was
+    def test_sqlite_removed_values(self):
+        """
+        Test that the removed list shows the price and quantity at removal after the batch is restocked,
+        also for rows of a database made before they were stored, and shows a missing value as empty.
+        """
+        storage = SqliteStorage(self.path("shop.db"))
+        storage.insert_batch(self.product)
+        storage.log_removed_product(self.product, "Damaged")
+        storage.insert_batch(Product("P001", "B001", "Milk", 80.0, 50, date.today() + timedelta(days=9)))
+        self.assertEqual(storage.load_removed()[0][3:5], ["70.0", "10"])
+
+        with storage.conn:
+            for column in ("price", "quantity", "expiry_date"):
+                storage.conn.execute(f"ALTER TABLE RemovedProducts DROP COLUMN {column}")
+            storage.conn.execute("INSERT INTO RemovedProducts (removal_reason, removal_date) VALUES ('Other', '2000-01-01')")
+        storage.close()
+        storage = SqliteStorage(self.path("shop.db"))
+        removed = storage.load_removed()
+        self.assertEqual(removed[0], ["", "", "", "", "", "", "Other", "2000-01-01"])
+        self.assertEqual(removed[1][3:5], ["80.0", "50"])
+        storage.close()
+
+    # 15. A new product with the name of another one
+    def test_sqlite_duplicate_name(self):
+        """
+        Test that adding a new product under a name another product has is refused with a clear error.
+        """
+        storage = SqliteStorage(":memory:")
+        storage.insert_batch(self.product)
+        with self.assertRaisesRegex(StorageError, "'Milk' is already used by P001"):
+            storage.insert_batch(Product("P002", "B001", "Milk", 90.0, 5, date.today()))
+        storage.insert_batch(Product("P001", "B002", "Milk", 70.0, 5, date.today()))
+        self.assertEqual(len(storage.load_products()), 2)
+        storage.close()
+
+if __name__ == "__main__":
+    unittest.main()
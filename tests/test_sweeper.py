@@ -0,0 +1,76 @@
+# Unit tests for the background expiry sweeper in sweeper.py
+# These tests check the midnight schedule, and run the sweeper thread against a ShopSystem
+# with a clock the test moves forward.
+
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import date, datetime, time, timedelta
+from src.shopsystem import ShopSystem, Product
+from src.storage import CsvStorage
+from src.sweeper import ExpirySweeper, next_run
+
+class TestSweeper(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates a ShopSystem on CSV files with a batch that expired yesterday, one that expires
+        today and one that expires next month.
+        """
+        self.folder = tempfile.mkdtemp()
+        storage = CsvStorage(os.path.join(self.folder, "products.csv"), os.path.join(self.folder, "sales.csv"),
+                             os.path.join(self.folder, "removed.csv"))
+        self.today = date.today()
+        self.system = ShopSystem(storage=storage)
+        self.system.products = [
+            Product("P001", "B001", "Milk", 70.0, 10, self.today - timedelta(days=1)),
+            Product("P001", "B002", "Milk", 70.0, 10, self.today),
+            Product("P002", "B001", "Sugar", 2500.0, 20, self.today + timedelta(days=30)),
+        ]
+        self.system.rebuild_indexes()
+        self.system.save_products()
+        self.now = datetime.combine(self.today, time(9, 30))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def remaining(self):
+        return sorted((p.product_id, p.batch_number) for p in self.system.products)
+
+    # 1. The next sweep is at the next midnight
+    def test_next_run(self):
+        """
+        Test that the next run is later today when its time has not come yet, else tomorrow.
+        """
+        self.assertEqual(next_run(datetime(2026, 3, 1, 9, 30)), datetime(2026, 3, 2))
+        self.assertEqual(next_run(datetime(2026, 3, 1)), datetime(2026, 3, 2))
+        self.assertEqual(next_run(datetime(2026, 3, 1, 9, 30), time(23, 0)), datetime(2026, 3, 1, 23))
+
+    # 2. The thread sweeps at start-up and again once the day has changed
+    def test_sweeper_thread(self):
+        """
+        Test that only the newly expired batches are removed by each sweep, logged and saved.
+        """
+        sweeper = ExpirySweeper(self.system, clock=lambda: self.now)
+        sweeper.start()
+        try:
+            self.assertTrue(sweeper.swept.wait(5))
+            with self.system.lock:
+                self.assertEqual(self.remaining(), [("P001", "B002"), ("P002", "B001")])
+
+            sweeper.swept.clear()
+            self.now = datetime.combine(self.today + timedelta(days=1), time(0, 0, 1))
+            sweeper.wake()
+            self.assertTrue(sweeper.swept.wait(5))
+        finally:
+            sweeper.stop(5)
+        self.assertFalse(sweeper.is_alive())
+        self.assertEqual(self.remaining(), [("P002", "B001")])
+        self.assertEqual((sweeper.sweeps, sweeper.removed), (2, 2))
+        self.assertEqual([row[1] for row in self.system.storage.iter_removed()], ["B001", "B002"])
+        saved = self.system.storage.load_products()
+        self.assertEqual([(r["product_id"], r["batch_number"]) for r in saved], [("P002", "B001")])
+
+if __name__ == "__main__":
+    unittest.main()
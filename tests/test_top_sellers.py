@@ -0,0 +1,144 @@
+# Unit tests for the streaming best seller summaries in top_sellers.py
+# These tests feed skewed streams of sales to the summaries and check that the true totals
+# stay within the reported error bounds, also after merging and sending them as JSON.
+
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+from datetime import date, timedelta
+from src.models import Sale
+from src.rollups import SalesRollup
+from src.shopsystem import ShopSystem, Product
+from src.storage import CsvStorage
+from src.top_sellers import CountMinSketch, SpaceSaving, Summary, TopSellers
+
+class TestTopSellers(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Draws 20000 sales of 500 products, a few of which sell far more than the rest.
+        """
+        rng = random.Random(7)
+        self.stream = [f"P{min(int(rng.paretovariate(1.2)), 500):03d}" for _ in range(20000)]
+        self.true = Counter(self.stream)
+
+    def assertWithinBounds(self, summary):
+        for item, (count, error) in summary.counters.items():
+            self.assertLessEqual(count - error, self.true[item])
+            self.assertGreaterEqual(count, self.true[item])
+        missing = [total for item, total in self.true.items() if item not in summary.counters]
+        self.assertLessEqual(max(missing, default=0), summary.min_count())
+
+    # 1. Space-Saving bounds
+    def test_space_saving(self):
+        """
+        Test that every count is within its error of the true count, the top products are found,
+        and the counts are exact while every product has a counter.
+        """
+        summary = SpaceSaving(50)
+        for item in self.stream:
+            summary.add(item)
+        self.assertEqual(len(summary), 50)
+        self.assertWithinBounds(summary)
+        self.assertLessEqual(summary.min_count(), summary.total / 50)
+        self.assertEqual([item for item, _, _ in summary.top(3)], [item for item, _ in self.true.most_common(3)])
+
+        exact = SpaceSaving(len(self.true))
+        for item in self.stream:
+            exact.add(item)
+        self.assertEqual({item: count for item, count, _ in exact.top(len(self.true))}, dict(self.true))
+
+    # 2. Count-Min bounds
+    def test_count_min(self):
+        """
+        Test that the sketch never under-counts, stays within its error bound, and merges into the sketch of both streams.
+        """
+        whole, first, second = CountMinSketch(), CountMinSketch(), CountMinSketch()
+        for i, item in enumerate(self.stream):
+            whole.add(item)
+            (first if i % 2 else second).add(item)
+        for item, total in self.true.items():
+            self.assertGreaterEqual(whole.estimate(item), total)
+            self.assertLessEqual(whole.estimate(item), total + whole.error_bound())
+        merged = first.merge(second)
+        self.assertEqual(merged.rows, whole.rows)
+        self.assertEqual(CountMinSketch.for_error(0.01, 0.01).width, 272)
+
+    # 3. Merging summaries, e.g. from two terminals
+    def test_merge(self):
+        """
+        Test that merged summaries keep their bounds, and that a summary, also an empty one, survives
+        being sent as JSON.
+        """
+        first, second = Summary(50), Summary(50)
+        for i, item in enumerate(self.stream):
+            (first if i < 12000 else second).add(item)
+        merged = first.merge(Summary.from_dict(json.loads(json.dumps(second.as_dict()))))
+        self.assertEqual(merged.heavy.total, len(self.stream))
+        self.assertWithinBounds(merged.heavy)
+
+        result = merged.top(5)
+        leader, count = self.true.most_common(1)[0]
+        self.assertEqual(result["top"][0][0], leader)
+        estimate, error, certain = result["top"][0][1:]
+        self.assertTrue(estimate - error <= count <= estimate)
+        self.assertTrue(certain)
+        self.assertEqual(result["max_error"], merged.heavy.min_count())
+
+        empty = Summary.from_dict(json.loads(json.dumps(Summary(7, 64, 2).as_dict())))
+        self.assertEqual((empty.heavy.capacity, empty.sketch.width), (7, 64))
+        self.assertEqual(empty.merge(Summary(7, 64, 2)).heavy.capacity, 7)
+
+    # 4. Day and month windows
+    def test_windows(self):
+        """
+        Test that sales count towards their day and month, old days are dropped, and ranges of the days kept merge.
+        """
+        top = TopSellers(by="quantity", keep_days=3, keep_months=2)
+        first = date(2026, 3, 30)
+        for i in range(5):
+            top.add(Sale(f"S{i}", "P001", "B001", i + 1, 10.0, first + timedelta(days=i)))
+        top.add(Sale("S9", "P002", "B001", 20, 1.0, date(2026, 4, 3)))
+
+        self.assertEqual(sorted(top.days), [date(2026, 4, 1), date(2026, 4, 2), date(2026, 4, 3)])
+        self.assertEqual([row[:2] for row in top.top(5, "day", date(2026, 4, 3))["top"]], [("P002", 20), ("P001", 5)])
+        self.assertEqual(top.top(5, "month", date(2026, 4, 15))["top"][0][:2], ("P002", 20))
+        self.assertEqual(top.top(5, "month", date(2026, 3, 1))["top"], [("P001", 3, 0, True)])
+        self.assertEqual(top.between(date(2026, 4, 2), date(2026, 4, 3)).estimate("P001"), (9, 0))
+        self.assertIsNone(top.between(date(2026, 3, 31), date(2026, 4, 3)))
+
+        both = top.merge(top)
+        self.assertEqual(both.day(date(2026, 4, 3)).estimate("P002"), (40, 0))
+        self.assertEqual(top.day(date(2026, 4, 3)).estimate("P002"), (20, 0))
+
+    # 5. ShopSystem keeps them up to date
+    def test_shop_best_sellers(self):
+        """
+        Test that the best sellers start from the rollups and follow each sale recorded afterwards.
+        """
+        folder = tempfile.mkdtemp()
+        try:
+            storage = CsvStorage(os.path.join(folder, "products.csv"), os.path.join(folder, "sales.csv"),
+                                 os.path.join(folder, "removed.csv"))
+            system = ShopSystem(storage=storage)
+            system.products = [Product("P001", "B001", "Milk", 70.0, 100, date.today() + timedelta(days=30)),
+                               Product("P002", "B001", "Sugar", 2500.0, 10, date.today() + timedelta(days=30))]
+            system.rebuild_indexes()
+            system.sales = [Sale("S001", "P001", "B001", 3, 70.0, date.today())]
+            system.rollup = SalesRollup()
+            system.rollup.add_all(system.sales)
+
+            self.assertEqual(system.best_sellers(5)["top"], [("P001", 210.0, 0, True)])
+            system.sell_product("P002", 1)
+            system.sell_product("P001", 1)
+            self.assertEqual([row[:2] for row in system.best_sellers(5, "month")["top"]],
+                             [("P002", 2500.0), ("P001", 280.0)])
+        finally:
+            shutil.rmtree(folder)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# Unit tests for the stock valuation reports in valuation.py
+# These tests check the reports on three batches, and that the NumPy and plain Python
+# versions agree when NumPy is installed.
+
+import random
+import unittest
+from datetime import date, timedelta
+from src import valuation
+from src.models import Product
+from src.valuation import StockValuation
+
+class TestStockValuation(unittest.TestCase):
+    def setUp(self):
+        """
+        Runs before each test.
+        Creates two Sugar batches at different prices and one expired Milk batch.
+        """
+        self.today = date(2026, 3, 1)
+        self.products = [
+            Product("P001", "B001", "Sugar", 2500.0, 10, self.today + timedelta(days=3)),
+            Product("P001", "B002", "Sugar", 2800.0, 30, self.today + timedelta(days=60)),
+            Product("P002", "B001", "Milk", 70.0, 4, self.today - timedelta(days=1)),
+        ]
+        self.stock = StockValuation(self.products, use_numpy=False)
+
+    # 1. Value reports
+    def test_values(self):
+        """
+        Test total value, value expiring within 7 days and value already expired.
+        """
+        self.assertEqual(self.stock.total_value(), 25000.0 + 84000.0 + 280.0)
+        self.assertEqual(self.stock.value_at_risk(7, self.today), 25000.0)
+        self.assertEqual(self.stock.expired_value(self.today), 280.0)
+
+    # 2. Weighted average cost and low stock flags
+    def test_average_cost_and_low_stock(self):
+        """
+        Test that the average cost weighs each batch by its quantity and low stock is flagged per batch,
+        including a batch at the threshold.
+        """
+        self.assertEqual(self.stock.average_cost(), {"P001": 109000.0 / 40, "P002": 70.0})
+        self.assertEqual(list(self.stock.low_stock_mask(10)), [True, False, True])
+        self.assertEqual(list(self.stock.low_stock_mask(9)), [False, False, True])
+
+    # 3. NumPy results match plain Python
+    @unittest.skipIf(valuation.np is None, "NumPy is not installed")
+    def test_numpy_matches_python(self):
+        """
+        Test that every report gives the same answer with and without NumPy on 10,000 random batches.
+        """
+        rng = random.Random(1)
+        products = [Product(f"P{rng.randint(1, 50):03d}", f"B{i:03d}", "Item", rng.randint(1, 5000),
+                            rng.randint(0, 40), self.today + timedelta(days=rng.randint(-10, 90)))
+                    for i in range(10000)]
+        fast, slow = StockValuation(products, use_numpy=True), StockValuation(products, use_numpy=False)
+        self.assertAlmostEqual(fast.total_value(), slow.total_value())
+        self.assertAlmostEqual(fast.value_at_risk(7, self.today), slow.value_at_risk(7, self.today))
+        self.assertAlmostEqual(fast.expired_value(self.today), slow.expired_value(self.today))
+        self.assertEqual(list(fast.low_stock_mask()), slow.low_stock_mask())
+        slow_costs = slow.average_cost()
+        for product_id, cost in fast.average_cost().items():
+            self.assertAlmostEqual(cost, slow_costs[product_id])
+
+if __name__ == "__main__":
+    unittest.main()